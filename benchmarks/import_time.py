@@ -0,0 +1,72 @@
+#
+# Copyright (c) 2024 AutoDeployAI
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+Measure the time of `import pypmml` in fresh interpreters, and check it against a budget.
+
+    python benchmarks/import_time.py --budget 50 --repeat 10
+
+The import time is the median of the wall time of importing PyPMML minus the one of an empty interpreter, the
+script exits with 1 if it exceeds the budget in milliseconds, or if any of the heavy modules are imported.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ('numpy', 'pandas', 'py4j', 'jpype')
+
+_LOADED = "import sys, pypmml; print(','.join(sorted(set(m.split('.')[0] for m in sys.modules))))"
+
+
+def _run(code, env):
+    start = time.perf_counter()
+    output = subprocess.check_output([sys.executable, '-c', code], env=env)
+    return time.perf_counter() - start, output.decode('utf-8').strip()
+
+
+def measure(repeat=10):
+    """Return the median import time in milliseconds, and the top-level modules loaded by `import pypmml`."""
+    env = dict(os.environ)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env['PYTHONPATH'] = os.pathsep.join([root] + ([env['PYTHONPATH']] if env.get('PYTHONPATH') else []))
+
+    # Warm up the bytecode caches
+    _, loaded = _run(_LOADED, env)
+    baseline = statistics.median(_run('import sys', env)[0] for _ in range(repeat))
+    elapsed = statistics.median(_run('import pypmml', env)[0] for _ in range(repeat))
+    return max(0.0, elapsed - baseline) * 1000, loaded.split(',')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure the import time of PyPMML.')
+    parser.add_argument('--budget', type=float, default=50.0, help='budget in milliseconds, 50 by default')
+    parser.add_argument('--repeat', type=int, default=10, help='number of interpreters to measure, 10 by default')
+    args = parser.parse_args(argv)
+
+    elapsed, loaded = measure(args.repeat)
+    heavy = [x for x in HEAVY_MODULES if x in loaded]
+    print('import pypmml: {elapsed:.1f} ms (budget {budget:.1f} ms)'.format(elapsed=elapsed, budget=args.budget))
+    if heavy:
+        print('heavy modules imported: {names}'.format(names=', '.join(heavy)))
+    return 0 if elapsed <= args.budget and not heavy else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -14,31 +14,34 @@
 # limitations under the License.
 #
 
+import weakref
 from threading import RLock
-from .jvm import JVMGateway
+from .jvm import JVMGateway, PMMLError
 
 class PMMLContext(object):
     _gateway: JVMGateway = None
     _active_pmml_context = None
     _lock = RLock()
 
-    def __init__(self, gateway_instance=None, gateway="py4j", java_opts=None, java_path=None):
+    def __init__(self, gateway_instance=None, gateway="py4j", java_opts=None, java_path=None, profile=None):
         PMMLContext._ensure_initialized(
             self,
             gateway_instance=gateway_instance,
             gateway=gateway,
             java_opts=java_opts,
-            java_path=java_path)
+            java_path=java_path,
+            profile=profile)
 
     @classmethod
-    def _ensure_initialized(cls, instance, gateway_instance=None, gateway="py4j", java_opts=None, java_path=None):
+    def _ensure_initialized(cls, instance, gateway_instance=None, gateway="py4j", java_opts=None, java_path=None,
+                            profile=None):
         """
         Checks whether a Gateway of JVM is initialized or not.
         """
         with PMMLContext._lock:
             if not PMMLContext._gateway:
                 PMMLContext._gateway = gateway_instance or cls.launch_gateway(
-                    gateway=gateway, java_opts=java_opts, java_path=java_path
+                    gateway=gateway, java_opts=java_opts, java_path=java_path, profile=profile
                 )
 
             if instance:
@@ -49,7 +52,7 @@ class PMMLContext(object):
                     PMMLContext._active_pmml_context = instance
 
     @classmethod
-    def getOrCreate(cls, gateway="py4j", java_opts=None, java_path=None) -> 'PMMLContext':
+    def getOrCreate(cls, gateway="py4j", java_opts=None, java_path=None, profile=None) -> 'PMMLContext':
         """
         Get or instantiate a PMMLContext and register it as a singleton object.
         :param java_opts: an array of extra options to pass to Java (the classpath
@@ -57,20 +60,24 @@ class PMMLContext(object):
         :param java_path: If None, JVM will use $JAVA_HOME/bin/java if $JAVA_HOME
             is defined, otherwise it will use "java".
         :param gateway: JVM gateway engine, support one of ["py4j", "jpype"]
+        :param profile: a workload profile of the JVM, one of ["low-latency", "throughput", "memory-constrained"],
+            that sizes the heap and picks the garbage collector and JIT options from the memory and cores
+            available to the container, see `pypmml.profiles`. Options in `java_opts` take precedence.
         """
         with PMMLContext._lock:
             if PMMLContext._active_pmml_context is None:
-                PMMLContext(gateway=gateway, java_opts=java_opts, java_path=java_path)
+                PMMLContext(gateway=gateway, java_opts=java_opts, java_path=java_path, profile=profile)
             return PMMLContext._active_pmml_context
 
     @classmethod
-    def launch_gateway(cls, gateway="py4j", java_opts=None, java_path=None) -> 'JVMGateway':
+    def launch_gateway(cls, gateway="py4j", java_opts=None, java_path=None, profile=None) -> 'JVMGateway':
         """Launch a `Gateway` in a new Java process.
         :param gateway: JVM gateway engine, support one of ["py4j", "jpype"]
         :param java_opts: an array of extra options to pass to Java (the classpath
             should be specified using the `classpath` parameter, not `java_opts`.)
         :param java_path: If None, JVM will use $JAVA_HOME/bin/java if $JAVA_HOME
             is defined, otherwise it will use "java".
+        :param profile: a workload profile of the JVM, see `pypmml.profiles`.
         :return: An object of `Gateway`
         """
         if isinstance(gateway, str) and gateway.lower() == "jpype":
@@ -79,7 +86,7 @@ class PMMLContext(object):
         else:
             from .jvm import Py4jGateway
             jvm_gateway = Py4jGateway()
-        jvm_gateway.launch_gateway(java_opts=java_opts, java_path=java_path)
+        jvm_gateway.launch_gateway(java_opts=java_opts, java_path=java_path, profile=profile)
         return jvm_gateway
 
     @classmethod
@@ -99,10 +106,121 @@ class PMMLContext(object):
     def call_java_func(self, func, *args):
         return self._gateway.call_java_func(func, *args)
 
+    def java_exceptions(self):
+        return self._gateway.java_exceptions() if self._gateway else ()
+
+    def java_throwable(self, e):
+        return self._gateway.java_throwable(e)
+
+    def new_args(self, *args):
+        return self._gateway.new_args(*args)
+
+    def find_method(self, java_object, func_name, arg_types):
+        return self._gateway.find_method(java_object, func_name, arg_types)
+
+    def invoke(self, method, java_object, java_args):
+        return self._gateway.invoke(method, java_object, java_args)
+
+    def bind_method(self, java_object, func_name, arg_types):
+        return self._gateway.bind_method(java_object, func_name, arg_types)
+
+    def submit(self, method, *args):
+        return self._gateway.submit(method, *args)
+
+    def replacing_method(self, java_object, func_name, target, replacement):
+        return self._gateway.replacing_method(java_object, func_name, target, replacement)
+
+    def call_handle(self, handle, *args):
+        return self._gateway.call_handle(handle, *args)
+
+    def wait(self, future, timeout):
+        return self._gateway.wait(future, timeout)
+
+    def supports_compression(self):
+        return self._gateway.supports_compression() if self._gateway else False
+
+    def compressed_method(self, java_object, func_name):
+        return self._gateway.compressed_method(java_object, func_name)
+
+    def call_compressed(self, method, data, level):
+        return self._gateway.call_compressed(method, data, level)
+
+    def supports_shared_memory(self):
+        return self._gateway.supports_shared_memory() if self._gateway else False
+
+    def map_shared(self, path, size):
+        return self._gateway.map_shared(path, size)
+
+    def shared_method(self, java_object, func_name):
+        return self._gateway.shared_method(java_object, func_name)
+
+    def call_shared(self, method, buffer, input_offset, input_length, output_offset, output_capacity):
+        return self._gateway.call_shared(method, buffer, input_offset, input_length, output_offset, output_capacity)
+
+    def serialized_size(self, java_object):
+        return self._gateway.serialized_size(java_object)
+
+    def heap_used(self, collect=False):
+        return self._gateway.heap_used(collect)
+
     def detach(self, java_model):
         if self._gateway:
             self._gateway.detach(java_model)
 
+    def jvmStats(self):
+        """
+        Return statistics of the JVM for monitoring: the workload `profile`, the `heap` and `non_heap` memory usage
+        in bytes, the collections of each garbage collector in `gc` with their `count` and accumulated pause
+        `time_ms`, the totals of them in `gc_count` and `gc_time_ms`, and the `uptime_ms` of the JVM.
+        """
+        factory = 'java.lang.management.ManagementFactory'
+
+        def usage(x):
+            return {'used': int(x.getUsed()), 'committed': int(x.getCommitted()), 'max': int(x.getMax())}
+
+        memory = self.call_java_static_func(factory, 'getMemoryMXBean')
+        collectors = [{'name': str(x.getName()), 'count': int(x.getCollectionCount()),
+                       'time_ms': int(x.getCollectionTime())}
+                      for x in self.call_java_static_func(factory, 'getGarbageCollectorMXBeans')]
+        runtime = self.call_java_static_func(factory, 'getRuntimeMXBean')
+        return {
+            'profile': self._gateway.profile,
+            'heap': usage(memory.getHeapMemoryUsage()),
+            'non_heap': usage(memory.getNonHeapMemoryUsage()),
+            'gc': collectors,
+            # -1 if a collector does not support it
+            'gc_count': sum(max(0, x['count']) for x in collectors),
+            'gc_time_ms': sum(max(0, x['time_ms']) for x in collectors),
+            'uptime_ms': int(runtime.getUptime()),
+        }
+
+    def stats(self):
+        """
+        Return statistics of memory for capacity planning: the `gateway`, the `heap` and `non_heap` memory usage of
+        the JVM in bytes, the number of `live_objects` of `JavaModelWrapper` that still hold objects in the JVM, and
+        by their types in `live_objects_by_type`, the number of live `models`, and the sum of their
+        `retained_bytes` that are measured at load, see `Model.memory_footprint`, the models loaded at the same time
+        as others are not measured, and are counted in `unmeasured_models`.
+        """
+        live = JavaModelWrapper.live_objects()
+        by_type = {}
+        for x in live:
+            name = type(x).__name__
+            by_type[name] = by_type.get(name, 0) + 1
+        models = [x for x in live if hasattr(x, 'memory_footprint')]
+        retained = [x._retained_bytes for x in models if x._retained_bytes is not None]
+        jvm = self.jvmStats()
+        return {
+            'gateway': self._gateway.name(),
+            'heap': jvm['heap'],
+            'non_heap': jvm['non_heap'],
+            'live_objects': len(live),
+            'live_objects_by_type': by_type,
+            'models': len(models),
+            'retained_bytes': sum(retained),
+            'unmeasured_models': len(models) - len(retained),
+        }
+
     @classmethod
     def gateway(cls):
         return cls._gateway.name() if cls._gateway is not None else None
@@ -111,17 +229,113 @@ class JavaModelWrapper(object):
     """
     Wrapper for the model in JVM
     """
+    # Wrappers that are not released yet, weakly referenced
+    _live = weakref.WeakSet()
+
     def __init__(self, java_model):
         self._pc = PMMLContext.getOrCreate()
         self._java_model = java_model
+        self._methods = {}
+        if java_model is not None:
+            JavaModelWrapper._live.add(self)
 
     def __del__(self):
-        if self._pc:
+        if self._pc and self._java_model is not None:
             self._pc.detach(self._java_model)
 
+    def release(self):
+        """
+        Release the model in JVM deterministically instead of waiting for the garbage collector, the wrapper can not
+        be used anymore.
+        """
+        java_model, self._java_model = self._java_model, None
+        self._methods = {}
+        JavaModelWrapper._live.discard(self)
+        if self._pc and java_model is not None:
+            self._pc.detach(java_model)
+
+    @property
+    def released(self):
+        return self._java_model is None
+
+    @staticmethod
+    def live_objects():
+        """Return a list of all wrappers that still hold objects in the JVM, i.e. not released or collected yet."""
+        return [x for x in list(JavaModelWrapper._live) if x._java_model is not None]
+
     def call(self, name, *args):
+        if self._java_model is None:
+            raise PMMLError('Model has been released')
         return self._pc.call_java_func(getattr(self._java_model, name), *args)
 
+    def invoke(self, name, arg_types, java_args):
+        """
+        Call a method by reflection with arguments of `PMMLContext.new_args`, that are already in the JVM.
+
+        :param arg_types: the fully-qualified class names of the parameters of the method.
+        """
+        if self._java_model is None:
+            raise PMMLError('Model has been released')
+        key = (name, tuple(arg_types))
+        method = self._methods.get(key)
+        if method is None:
+            method = self._methods[key] = self._pc.find_method(self._java_model, name, arg_types)
+        return self._pc.invoke(method, self._java_model, java_args)
+
+    def submit(self, name, arg_types, *args):
+        """
+        Submit a call of a method to a pool of threads in the JVM, return its Java `Future`, see `PMMLContext.wait`.
+
+        :param arg_types: the fully-qualified class names of the parameters of the method.
+        """
+        if self._java_model is None:
+            raise PMMLError('Model has been released')
+        key = (name, tuple(arg_types), 'bound')
+        method = self._methods.get(key)
+        if method is None:
+            method = self._methods[key] = self._pc.bind_method(self._java_model, name, arg_types)
+        return self._pc.submit(method, *args)
+
+    def call_replaced(self, name, target, replacement, data):
+        """
+        Call a method of String to String with an argument where all `target` are replaced by `replacement` in the
+        JVM, see `PMMLContext.replacing_method`. The composed method of the last replacement is kept.
+        """
+        if self._java_model is None:
+            raise PMMLError('Model has been released')
+        key = (name, 'replace')
+        cached = self._methods.get(key)
+        if cached is None or cached[:2] != (target, replacement):
+            cached = self._methods[key] = (target, replacement, self._pc.replacing_method(
+                self._java_model, name, target, replacement))
+        return self._pc.call_handle(cached[2], data)
+
+    def call_compressed(self, name, data, level):
+        """
+        Call a method of String to String with an argument of UTF-8 bytes compressed by zlib, the result is returned
+        compressed by zlib at the given level.
+        """
+        if self._java_model is None:
+            raise PMMLError('Model has been released')
+        key = (name, 'zlib')
+        method = self._methods.get(key)
+        if method is None:
+            method = self._methods[key] = self._pc.compressed_method(self._java_model, name)
+        return self._pc.call_compressed(method, data, level)
+
+    def call_shared(self, name, buffer, input_offset, input_length, output_offset, output_capacity):
+        """
+        Call a method of String to String with an argument of UTF-8 bytes in a slice of a shared buffer, the result
+        is written into another slice of it, see `PMMLContext.call_shared`.
+        """
+        if self._java_model is None:
+            raise PMMLError('Model has been released')
+        key = (name, 'shm')
+        method = self._methods.get(key)
+        if method is None:
+            method = self._methods[key] = self._pc.shared_method(self._java_model, name)
+        return self._pc.call_shared(method, buffer, input_offset, input_length, output_offset, output_capacity)
+
     def __str__(self):
         return self.call('toString')
 
@@ -0,0 +1,117 @@
+#
+# Copyright (c) 2024 AutoDeployAI
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from collections import OrderedDict
+from threading import RLock
+import math
+import time
+import weakref
+
+from pypmml.metrics import Counter
+
+
+def canonicalize(values):
+    """Return a hashable key of the input values ordered by `inputNames`, NaN is treated as None."""
+    key = []
+    for x in values:
+        if hasattr(x, 'item') and callable(x.item):
+            # NumPy scalars
+            x = x.item()
+        if x is not None and isinstance(x, float) and math.isnan(x):
+            x = None
+        key.append(x)
+    return tuple(key)
+
+
+class ResultCache(object):
+    """A bounded LRU cache of scoring results with an optional time-to-live.
+
+    A cache is bound to one model by `Model.setCache`, binding it to another model,
+    e.g. the same PMML reloaded, invalidates all its entries and detaches it from the
+    previous model.
+
+    :param maxsize: the max number of cached results, the least recently used ones are evicted first.
+    :param ttl: the seconds a result stays valid, None means no expiration.
+    """
+
+    def __init__(self, maxsize=10000, ttl=None):
+        if maxsize <= 0:
+            raise ValueError('maxsize must be positive')
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = Counter()
+        self.misses = Counter()
+        self.evictions = Counter()
+        self._data = OrderedDict()
+        self._lock = RLock()
+        self._owner = None
+
+    def bind(self, model):
+        """Bind to a model, invalidate all entries and detach the previous model if it was bound to another one."""
+        with self._lock:
+            owner = self._owner() if self._owner is not None else None
+            if owner is not model:
+                if owner is not None and getattr(owner, '_cache', None) is self:
+                    # The previous model must not read or write entries of the new one
+                    owner._cache = None
+                self.clear()
+                self._owner = weakref.ref(model)
+
+    def get(self, key):
+        """Return a tuple of `(hit, value)`."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires is None or expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits.inc()
+                    return True, value
+                del self._data[key]
+                self.evictions.inc()
+            self.misses.inc()
+            return False, None
+
+    def put(self, key, value):
+        with self._lock:
+            expires = time.monotonic() + self.ttl if self.ttl is not None else None
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions.inc()
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    @property
+    def hit_ratio(self):
+        total = self.hits.value + self.misses.value
+        return self.hits.value / total if total else 0.0
+
+    def stats(self):
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits.value,
+            'misses': self.misses.value,
+            'evictions': self.evictions.value,
+            'hit_ratio': self.hit_ratio,
+        }
@@ -0,0 +1,126 @@
+#
+# Copyright (c) 2024 AutoDeployAI
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+Compression of large payloads crossing the gateway of the JVM.
+
+Batches in JSON above a threshold of size are compressed by zlib in Python, decompressed by `java.util.zip` in the
+JVM, and the results are compressed the other way, so both directions cross the gateway compressed. Compression is
+only negotiated with gateways that copy payloads between processes, i.e. Py4j, it is skipped for JPype that runs the
+JVM in process.
+"""
+
+import time
+import zlib
+from threading import Lock
+
+from pypmml.jvm import PMMLError
+
+
+class Compression(object):
+    """Compression of payloads of a model, see `Model.setCompression`.
+
+    :param level: the level of zlib from 1 (fastest) to 9 (smallest), for both directions.
+    :param threshold: the min number of bytes of a payload to be compressed.
+    :param probe_interval: one of every `probe_interval` payloads above the threshold is sent uncompressed, to
+        estimate the time saved by compression, starting from the first one. 0 to disable probes.
+    """
+
+    def __init__(self, level=1, threshold=1 << 18, probe_interval=16):
+        if not 1 <= level <= 9:
+            raise ValueError('Level of compression must be in 1..9, got {level}'.format(level=level))
+        self.level = level
+        self.threshold = threshold
+        self.probe_interval = probe_interval
+        self._lock = Lock()
+        self._eligible = 0
+        self._calls = 0
+        self._raw_sent = 0
+        self._compressed_sent = 0
+        self._raw_received = 0
+        self._compressed_received = 0
+        self._codec_seconds = 0.0
+        self._seconds = 0.0
+        self._probe_bytes = 0
+        self._probe_seconds = 0.0
+
+    def call(self, model, name, payload):
+        """Call a method of String to String of the model with a payload of JSON, compressed if it is large enough,
+        return the result of JSON."""
+        if len(payload) < self.threshold or not model._pc.supports_compression():
+            return model.call(name, payload)
+
+        with self._lock:
+            self._eligible += 1
+            probe = self.probe_interval > 0 and (self._eligible - 1) % self.probe_interval == 0
+        start = time.perf_counter()
+        if probe:
+            try:
+                result = model.call(name, payload)
+            except model._pc.java_exceptions() as e:
+                # Raised as errors of compressed calls, whether a call is a probe or not
+                raise PMMLError(str(model._pc.java_throwable(e).getMessage()))
+            with self._lock:
+                self._probe_bytes += len(payload)
+                self._probe_seconds += time.perf_counter() - start
+            return result
+
+        raw = payload.encode('utf-8')
+        compressed = zlib.compress(raw, self.level)
+        codec = time.perf_counter() - start
+        output = model.call_compressed(name, compressed, self.level)
+        decoded = time.perf_counter()
+        result = zlib.decompress(output)
+        end = time.perf_counter()
+        codec += end - decoded
+        with self._lock:
+            self._calls += 1
+            self._raw_sent += len(raw)
+            self._compressed_sent += len(compressed)
+            self._raw_received += len(result)
+            self._compressed_received += len(output)
+            self._codec_seconds += codec
+            self._seconds += end - start
+        return result.decode('utf-8')
+
+    def snapshot(self):
+        """
+        Return a dict of the statistics: the number of compressed `calls`, the bytes sent and received before and
+        after compression, the compression `ratio` of all bytes, the time spent by zlib in Python in `codec_ms`,
+        and the time saved by compression in `saved_ms`, estimated by the uncompressed probes of the same model,
+        negative if compression costs more than it saves, None without probes or compressed calls.
+        """
+        with self._lock:
+            raw = self._raw_sent + self._raw_received
+            compressed = self._compressed_sent + self._compressed_received
+            saved = None
+            if self._probe_bytes and self._calls:
+                # Scoring costs the same in both ways, the difference is the transfer and the codec
+                expected = self._probe_seconds / self._probe_bytes * self._raw_sent
+                saved = (expected - self._seconds) * 1000.0
+            return {
+                'level': self.level,
+                'threshold': self.threshold,
+                'calls': self._calls,
+                'probes': self._eligible - self._calls,
+                'raw_bytes_sent': self._raw_sent,
+                'compressed_bytes_sent': self._compressed_sent,
+                'raw_bytes_received': self._raw_received,
+                'compressed_bytes_received': self._compressed_received,
+                'ratio': raw / compressed if compressed else None,
+                'codec_ms': self._codec_seconds * 1000.0,
+                'saved_ms': saved,
+            }
@@ -0,0 +1,132 @@
+#
+# Copyright (c) 2024 AutoDeployAI
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+Scoring of Dask DataFrames.
+
+The PMML document is shipped to workers once as a shared piece of the graph. Each worker process loads it into its
+own `PMMLContext` on the first partition, and caches the model by the hash of its content, so the following tasks,
+and the following graphs of the same document, reuse it. The output metadata is built from `outputFields`, so
+nothing is computed to infer it.
+"""
+
+import hashlib
+import json
+import os
+from threading import Lock
+
+from pypmml.model import Model
+
+_DTYPES = {
+    'double': 'float64',
+    'float': 'float64',
+    'real': 'float64',
+    'integer': 'Int64',
+    'boolean': 'boolean',
+}
+
+# Models loaded in this process and their output metadata by content hash and engine
+_models = {}
+_metas = {}
+_lock = Lock()
+
+
+class PMMLDocument(object):
+    """The content of a PMML document and its hash.
+
+    :param source: PMML in any formats that `Model.load` accepts, or a `Model` loaded from one of them.
+    """
+
+    def __init__(self, source):
+        if isinstance(source, Model):
+            source = source._source
+            if source is None:
+                raise ValueError('Source of the model is unknown')
+        if hasattr(source, 'read') and callable(source.read):
+            source = source.read()
+        if isinstance(source, str) and not source.lstrip().startswith('<') and os.path.isfile(source):
+            with open(source, 'rb') as f:
+                source = f.read()
+        if isinstance(source, str):
+            source = source.encode('utf-8')
+        self.content = bytes(source)
+        self.key = hashlib.sha256(self.content).hexdigest()
+
+    def load(self, engine='jvm'):
+        """Load the model into the `PMMLContext` of this process once, then return the cached one."""
+        key = (self.key, engine)
+        model = _models.get(key)
+        if model is None:
+            with _lock:
+                model = _models.get(key)
+                if model is None:
+                    model = Model.fromBytes(self.content)
+                    if engine != 'jvm':
+                        model.setEngine(engine)
+                    _metas[key] = output_meta(model)
+                    _models[key] = model
+        return model
+
+    def meta(self, engine='jvm'):
+        """The output metadata of the model loaded by `load`."""
+        self.load(engine)
+        return _metas[(self.key, engine)]
+
+
+def output_meta(model):
+    """Return an empty DataFrame of Pandas of the output columns of a model, typed by their `outputFields`."""
+    import pandas as pd
+
+    return pd.DataFrame({x.name: pd.Series(dtype=_DTYPES.get(x.dataType, object)) for x in model.outputFields})
+
+
+def predict(data, model, engine=None):
+    """
+    Score a DataFrame of Dask partition by partition, return a DataFrame of Dask of the output columns with the
+    same index and partitions.
+
+    :param data: a DataFrame of Dask.
+    :param model: PMML in any formats that `Model.load` accepts, or a `Model`.
+    :param engine: the engine to score, see `Model.setEngine`, the engine of `model` if it is a `Model`,
+        otherwise "jvm".
+    """
+    from dask import delayed
+
+    if engine is None:
+        engine = model.engine if isinstance(model, Model) else 'jvm'
+    document = PMMLDocument(model)
+    if not isinstance(model, Model):
+        model = document.load(engine)
+    meta = output_meta(model)
+    # A single key of the graph shared by all tasks
+    shared = delayed(document, pure=True, name='pypmml-document-' + document.key)
+    return data.map_partitions(_score_partition, shared, engine, meta=meta, align_dataframes=False)
+
+
+def _score_partition(df, document, engine):
+    import pandas as pd
+
+    model = document.load(engine)
+    meta = document.meta(engine)
+    names = [x for x in model.inputNames if x in df.columns]
+    if model._native is not None:
+        columns = model._native.predict_columns({x: df[x].values for x in names}, len(df))
+    else:
+        result = json.loads(model._call_predict(df[names].to_json(orient='split', index=False)))
+        index = {x: i for i, x in enumerate(result['columns'])}
+        columns = [[row[index[x]] for row in result['data']] for x in meta.columns]
+    return pd.DataFrame({name: pd.Series(values, dtype=meta[name].dtype, index=df.index)
+                         for name, values in zip(meta.columns, columns)}, index=df.index)
@@ -0,0 +1,116 @@
+#
+# Copyright (c) 2024 AutoDeployAI
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+Deadlines of scoring calls.
+
+A call with a deadline runs on a pool of threads in the JVM. The calls of the gateway to submit it and to wait for
+it run in a thread of Python, and the caller waits for that thread until the deadline, so neither a pathological
+input nor a gateway blocked by a long GC pause can hold the caller longer than that. Batches are scored in chunks,
+the deadline is checked before each chunk is serialized, and no chunk is started after the deadline passes or the
+call is cancelled, so the caller can only be late by the time to serialize one chunk.
+"""
+
+import time
+from threading import Event, Thread
+
+from pypmml.jvm import DeadlineExceeded
+
+__all__ = ['Deadline', 'DeadlineExceeded']
+
+
+class Deadline(object):
+    """A deadline of a call, that can also be cancelled from another thread.
+
+    :param timeout: the seconds from now, None for no deadline but cancellation.
+    """
+
+    # Seconds of a wait for the JVM between two checks of cancellation
+    poll_interval = 0.05
+
+    def __init__(self, timeout=None):
+        self.timeout = timeout
+        self._expires = time.monotonic() + timeout if timeout is not None else None
+        self._cancelled = Event()
+
+    @classmethod
+    def of(cls, timeout):
+        """Return the deadline itself if it is a `Deadline`, otherwise a new one of the seconds `timeout`."""
+        return timeout if isinstance(timeout, Deadline) else cls(timeout)
+
+    def cancel(self):
+        """Cancel the call, the running chunk of a batch is abandoned, and no more chunks are started."""
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def remaining(self):
+        """The seconds left, None if there is no deadline."""
+        if self._expires is None:
+            return None
+        return max(0.0, self._expires - time.monotonic())
+
+    @property
+    def expired(self):
+        return self.cancelled or (self._expires is not None and time.monotonic() >= self._expires)
+
+    def check(self):
+        """Raise `DeadlineExceeded` if the deadline passed or the call is cancelled."""
+        if self.cancelled:
+            raise DeadlineExceeded('Call cancelled')
+        if self.expired:
+            raise DeadlineExceeded('Deadline of {t}s exceeded'.format(t=self.timeout))
+
+    def run(self, pc, submit):
+        """Call `submit`, that submits a call to the JVM and returns its Java `Future`, and wait for the result of the
+        future of the `PMMLContext` until the deadline. Both run in a thread of Python, the caller returns at the
+        deadline even if the gateway does not respond, and the future is cancelled once it does."""
+        self.check()
+        done = Event()
+        abandoned = Event()
+        outcome = []
+
+        def call():
+            try:
+                future = submit()
+                while not abandoned.is_set():
+                    try:
+                        outcome.append((pc.wait(future, self.poll_interval), None))
+                        return
+                    except DeadlineExceeded:
+                        continue
+                # The JVM does not interrupt scoring, the call is only abandoned
+                future.cancel(True)
+            except Exception as e:
+                outcome.append((None, e))
+            finally:
+                done.set()
+
+        Thread(target=call, name='pypmml-deadline', daemon=True).start()
+        try:
+            while True:
+                self.check()
+                remaining = self.remaining()
+                if done.wait(self.poll_interval if remaining is None else min(self.poll_interval, remaining)):
+                    result, error = outcome[0]
+                    if error is not None:
+                        raise error
+                    return result
+        except DeadlineExceeded:
+            abandoned.set()
+            raise
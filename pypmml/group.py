@@ -0,0 +1,181 @@
+#
+# Copyright (c) 2024 AutoDeployAI
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+Scoring of one batch against many models, e.g. champion/challenger or ensembles of models.
+
+The batch is serialized to JSON and transferred to the JVM once, then all members are evaluated against the same
+copy in the JVM by reflection, in parallel calls that run on threads of the JVM.
+"""
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from pypmml.base import PMMLContext
+from pypmml.jvm import PMMLError
+from pypmml.model import _arrow_like, _json_rows
+from pypmml.utils import is_nd_array, is_pandas_dataframe, is_polars_dataframe, is_arrow_table
+
+_STRING = 'java.lang.String'
+
+
+class ModelGroup(object):
+    """A group of models that score the same batches.
+
+    :param models: a dict of names to models, or a list of models named by their indices.
+    :param max_workers: the max number of models evaluated at once, all of them by default, 1 to evaluate them
+        one by one.
+    """
+
+    def __init__(self, models, max_workers=None):
+        if not isinstance(models, dict):
+            models = {str(i): x for i, x in enumerate(models)}
+        if not models:
+            raise PMMLError('Models of a group can not be empty')
+        self.models = dict(models)
+        self.max_workers = max_workers or len(self.models)
+        self._executor = None
+        self._input_names = None
+        self._output_names = {name: x.outputNames for name, x in self.models.items()}
+
+    @property
+    def names(self):
+        return list(self.models)
+
+    @property
+    def inputNames(self):
+        """The union of input names of all models, in order of their first appearance."""
+        if self._input_names is None:
+            names = []
+            for model in self.models.values():
+                names.extend(x for x in model.inputNames if x not in names)
+            self._input_names = names
+        return self._input_names
+
+    def predict(self, data, combine=False, sep='.'):
+        """
+        Predict values of all models for a given data.
+
+        :param data: a dict, string in JSON, list of dicts, 2-D ndarray of NumPy, DataFrame of Pandas or Polars,
+            Table or RecordBatch of PyArrow. Columns of a 2-D ndarray are `inputNames` of the group.
+        :param combine: whether to combine the results into one, of columns prefixed by the model names.
+        :param sep: the separator between a model name and an output name of the combined result.
+        :return: a dict of model names to their results in the same format as input data, or the combined result.
+        """
+        payload, load = self._payload(data)
+        shared = PMMLContext.getOrCreate().new_args(payload)
+
+        def score(name):
+            model = self.models[name]
+            if model.engine == 'native':
+                # Members of the native engine pick their own inputs from the same payload
+                return load(model.predict(payload), self._output_names[name])
+            return load(model.invoke('predict', [_STRING], shared), self._output_names[name])
+
+        names = self.names
+        if self.max_workers > 1 and len(names) > 1:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='pypmml-group')
+            futures = [self._executor.submit(score, x) for x in names]
+            results = dict(zip(names, [x.result() for x in futures]))
+        else:
+            results = {x: score(x) for x in names}
+        return self._combine(data, results, sep) if combine else results
+
+    def close(self):
+        """Stop the threads of parallel calls, models are not released."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _payload(self, data):
+        """Return the JSON payload of data, and a function to load a JSON result in the same format as data."""
+        if isinstance(data, (str, u"".__class__)):
+            return data, lambda result, _: result
+        elif isinstance(data, dict):
+            return json.dumps([data]), lambda result, _: json.loads(result)[0]
+        elif isinstance(data, list) and all(isinstance(x, dict) for x in data):
+            return json.dumps(data), lambda result, _: json.loads(result)
+        elif is_nd_array(data) and data.ndim == 2:
+            names = self.inputNames
+            if data.shape[1] != len(names):
+                raise PMMLError('Expected {n} columns of inputNames, got {m}'.format(n=len(names), m=data.shape[1]))
+            rows, failures = _json_rows(data, names)
+            if failures:
+                raise PMMLError(next(iter(failures.values())))
+            return json.dumps({'columns': names, 'data': rows}, separators=(',', ':')), \
+                lambda result, _: _read_split(result).values
+        elif is_pandas_dataframe(data):
+            names = [x for x in self.inputNames if x in data.columns]
+            return data[names].to_json(orient='split', index=False), lambda result, _: _read_split(result)
+        elif is_polars_dataframe(data) or is_arrow_table(data):
+            frame = data
+            if is_arrow_table(data):
+                import polars as pl
+                frame = pl.from_arrow(data)
+            names = [x for x in self.inputNames if x in frame.columns]
+
+            def load(result, output_names):
+                records = json.loads(result)
+                return _arrow_like(data, output_names, [[x.get(name) for x in records] for name in output_names])
+
+            return frame.select(names).write_json(), load
+        raise PMMLError('Data type "{type}" not supported'.format(type=type(data).__name__))
+
+    def _combine(self, data, results, sep):
+        def prefixed(name, columns):
+            return [name + sep + x for x in columns]
+
+        if isinstance(data, dict):
+            return {name + sep + k: v for name, x in results.items() for k, v in x.items()}
+        elif isinstance(data, list):
+            return [{name + sep + k: v for name, x in results.items() for k, v in x[i].items()}
+                    for i in range(len(data))]
+        elif is_nd_array(data):
+            import numpy as np
+            return np.hstack(list(results.values()))
+        elif is_pandas_dataframe(data):
+            import pandas as pd
+            frames = []
+            for name, x in results.items():
+                x = x.copy()
+                x.columns = prefixed(name, x.columns)
+                frames.append(x)
+            return pd.concat(frames, axis=1)
+        elif is_polars_dataframe(data):
+            import polars as pl
+            return pl.concat([x.rename(dict(zip(x.columns, prefixed(name, x.columns))))
+                              for name, x in results.items()], how='horizontal')
+        elif is_arrow_table(data):
+            import pyarrow as pa
+            arrays = [column for x in results.values() for column in x.columns]
+            names = [y for name, x in results.items() for y in prefixed(name, x.column_names)]
+            if isinstance(data, pa.RecordBatch):
+                return pa.RecordBatch.from_arrays(arrays, names=names)
+            return pa.Table.from_arrays(arrays, names=names)
+        raise PMMLError('Results of data type "{type}" can not be combined'.format(type=type(data).__name__))
+
+
+def _read_split(result):
+    import pandas as pd
+    from io import StringIO
+    return pd.read_json(StringIO(result), orient='split')
@@ -0,0 +1,216 @@
+#
+# Copyright (c) 2024 AutoDeployAI
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+Hot reload of models without downtime.
+
+A `ModelHandle` always points to the current version of a model. A replacement is loaded and warmed up aside, then
+swapped in atomically for new callers, while calls in flight keep the version they acquired. A replaced version is
+released in the JVM as soon as its last call finishes.
+"""
+
+import logging
+import os
+from concurrent.futures import Future
+from contextlib import contextmanager
+from threading import Event, Lock, Thread
+
+from pypmml.jvm import PMMLError
+from pypmml.metrics import Counter
+from pypmml.model import Model
+
+logger = logging.getLogger(__name__)
+
+
+class _Version(object):
+    __slots__ = ('model', 'number', 'refs', 'retired')
+
+    def __init__(self, model, number):
+        self.model = model
+        self.number = number
+        self.refs = 0
+        self.retired = False
+
+
+class ModelHandle(object):
+    """A handle to the current version of a model, that is reloaded without downtime.
+
+    :param source: PMML in any formats that `Model.load` accepts, a file path is watched if `watch` is True.
+    :param warmup: data to predict with a new version before it is swapped in, by default a record of
+        missing values of all `inputNames`.
+    :param watch: whether to reload the model when the file of `source` changes.
+    :param interval: the seconds between two checks of the file.
+    :param loader: a function to load a model from source, `Model.load` by default.
+    """
+
+    def __init__(self, source, warmup=None, watch=False, interval=1.0, loader=None):
+        self.source = source
+        self.warmup = warmup
+        self.interval = interval
+        self.loader = loader or Model.load
+        self.reloads = Counter()
+        self.failures = Counter()
+        self.last_error = None
+        self._lock = Lock()
+        self._reload_lock = Lock()
+        self._stat = self._file_stat()
+        self._current = _Version(self._load(source), 1)
+        self._stopped = Event()
+        self._watcher = None
+        if watch:
+            if self._stat is None:
+                raise PMMLError('Only models of file paths can be watched')
+            self._watcher = Thread(target=self._watch, name='pypmml-model-watcher', daemon=True)
+            self._watcher.start()
+
+    @property
+    def version(self):
+        """The number of the current version, starting from 1."""
+        return self._current.number
+
+    @contextmanager
+    def acquire(self):
+        """Acquire the current version of the model, that is not released until the block exits. Calls of the
+        model are only safe inside the block, a replaced version is released as soon as its last block exits."""
+        with self._lock:
+            version = self._current
+            if version.model is None:
+                raise PMMLError('Model handle is closed')
+            version.refs += 1
+        try:
+            yield version.model
+        finally:
+            self._unref(version)
+
+    def predict(self, data, **kwargs):
+        """Predict with the current version of the model, see `Model.predict`."""
+        with self.acquire() as model:
+            return model.predict(data, **kwargs)
+
+    def reload(self, source=None, wait=True):
+        """
+        Load and warm up a new version of the model from `source`, or from the current source if it is None,
+        then swap it in. The current version keeps serving if it fails.
+
+        :param wait: whether to wait for the reload, or to run it in a background thread and return a `Future`
+            of the new version number.
+        :return: the new version number if `wait` is True.
+        """
+        if wait:
+            return self._reload(source)
+
+        future = Future()
+
+        def run():
+            try:
+                future.set_result(self._reload(source))
+            except Exception as e:
+                future.set_exception(e)
+
+        Thread(target=run, name='pypmml-model-reload', daemon=True).start()
+        return future
+
+    def close(self):
+        """Stop watching the file, and release the current version once its calls finish."""
+        self._stopped.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+        with self._lock:
+            version = self._current
+            version.retired = True
+        self._release_if_idle(version)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _load(self, source):
+        model = self.loader(source)
+        try:
+            warmup = self.warmup
+            if warmup is None:
+                warmup = {x: None for x in model.inputNames}
+            model.predict(warmup)
+        except Exception:
+            model.release()
+            raise
+        return model
+
+    def _reload(self, source):
+        with self._reload_lock:
+            source = self.source if source is None else source
+            stat = self._file_stat(source)
+            try:
+                model = self._load(source)
+            except Exception as e:
+                self.failures.inc()
+                self.last_error = e
+                logger.error('Failed to reload the model, the version %d keeps serving: %s', self.version, e)
+                raise
+
+            with self._lock:
+                old = self._current
+                self._current = _Version(model, old.number + 1)
+                old.retired = True
+            self.source = source
+            self._stat = stat
+            self.reloads.inc()
+            logger.info('Model version %d is swapped in', self._current.number)
+            self._release_if_idle(old)
+            return self._current.number
+
+    def _unref(self, version):
+        with self._lock:
+            version.refs -= 1
+        self._release_if_idle(version)
+
+    def _release_if_idle(self, version):
+        # Take the model out of the version under the lock, so that it is released only once
+        with self._lock:
+            if not version.retired or version.refs > 0 or version.model is None:
+                return
+            model, version.model = version.model, None
+        model.release()
+
+    def _file_stat(self, source=None):
+        source = self.source if source is None else source
+        if isinstance(source, str) and not source.lstrip().startswith('<') and os.path.isfile(source):
+            st = os.stat(source)
+            return st.st_mtime_ns, st.st_size
+        return None
+
+    def _watch(self):
+        pending = None
+        while not self._stopped.wait(self.interval):
+            try:
+                stat = self._file_stat()
+            except OSError:
+                continue
+            if stat is None or stat == self._stat:
+                pending = None
+            elif stat != pending:
+                # Wait for another check to see the file unchanged, so that a file being written is not loaded
+                pending = stat
+            else:
+                pending = None
+                try:
+                    self._reload(None)
+                except Exception:
+                    # Not retried until the file changes again
+                    self._stat = stat
@@ -15,10 +15,15 @@
 #
 from abc import ABC, abstractmethod
 import os
+from threading import Lock
 
 class PMMLError(Exception):
     """Base exception of PyPMML"""
 
+
+class DeadlineExceeded(PMMLError):
+    """A call did not finish before its deadline, or was cancelled"""
+
 class JVMGateway(ABC):
     """Base class of JVM gateway"""
     def __init__(self):
@@ -36,17 +41,30 @@ class JVMGateway(ABC):
             os.path.join(os.path.dirname(os.path.abspath(__file__)), 'jars')
         self.classpath = os.path.join(jars_dir, "*")
 
+        # Workload profile
+        self.profile = None
+
+        # Pool of threads in the JVM for calls with deadlines
+        self._pool = None
+        self._pool_lock = Lock()
+
     @abstractmethod
-    def launch_gateway(self, java_opts=None, java_path=None):
+    def launch_gateway(self, java_opts=None, java_path=None, profile=None):
         """Launch a `Gateway` in a new Java process.
         :param java_opts: an array of extra options to pass to Java (the classpath
             should be specified using the `classpath` parameter, not `javaopts`.)
         :param java_path: If None, JVM gateway will use $JAVA_HOME/bin/java if $JAVA_HOME
             is defined, otherwise it will use "java".
+        :param profile: a workload profile of `pypmml.profiles.PROFILES` to configure the heap,
+            the garbage collector and JIT, options in `java_opts` and $JAVA_OPTS take precedence.
         """
         if java_opts:
             self.java_opts.extend(java_opts)
+        if profile is not None:
+            from .profiles import merge_java_opts, profile_java_opts
+            self.java_opts = merge_java_opts(profile_java_opts(profile), self.java_opts)
         self.java_path = java_path
+        self.profile = profile
 
     def call_java_func(self, func, *args):
         result = func(*args)
@@ -60,6 +78,144 @@ class JVMGateway(ABC):
     def call_java_static_func(self, class_name, func_name, *args):
         return None
 
+    def java_exceptions(self):
+        """Return a tuple of exception types raised by calls of Java methods."""
+        return ()
+
+    def new_args(self, *args):
+        """Copy arguments into an array of Java objects, that stays in the JVM to be passed to `invoke` many
+        times without being copied again."""
+        raise PMMLError('Gateway "{name}" does not support shared arguments'.format(name=self.name()))
+
+    def find_method(self, java_object, func_name, arg_types):
+        """Find a public method of a Java object by the fully-qualified class names of its parameters."""
+        raise PMMLError('Gateway "{name}" does not support reflection'.format(name=self.name()))
+
+    def invoke(self, method, java_object, java_args):
+        """Invoke a method of `find_method` with arguments of `new_args`."""
+        raise PMMLError('Gateway "{name}" does not support reflection'.format(name=self.name()))
+
+    def bind_method(self, java_object, func_name, arg_types):
+        """Return a method handle of a method bound to a Java object, that is called by `submit`."""
+        handles = self.java_class('java.lang.invoke.MethodHandles')
+        return handles.publicLookup().unreflect(self.find_method(java_object, func_name, arg_types)) \
+            .bindTo(java_object)
+
+    def replacing_method(self, java_object, func_name, target, replacement):
+        """Compose a method of String to String of a Java object with the replacement of all `target` by
+        `replacement` in its argument, that runs in the JVM and is called by `call_handle`, so a long replacement
+        only crosses the gateway once."""
+        handles = self.java_class('java.lang.invoke.MethodHandles')
+        string_type = self.java_class('java.lang.Class').forName('java.lang.String')
+        method_type = self.java_class('java.lang.invoke.MethodType').fromMethodDescriptorString(
+            '(Ljava/lang/CharSequence;Ljava/lang/CharSequence;)Ljava/lang/String;', None)
+        replace = handles.insertArguments(handles.publicLookup().findVirtual(string_type, 'replace', method_type), 1,
+                                          self.new_args(target, replacement))
+        return handles.filterReturnValue(replace, self.bind_method(java_object, func_name, ['java.lang.String']))
+
+    def call_handle(self, handle, *args):
+        """Call a method handle in the JVM, e.g. of `replacing_method`."""
+        try:
+            result = handle.invokeWithArguments(self.new_args(*args))
+        except self.java_exceptions() as e:
+            error = self.java_throwable(e)
+            raise PMMLError(str(error.getMessage()))
+        return self.java2py(result)
+
+    def submit(self, method, *args):
+        """Submit a call of a method of `bind_method` to a pool of threads in the JVM, return its Java `Future`."""
+        handles = self.java_class('java.lang.invoke.MethodHandles')
+        proxies = self.java_class('java.lang.invoke.MethodHandleProxies')
+        task = proxies.asInterfaceInstance(self.java_class('java.lang.Class').forName('java.util.concurrent.Callable'),
+                                           handles.insertArguments(method, 0, self.new_args(*args)))
+        with self._pool_lock:
+            if self._pool is None:
+                cpus = self.java_class('java.lang.Runtime').getRuntime().availableProcessors()
+                # Threads of a ForkJoinPool are daemons, that never block the shutdown of the JVM
+                self._pool = self.java_class('java.util.concurrent.ForkJoinPool')(max(4, cpus * 2))
+            pool = self._pool
+        return pool.submit(task)
+
+    def wait(self, future, timeout):
+        """Wait for the result of a `Future` for at most `timeout` seconds, raise `DeadlineExceeded` if it is not
+        done yet, the call keeps running until it is cancelled."""
+        unit = self.java_class('java.util.concurrent.TimeUnit').MICROSECONDS
+        try:
+            result = future.get(max(0, int(timeout * 1e6)), unit)
+        except self.java_exceptions() as e:
+            error = self.java_throwable(e)
+            if error.getClass().getName() == 'java.util.concurrent.TimeoutException':
+                raise DeadlineExceeded('Deadline exceeded')
+            cause = error.getCause() or error
+            raise PMMLError(str(cause.getMessage()))
+        return self.java2py(result)
+
+    def serialized_size(self, java_object):
+        """Return the bytes of the Java serialization of the object graph of a Java object, the bytes are counted
+        and discarded into the null device in the JVM, never kept nor copied to Python."""
+        # DataOutputStream counts the bytes written through it, up to 2g
+        output = self.java_class('java.io.DataOutputStream')(self.java_class('java.io.BufferedOutputStream')(
+            self.java_class('java.io.FileOutputStream')(os.devnull), 1 << 16))
+        stream = self.java_class('java.io.ObjectOutputStream')(output)
+        try:
+            stream.writeObject(java_object)
+            stream.flush()
+        except self.java_exceptions() as e:
+            raise PMMLError('Object not serializable: {message}'.format(message=self.java_throwable(e).getMessage()))
+        finally:
+            stream.close()
+        return int(output.size())
+
+    def heap_used(self, collect=False):
+        """Return the bytes of the heap in use, after a full garbage collection if `collect` is True."""
+        memory = self.java_class('java.lang.management.ManagementFactory').getMemoryMXBean()
+        if collect:
+            memory.gc()
+        return int(memory.getHeapMemoryUsage().getUsed())
+
+    def java_class(self, class_name):
+        """Return a class of Java, whose static members and constructors are called from Python."""
+        raise PMMLError('Gateway "{name}" does not support classes of Java'.format(name=self.name()))
+
+    def java_throwable(self, e):
+        """Return the Java exception of an exception raised by a call of Java."""
+        return e
+
+    def supports_compression(self):
+        """Whether payloads crossing the gateway can be compressed, False if they are not copied between processes."""
+        return False
+
+    def compressed_method(self, java_object, func_name):
+        """Compose a method of String to String of a Java object with the decompression of its argument and the
+        compression of its result in the JVM, that is called by `call_compressed`."""
+        raise PMMLError('Gateway "{name}" does not support compression'.format(name=self.name()))
+
+    def call_compressed(self, method, data, level):
+        """Call a method of `compressed_method` with an argument of UTF-8 bytes compressed by zlib, return the
+        result compressed by zlib at the given level."""
+        raise PMMLError('Gateway "{name}" does not support compression'.format(name=self.name()))
+
+    def supports_shared_memory(self):
+        """Whether payloads can be exchanged through memory mapped by both processes, False if the JVM runs in
+        process."""
+        return False
+
+    def map_shared(self, path, size):
+        """Map a file of shared memory into the JVM, return its Java `ByteBuffer`."""
+        raise PMMLError('Gateway "{name}" does not support shared memory'.format(name=self.name()))
+
+    def shared_method(self, java_object, func_name):
+        """Compose a method of String to String of a Java object with the decoding of its argument from a slice of
+        a shared buffer and the encoding of its result into another slice in the JVM, that is called by
+        `call_shared`."""
+        raise PMMLError('Gateway "{name}" does not support shared memory'.format(name=self.name()))
+
+    def call_shared(self, method, buffer, input_offset, input_length, output_offset, output_capacity):
+        """Call a method of `shared_method` with an argument of UTF-8 bytes in a shared buffer, return the number of
+        bytes of the result written at `output_offset`, or the bytes of the result if they do not fit in
+        `output_capacity`."""
+        raise PMMLError('Gateway "{name}" does not support shared memory'.format(name=self.name()))
+
     @abstractmethod
     def detach(self, java_object):
         pass
@@ -75,25 +231,31 @@ class JVMGateway(ABC):
 
 class JPypeGateway(JVMGateway):
     """JPype: """
-    import jpype
-    import jpype.imports
-    import importlib
-    from jpype import JArray, JObject
-
     JavaException = None
 
     def __init__(self):
         super().__init__()
+        # JPype is imported only when the gateway is selected
+        import jpype
+        import jpype.imports
+        import importlib
+        from jpype import JArray, JObject
+
+        self.jpype = jpype
+        self.importlib = importlib
+        self.JArray = JArray
+        self.JObject = JObject
         JPypeGateway._gateway = None
 
-    def launch_gateway(self, java_opts=None, java_path=None):
+    def launch_gateway(self, java_opts=None, java_path=None, profile=None):
         """Launch a `Gateway` in a new Java process.
         :param java_opts: an array of extra options to pass to Java (the classpath
             should be specified using the `classpath` parameter, not `javaopts`.)
         :param java_path: If None, JVM gateway will use $JAVA_HOME/bin/java if $JAVA_HOME
             is defined, otherwise it will use "java".
+        :param profile: a workload profile of the JVM, see `pypmml.profiles`.
         """
-        super().launch_gateway(java_opts=java_opts, java_path=java_path)
+        super().launch_gateway(java_opts=java_opts, java_path=java_path, profile=profile)
         self.jpype.startJVM(*self.java_opts, jvmpath=self.java_path, classpath=self.classpath, convertStrings=True)
 
     def java2py(self, r):
@@ -132,6 +294,45 @@ class JPypeGateway(JVMGateway):
         except self.jpype.JException as e:
             raise PMMLError(e.message())
 
+    def java_exceptions(self):
+        return (self.jpype.JException,)
+
+    def new_args(self, *args):
+        return self.JArray(self.JObject)(list(args))
+
+    def java_class(self, class_name):
+        return self.jpype.JClass(class_name)
+
+    def wait(self, future, timeout):
+        result = super().wait(future, timeout)
+        # Results of futures are not converted
+        if isinstance(result, self.jpype.JString):
+            return str(result)
+        return result
+
+    def call_handle(self, handle, *args):
+        result = super().call_handle(handle, *args)
+        # Results of method handles are not converted
+        if isinstance(result, self.jpype.JString):
+            return str(result)
+        return result
+
+    def find_method(self, java_object, func_name, arg_types):
+        class_type = self.jpype.JClass('java.lang.Class')
+        types = self.JArray(class_type)([self.jpype.JClass(x).class_ for x in arg_types])
+        return java_object.getClass().getMethod(func_name, types)
+
+    def invoke(self, method, java_object, java_args):
+        try:
+            result = method.invoke(java_object, java_args)
+        except self.jpype.JException as e:
+            cause = e.getCause() or e
+            raise PMMLError(str(cause.getMessage()))
+        # Results of reflection are not converted
+        if isinstance(result, self.jpype.JString):
+            return str(result)
+        return self.java2py(result)
+
     def detach(self, java_object):
         pass
 
@@ -143,27 +344,33 @@ class JPypeGateway(JVMGateway):
 
 class Py4jGateway(JVMGateway):
     """Py4j"""
-    from py4j.java_collections import JavaArray, JavaList
-    from py4j.java_gateway import JavaObject
-    from py4j.protocol import Py4JJavaError
-
     _gateway = None
     _jvm = None
 
     def __init__(self):
         super().__init__()
+        # Py4j is imported only when the gateway is selected
+        from py4j.java_collections import JavaArray, JavaList
+        from py4j.java_gateway import JavaObject
+        from py4j.protocol import Py4JJavaError
+
+        self.JavaArray = JavaArray
+        self.JavaList = JavaList
+        self.JavaObject = JavaObject
+        self.Py4JJavaError = Py4JJavaError
         Py4jGateway._gateway = None
 
-    def launch_gateway(self, java_opts=None, java_path=None):
+    def launch_gateway(self, java_opts=None, java_path=None, profile=None):
         """Launch a `Gateway` in a new Java process.
         :param java_opts: an array of extra options to pass to Java (the classpath
             should be specified using the `classpath` parameter, not `java_opts`.)
         :param java_path: If None, Py4J will use $JAVA_HOME/bin/java if $JAVA_HOME
             is defined, otherwise it will use "java".
+        :param profile: a workload profile of the JVM, see `pypmml.profiles`.
         """
         from py4j.java_gateway import JavaGateway, launch_gateway, GatewayParameters
 
-        super().launch_gateway(java_opts=java_opts, java_path=java_path)
+        super().launch_gateway(java_opts=java_opts, java_path=java_path, profile=profile)
         if Py4jGateway._gateway is None:
             _port = launch_gateway(classpath=self.classpath, javaopts=self.java_opts, java_path=self.java_path, die_on_exit=True)
             Py4jGateway._gateway = JavaGateway(gateway_parameters=GatewayParameters(port=_port, auto_convert=True))
@@ -174,6 +381,169 @@ class Py4jGateway(JVMGateway):
             Py4jGateway._gateway.shutdown()
             Py4jGateway._gateway = None
 
+    def java_exceptions(self):
+        return (self.Py4JJavaError,)
+
+    def java_class(self, class_name):
+        return getattr(Py4jGateway._jvm, class_name)
+
+    def java_throwable(self, e):
+        return e.java_exception
+
+    def new_args(self, *args):
+        array = Py4jGateway._gateway.new_array(Py4jGateway._jvm.java.lang.Object, len(args))
+        for i, x in enumerate(args):
+            array[i] = x
+        return array
+
+    def find_method(self, java_object, func_name, arg_types):
+        class_type = Py4jGateway._jvm.java.lang.Class
+        types = Py4jGateway._gateway.new_array(class_type, len(arg_types))
+        for i, x in enumerate(arg_types):
+            types[i] = class_type.forName(x)
+        return java_object.getClass().getMethod(func_name, types)
+
+    def invoke(self, method, java_object, java_args):
+        try:
+            return self.java2py(method.invoke(java_object, java_args))
+        except self.Py4JJavaError as e:
+            je = e.java_exception
+            cause = je.getCause() or je
+            raise PMMLError(cause.getMessage())
+
+    def supports_compression(self):
+        return True
+
+    def compressed_method(self, java_object, func_name):
+        # Byte arrays are always copied to Python by Py4j, so the payloads are only passed as streams, and the
+        # steps between them are composed into one method handle that runs in the JVM
+        jvm = Py4jGateway._jvm
+        handles = jvm.java.lang.invoke.MethodHandles
+        lookup = handles.publicLookup()
+        class_type = jvm.java.lang.Class
+        utf8 = self.new_args(jvm.java.nio.charset.StandardCharsets.UTF_8)
+        string_type = class_type.forName('java.lang.String')
+
+        def method(cls, name, *arg_types):
+            types = Py4jGateway._gateway.new_array(class_type, len(arg_types))
+            for i, x in enumerate(arg_types):
+                types[i] = class_type.forName(x)
+            return lookup.unreflect(cls.getMethod(name, types))
+
+        func = lookup.unreflect(self.find_method(java_object, func_name, ['java.lang.String'])).bindTo(java_object)
+        try:
+            # Java 9+
+            read = method(class_type.forName('java.io.InputStream'), 'readAllBytes')
+            types = Py4jGateway._gateway.new_array(class_type, 2)
+            types[0] = class_type.forName('[B')
+            types[1] = class_type.forName('java.nio.charset.Charset')
+            decode = handles.insertArguments(lookup.unreflectConstructor(string_type.getConstructor(types)), 1, utf8)
+            read = handles.filterReturnValue(read, decode)
+            scanner = False
+        except self.Py4JJavaError:
+            read = method(class_type.forName('java.util.Scanner'), 'next')
+            scanner = True
+        encode = handles.insertArguments(method(string_type, 'getBytes', 'java.nio.charset.Charset'), 1, utf8)
+        write = method(class_type.forName('java.io.OutputStream'), 'write', '[B')
+        return handles.filterReturnValue(handles.filterReturnValue(read, func), encode), write, scanner
+
+    def call_compressed(self, method, data, level):
+        jvm = Py4jGateway._jvm
+        composed, write, scanner = method
+        source = jvm.java.util.zip.InflaterInputStream(jvm.java.io.ByteArrayInputStream(data))
+        if scanner:
+            source = jvm.java.util.Scanner(source, 'UTF-8').useDelimiter('\\A')
+        output = jvm.java.io.ByteArrayOutputStream()
+        deflater = jvm.java.util.zip.Deflater(level)
+        target = jvm.java.util.zip.DeflaterOutputStream(output, deflater)
+        try:
+            jvm.java.lang.invoke.MethodHandles.filterReturnValue(composed, write.bindTo(target)) \
+                .invokeWithArguments(self.new_args(source))
+            target.close()
+        except self.Py4JJavaError as e:
+            je = e.java_exception
+            raise PMMLError(je.getMessage())
+        finally:
+            deflater.end()
+        return output.toByteArray()
+
+    def supports_shared_memory(self):
+        return True
+
+    def map_shared(self, path, size):
+        jvm = Py4jGateway._jvm
+        mode = getattr(jvm, 'java.nio.channels.FileChannel$MapMode').READ_WRITE
+        f = jvm.java.io.RandomAccessFile(path, 'rw')
+        try:
+            # The mapping stays valid after the file is closed
+            return f.getChannel().map(mode, 0, size)
+        except self.Py4JJavaError as e:
+            raise PMMLError(e.java_exception.getMessage())
+        finally:
+            f.close()
+
+    def shared_method(self, java_object, func_name):
+        # Slices of the shared buffer are decoded, scored, and encoded into the output slice in one method handle
+        # that runs in the JVM, only the result of an overflow of the output slice crosses the socket
+        jvm = Py4jGateway._jvm
+        handles = jvm.java.lang.invoke.MethodHandles
+        lookup = handles.publicLookup()
+        class_type = jvm.java.lang.Class
+        utf8 = jvm.java.nio.charset.StandardCharsets.UTF_8
+        buffer_type = class_type.forName('java.nio.ByteBuffer')
+        object_type = class_type.forName('java.lang.Object')
+
+        def method(cls, name, *arg_types):
+            types = self._array(class_type, [class_type.forName(x) for x in arg_types])
+            return lookup.unreflect(class_type.forName(cls).getMethod(name, types))
+
+        def method_type(return_type, *arg_types):
+            return jvm.java.lang.invoke.MethodType.methodType(return_type, self._array(class_type, arg_types))
+
+        func = lookup.unreflect(self.find_method(java_object, func_name, ['java.lang.String'])).bindTo(java_object)
+        decode = handles.filterReturnValue(method('java.nio.charset.Charset', 'decode', 'java.nio.ByteBuffer')
+                                           .bindTo(utf8), method('java.nio.CharBuffer', 'toString'))
+        encode = handles.insertArguments(method('java.lang.String', 'getBytes', 'java.nio.charset.Charset'), 1,
+                                         self.new_args(utf8))
+        score = handles.filterReturnValue(handles.filterReturnValue(decode, func), encode)
+
+        # (output, bytes) -> the number of bytes written, or the bytes if they overflow the output
+        bytes_type = class_type.forName('[B')
+        position = method('java.nio.Buffer', 'position').asType(method_type(jvm.java.lang.Integer.TYPE, buffer_type))
+        write = handles.filterReturnValue(method('java.nio.ByteBuffer', 'put', '[B'), position) \
+            .asType(method_type(object_type, buffer_type, bytes_type))
+        overflow = class_type.forName('java.nio.BufferOverflowException')
+        keep = handles.dropArguments(handles.identity(object_type), 0, self._array(class_type, [overflow, buffer_type])) \
+            .asType(method_type(object_type, overflow, buffer_type, bytes_type))
+        write = handles.catchException(write, overflow, keep)
+
+        # (output, input) -> the number of bytes written, or the bytes
+        composed = handles.filterArguments(write, 1, self._array(jvm.java.lang.invoke.MethodHandle, [score]))
+        function = class_type.forName('java.util.function.BiFunction')
+        return jvm.java.lang.invoke.MethodHandleProxies.asInterfaceInstance(
+            function, composed.asType(jvm.java.lang.invoke.MethodType.genericMethodType(2)))
+
+    def call_shared(self, method, buffer, input_offset, input_length, output_offset, output_capacity):
+        def region(offset, length):
+            # ByteBuffer.slice(int, int) is only in Java 13+
+            view = buffer.duplicate()
+            view.position(offset)
+            view.limit(offset + length)
+            return view.slice()
+
+        try:
+            return method.apply(region(output_offset, output_capacity), region(input_offset, input_length))
+        except self.Py4JJavaError as e:
+            je = e.java_exception
+            cause = je.getCause() or je
+            raise PMMLError(cause.getMessage())
+
+    def _array(self, element_type, items):
+        array = Py4jGateway._gateway.new_array(element_type, len(items))
+        for i, x in enumerate(items):
+            array[i] = x
+        return array
+
     def detach(self, java_object):
         Py4jGateway._gateway.detach(java_object)
 
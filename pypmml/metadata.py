@@ -42,6 +42,18 @@ class Field(JavaModelWrapper):
     def valuesAsString(self):
         return self.call('valuesAsString')
 
+    @property
+    def isNumeric(self):
+        return self.call('isNumeric')
+
+    def isMissingValue(self, value):
+        """Whether the value is declared as missing by this field."""
+        return self.call('isMissingValue', value)
+
+    def isValidValue(self, value):
+        """Whether the value is valid for this field."""
+        return self.call('isValidValue', value)
+
 
 class OutputField(Field):
 
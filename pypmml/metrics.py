@@ -0,0 +1,103 @@
+#
+# Copyright (c) 2024 AutoDeployAI
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from collections import deque
+from threading import Lock
+import time
+
+
+class Counter(object):
+    """A thread-safe monotonically increasing counter."""
+
+    def __init__(self):
+        self._value = 0
+        self._lock = Lock()
+
+    def inc(self, n=1):
+        with self._lock:
+            self._value += n
+
+    @property
+    def value(self):
+        return self._value
+
+    def reset(self):
+        with self._lock:
+            self._value = 0
+
+
+class LatencyStats(object):
+    """Thread-safe latency statistics, percentiles are computed over the most recent samples.
+
+    :param window: the number of most recent samples kept for percentiles.
+    """
+
+    def __init__(self, window=1024):
+        self._lock = Lock()
+        self._samples = deque(maxlen=window)
+        self._count = 0
+        self._total = 0.0
+        self._max = 0.0
+
+    def observe(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+            self._count += 1
+            self._total += seconds
+            if seconds > self._max:
+                self._max = seconds
+
+    def time(self):
+        """Return a context manager that observes the elapsed time of its block."""
+        return _Timer(self)
+
+    @property
+    def count(self):
+        return self._count
+
+    def snapshot(self):
+        """Return a dict of count, mean, max and p50/p90/p99 in milliseconds."""
+        with self._lock:
+            samples = sorted(self._samples)
+            count, total, max_ = self._count, self._total, self._max
+
+        def percentile(p):
+            if not samples:
+                return 0.0
+            return samples[min(len(samples) - 1, int(p * len(samples)))] * 1000.0
+
+        return {
+            'count': count,
+            'mean_ms': total / count * 1000.0 if count else 0.0,
+            'max_ms': max_ * 1000.0,
+            'p50_ms': percentile(0.50),
+            'p90_ms': percentile(0.90),
+            'p99_ms': percentile(0.99),
+        }
+
+
+class _Timer(object):
+    def __init__(self, stats):
+        self._stats = stats
+        self._start = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._stats.observe(time.perf_counter() - self._start)
+        return False
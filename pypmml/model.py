@@ -14,20 +14,55 @@
 # limitations under the License.
 #
 
+import json
+import logging
+import numbers
 import os
+import time
+from threading import Lock
 
 from pypmml.base import JavaModelWrapper, PMMLContext
-from pypmml.jvm import PMMLError
+from pypmml.cache import canonicalize
+from pypmml.jvm import DeadlineExceeded, PMMLError
+from pypmml.metrics import Counter
 from pypmml.elements import Header
 from pypmml.metadata import Field, OutputField, DataDictionary, DataVal
-from pypmml.utils import is_nd_array, is_pandas_series, is_pandas_dataframe
+from pypmml.utils import is_nd_array, is_pandas_series, is_pandas_dataframe, is_scipy_sparse, \
+    is_polars_dataframe, is_arrow_table
+
+logger = logging.getLogger(__name__)
+
+# Loads in progress and loads started so far, a measurement of the heap around a load is only kept if no other load
+# overlapped it
+_account_lock = Lock()
+_active_loads = 0
+_started_loads = 0
 
 
 class Model(JavaModelWrapper):
     """A PMML model.
     """
+
+    # Rows of a chunk of batches scored with deadlines
+    chunk_size = 1024
+
+    # Whether to measure the heap retained by models at load, each load is surrounded by full GCs
+    account_memory = False
+
     def __init__(self, java_model):
         super(Model, self).__init__(java_model)
+        self._cache = None
+        self._input_names = None
+        self._native = None
+        self._source = None
+        self._supplement_output = False
+        self._fallbacks = Counter()
+        self._zero_fields = None
+        self._compression = None
+        self._transport = None
+        self._timeouts = Counter()
+        self._retained_bytes = None
+        self._serialized_bytes = None
 
     @property
     def version(self):
@@ -121,18 +156,189 @@ class Model(JavaModelWrapper):
 
     def setSupplementOutput(self, value):
         self.call('setSupplementOutput', value)
+        self._supplement_output = bool(value)
+        if value and self._native is not None:
+            # Supplement outputs are only available in the JVM
+            self._native = None
+        if self._cache is not None:
+            self._cache.clear()
         return self
 
-    def predict(self, data):
+    @property
+    def engine(self):
+        """The engine that scores this model, "native" or "jvm"."""
+        return 'native' if self._native is not None else 'jvm'
+
+    def setEngine(self, engine, cache_dir=None):
+        """
+        Select the engine to score this model, "jvm" by default, or "native" to compile it into NumPy code that
+        scores batches without the JVM, see `pypmml.native` for the supported models. Models that are not
+        supported keep being scored by the JVM.
+
+        :param cache_dir: a directory to cache the flat arrays of tree ensembles compiled by the native engine,
+            processes loading the same model map the cached arrays instead of compiling them again.
+        """
+        if engine == 'native':
+            self._native = self._compile_native(cache_dir)
+        elif engine == 'jvm':
+            self._native = None
+        else:
+            raise PMMLError('Engine "{engine}" not supported'.format(engine=engine))
+        if self._cache is not None:
+            self._cache.clear()
+        return self
+
+    def _compile_native(self, cache_dir=None):
+        from pypmml.native import MODEL_ELEMENTS, UnsupportedModelError, compile_model
+
+        model_element = self.modelElement
+        if self._source is None or self._supplement_output or model_element not in MODEL_ELEMENTS:
+            logger.info('Native engine does not support the %s, it is scored by the JVM', model_element)
+            return None
+
+        try:
+            native = compile_model(self._source, cache_dir)
+        except UnsupportedModelError as e:
+            logger.info('Native engine does not support the %s: %s, it is scored by the JVM', model_element, e)
+            return None
+
+        if native.inputNames != self.inputNames or native.outputNames != self.outputNames:
+            logger.info('Native engine does not match the fields of the %s, it is scored by the JVM', model_element)
+            return None
+        return native
+
+    @property
+    def cache(self):
+        """The result cache of this model, None if not enabled."""
+        return self._cache
+
+    def setCache(self, cache):
+        """
+        Memoize scoring results of repeated inputs in a `ResultCache`, None to disable it.
+
+        Records in dict, list, ndarray of NumPy, Series and DataFrame of Pandas are looked up by their
+        values ordered by `inputNames`, only the missed records of a batch are scored. JSON strings are
+        always scored.
+        """
+        if cache is not None:
+            cache.bind(self)
+        self._cache = cache
+        return self
+
+    @property
+    def compression(self):
+        """The compression of large payloads of this model, None if not enabled."""
+        return self._compression
+
+    def setCompression(self, compression):
+        """
+        Compress payloads of JSON above a threshold of size in both directions across the gateway, by a
+        `Compression`, None to disable it. It only takes effect with the gateway of Py4j, where payloads are copied
+        between processes.
+        """
+        self._compression = compression
+        return self
+
+    @property
+    def transport(self):
+        """The transport of large payloads of this model, None if they are sent through the gateway."""
+        return self._transport
+
+    def setTransport(self, transport):
+        """
+        Exchange payloads of JSON above a threshold of size with the JVM through a `SharedMemory` instead of the
+        socket of the gateway, None to disable it. It only takes effect with the gateway of Py4j, and takes
+        precedence over compression for the payloads it accepts.
+        """
+        self._transport = transport
+        return self
+
+    def _call_predict(self, payload, deadline=None):
+        """Score a payload of JSON, that is sent through shared memory or compressed if it is large enough, or in the
+        JVM until a deadline."""
+        if deadline is not None:
+            return deadline.run(self._pc, lambda: self.submit('predict', ['java.lang.String'], payload))
+        if self._transport is not None and self._transport.accepts(self, payload):
+            return self._transport.call(self, 'predict', payload)
+        if self._compression is not None:
+            return self._compression.call(self, 'predict', payload)
+        return self.call('predict', payload)
+
+    @property
+    def fallbacks(self):
+        """A counter of batches that could not be scored in one call, e.g. failed as a whole and were split to
+        isolate the failed rows."""
+        return self._fallbacks
+
+    def memory_footprint(self):
+        """
+        Return the memory used by this model in the JVM: `retained_bytes` is the growth of the heap after full
+        garbage collections around the load, measured if `Model.account_memory` is set before the load and no other
+        model was loaded at the same time, e.g. by `load_many`, otherwise None, and `serialized_bytes` is the
+        size of the Java serialization of the object graph of the model, that is computed in the JVM on the first
+        call, as a relative measure of models.
+        """
+        if self._java_model is None:
+            raise PMMLError('Model has been released')
+        if self._serialized_bytes is None:
+            self._serialized_bytes = self._pc.serialized_size(self._java_model)
+        return {
+            'retained_bytes': self._retained_bytes,
+            'serialized_bytes': self._serialized_bytes,
+        }
+
+    @property
+    def timeouts(self):
+        """A counter of calls that exceeded their deadlines or were cancelled, including batches returned in part."""
+        return self._timeouts
+
+    def predict(self, data, return_errors=False, columns=None, timeout=None):
         """
         Predict values for a given data.
 
         :param data:
-          Support dict, string in JSON, and Series, DataFrame of Pandas
+          Support dict, string in JSON, list, ndarray of NumPy, Series, DataFrame of Pandas, sparse matrices of
+          SciPy, DataFrame of Polars, and Table, RecordBatch of PyArrow
+        :param return_errors:
+          Rows of a 2-D ndarray that can not be scored are returned as rows of None, set True to return a tuple of
+          `(results, errors)` where errors is a list of dicts of the row `index` and its `error` message
+        :param columns:
+          Names of the columns of a sparse matrix, a list in order of columns or a dict of name to column index,
+          `inputNames` by default
+        :param timeout:
+          Seconds to wait for the results, or a `Deadline` that can also be cancelled from another thread. Records
+          raise `DeadlineExceeded` if they are not scored in time, 2-D ndarrays and DataFrames are scored in chunks of
+          `chunk_size` rows, and the rows that do not finish in time are returned as rows of missing values, with
+          their errors. The result cache, the transport of `setTransport` and the compression of `setCompression` are
+          not used, payloads are sent through the gateway as is
         :return:
-          Scoring results in the same format as input data
+          Scoring results in the same format as input data, a 2-D ndarray for a sparse matrix
         """
-        if isinstance(data, (dict, str, u"".__class__)):
+        errors = [] if return_errors else None
+        if timeout is not None:
+            from pypmml.deadline import Deadline
+            result = self._predict_deadline(data, errors, Deadline.of(timeout))
+        elif is_scipy_sparse(data):
+            result = self._predict_sparse(data, columns)
+        elif self._cache is not None:
+            result = self._predict_cached(data, errors)
+        else:
+            result = self._predict(data, errors)
+        return (result, errors) if return_errors else result
+
+    def _predict(self, data, errors=None, deadline=None):
+        if self._native is not None:
+            from pypmml.native import UnsupportedModelError
+            try:
+                return self._predict_native(data)
+            except UnsupportedModelError as e:
+                logger.debug('Native engine does not support the data: %s, it is scored by the JVM', e)
+
+        if isinstance(data, (str, u"".__class__)):
+            return self._call_predict(data, deadline)
+        elif isinstance(data, dict):
+            if deadline is not None:
+                return json.loads(self._call_predict(json.dumps([data], default=_json_default), deadline))[0]
             return self.call('predict', data)
         else:
             if isinstance(data, list):
@@ -148,51 +354,457 @@ class Model(JavaModelWrapper):
                 if data.ndim == 1:
                     return self.call('predict', data.tolist())
                 elif data.ndim == 2:
-                    try:
-                        import pandas as pd
-                        from io import StringIO
-                        data = pd.DataFrame(data, columns=self.inputNames)
-                        json_data = data.to_json(orient='split', index=False)
-                        result = self.call('predict', json_data)
-                        return pd.read_json(StringIO(result), orient='split').values
-                    except:
-                        return [self.call('predict', record.tolist()) for record in data]
+                    return self._predict_matrix(data, errors, deadline)
                 else:
                     raise PMMLError('Max 2 dimensions are supported')
             elif is_pandas_dataframe(data):
                 import pandas as pd
                 from io import StringIO
                 json_data = data.to_json(orient='split', index=False)
-                result = self.call('predict', json_data)
+                result = self._call_predict(json_data, deadline)
                 return pd.read_json(StringIO(result), orient='split')
             elif is_pandas_series(data):
                 import pandas as pd
                 record = data.to_dict()
                 result = self.call('predict', record)
                 return pd.DataFrame.from_records([result]).iloc[0]
+            elif is_polars_dataframe(data) or is_arrow_table(data):
+                return self._predict_arrow(data)
             else:
                 raise PMMLError('Data type "{type}" not supported'.format(type=type(data).__name__))
 
+    def _predict_deadline(self, data, errors, deadline):
+        """Score data before a deadline, batches are scored in chunks, and no chunk is started after the deadline."""
+        if isinstance(data, list) and data and isinstance(data[0], list):
+            # Records are scored one by one as without a deadline, so that values keep their types
+            results = []
+            message = None
+            for record in data:
+                try:
+                    results.append(self._predict_deadline(record, None, deadline))
+                except DeadlineExceeded as e:
+                    message = str(e)
+                    break
+            n, done = len(data), len(results)
+            if done < n:
+                # Counted once by the record that exceeded the deadline
+                logger.warning('%d of %d rows are not scored before the deadline: %s', n - done, n, message)
+                if errors is not None:
+                    errors.extend({'index': i, 'error': message} for i in range(done, n))
+                results.extend([None] * len(self.outputNames) for _ in range(done, n))
+            return results
+        elif isinstance(data, list) or (is_nd_array(data) and data.ndim == 1):
+            values = data.tolist() if is_nd_array(data) else data
+            result = self._predict_deadline(dict(zip(self.inputNames, values)), errors, deadline)
+            return [result.get(x) for x in self.outputNames]
+        elif is_pandas_series(data):
+            import pandas as pd
+            result = self._predict_deadline(data.to_dict(), errors, deadline)
+            return pd.DataFrame.from_records([result]).iloc[0]
+        elif not (is_nd_array(data) and data.ndim == 2) and not is_pandas_dataframe(data):
+            if is_scipy_sparse(data) or is_polars_dataframe(data) or is_arrow_table(data):
+                raise PMMLError('Deadlines of data type "{type}" not supported'.format(type=type(data).__name__))
+            try:
+                deadline.check()
+                return self._predict(data, errors, deadline)
+            except DeadlineExceeded:
+                self._timeouts.inc()
+                raise
+
+        n = len(data)
+        parts = []
+        done = 0
+        message = None
+        while done < n:
+            end = min(n, done + self.chunk_size)
+            failures = []
+            try:
+                deadline.check()
+                chunk = data.iloc[done:end] if is_pandas_dataframe(data) else data[done:end]
+                parts.append(self._predict(chunk, failures, deadline))
+            except DeadlineExceeded as e:
+                message = str(e)
+                break
+            if errors is not None:
+                errors.extend({'index': x['index'] + done, 'error': x['error']} for x in failures)
+            done = end
+
+        if done < n:
+            self._timeouts.inc()
+            logger.warning('%d of %d rows are not scored before the deadline: %s', n - done, n, message)
+            if errors is not None:
+                errors.extend({'index': i, 'error': message} for i in range(done, n))
+        elif len(parts) == 1:
+            return parts[0]
+
+        import pandas as pd
+        if is_pandas_dataframe(data):
+            result = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=self.outputNames)
+            return result.reindex(range(n))
+        from io import StringIO
+        rows = [row for x in parts for row in (x.tolist() if is_nd_array(x) else x)]
+        rows.extend([None] * len(self.outputNames) for _ in range(n - done))
+        result = json.dumps({'columns': self.outputNames, 'data': _nan_to_none(rows)}, separators=(',', ':'))
+        return pd.read_json(StringIO(result), orient='split').values
+
+    def _predict_matrix(self, data, errors=None, deadline=None):
+        """Score rows of a 2-D ndarray in one call of JSON. Rows of unsupported values are not sent, and if the JVM
+        fails the batch as a whole, it is split in halves repeatedly to isolate the failed rows, that are returned
+        as rows of None. If both halves of the batch fail with the error of the batch, e.g. of a type of a column,
+        all rows fail with it, and rows are never isolated in more calls than rows."""
+        from io import StringIO
+        try:
+            import pandas as pd
+        except ImportError:
+            self._fallbacks.inc()
+            logger.warning('Pandas is required to score a 2-D ndarray in batch, %d rows are scored one by one',
+                           len(data))
+            return [self.call('predict', record.tolist()) for record in data]
+
+        names = self.inputNames
+        if data.shape[1] != len(names):
+            # Rows that are not of inputNames are scored one by one as before
+            self._fallbacks.inc()
+            logger.warning('Expected %d columns of inputNames, got %d, %d rows are scored one by one',
+                           len(names), data.shape[1], len(data))
+            return [self.call('predict', record.tolist()) for record in data]
+
+        rows, failures = _json_rows(data, names)
+        results = [None] * len(rows)
+        exceptions = (PMMLError, ValueError) + self._pc.java_exceptions()
+        batch = [i for i in range(len(rows)) if i not in failures]
+
+        def call(indices):
+            if deadline is not None:
+                deadline.check()
+            return self._call_predict(json.dumps({'columns': names, 'data': [rows[i] for i in indices]},
+                                                 separators=(',', ':')), deadline)
+
+        def score(indices):
+            """Score the rows of indices into results, return the error if they fail."""
+            try:
+                result = json.loads(call(indices))
+            except DeadlineExceeded:
+                raise
+            except exceptions as e:
+                return str(e)
+            columns[:] = result['columns']
+            for i, row in zip(indices, result['data']):
+                results[i] = row
+            return None
+
+        columns = []
+        error = None
+        if batch and not failures:
+            try:
+                return pd.read_json(StringIO(call(batch)), orient='split').values
+            except DeadlineExceeded:
+                raise
+            except exceptions as e:
+                error = str(e)
+        elif batch:
+            error = score(batch)
+        if error is not None:
+            self._fallbacks.inc()
+            logger.warning('Batch of %d rows failed, isolating the failed rows: %s', len(batch), error)
+            pending = [(batch, error)]
+            # No more calls than scoring the rows one by one
+            calls = 0
+            while pending:
+                indices, error = pending.pop()
+                if len(indices) == 1 or calls + 2 > len(batch):
+                    failures.update((i, error) for i in indices)
+                    continue
+                middle = len(indices) // 2
+                halves = [(x, score(x)) for x in (indices[middle:], indices[:middle])]
+                calls += 2
+                if indices is batch and all(x[1] == error for x in halves):
+                    # Not some rows but the batch fails, e.g. of a type of a column
+                    failures.update((i, error) for i in batch)
+                    break
+                pending.extend(x for x in halves if x[1] is not None)
+
+        if failures:
+            logger.warning('%d of %d rows failed to score', len(failures), len(rows))
+            if errors is not None:
+                errors.extend({'index': i, 'error': failures[i]} for i in sorted(failures))
+        columns = columns or self.outputNames
+        data = _nan_to_none([row if row is not None else [None] * len(columns) for row in results])
+        result = json.dumps({'columns': columns, 'data': data}, separators=(',', ':'))
+        return pd.read_json(StringIO(result), orient='split').values
+
+    def _predict_sparse(self, data, columns=None, batch_size=1024):
+        """Score rows of a sparse matrix in calls of JSON records that only contain the stored entries, in batches of
+        `batch_size` rows. Implicit entries are zeros of numeric fields, except the fields that declare 0 as missing
+        or are categorical without a category of 0, where they are missing values. The zeros are not sent, they are
+        filled into each record in the JVM."""
+        import numpy as np
+
+        names = self.inputNames
+        if columns is None:
+            if data.shape[1] != len(names):
+                raise PMMLError('Expected {n} columns of inputNames, got {m}'.format(n=len(names), m=data.shape[1]))
+            columns = names
+        if isinstance(columns, dict):
+            mapping = [None] * data.shape[1]
+            for name, j in columns.items():
+                if not 0 <= j < data.shape[1]:
+                    raise PMMLError('Index {j} of column "{name}" out of range of {m} columns'.format(
+                        j=j, name=name, m=data.shape[1]))
+                mapping[j] = name
+        else:
+            if len(columns) != data.shape[1]:
+                raise PMMLError('Expected {n} names of columns, got {m}'.format(n=data.shape[1], m=len(columns)))
+            mapping = list(columns)
+        # Columns that are not inputs of the model are dropped
+        inputs = set(names)
+        mapping = [x if x in inputs else None for x in mapping]
+
+        if self._zero_fields is None:
+            self._zero_fields = _zero_fields(self.inputFields)
+        zeros = sorted(set(x for x in mapping if x is not None and x in self._zero_fields))
+        # Braces only delimit records, so the JVM prefixes each record with the zeros, that stored entries of the
+        # same names override
+        keys = [None if x is None else _json_key(x) for x in mapping]
+        template = ','.join(_json_key(x) + ':0' for x in zeros)
+
+        matrix = data.tocsr()
+        if not matrix.has_canonical_format:
+            matrix = matrix.copy()
+            matrix.sum_duplicates()
+        indptr = matrix.indptr.tolist()
+        indices = matrix.indices.tolist()
+        values = matrix.data
+        if values.dtype.kind == 'f':
+            # Stored NaN are missing values
+            values = np.where(np.isfinite(values), values, np.nan)
+        values = values.tolist()
+
+        output_names = self.outputNames
+        rows = []
+        for start in range(0, matrix.shape[0], batch_size):
+            records = []
+            for i in range(start, min(start + batch_size, matrix.shape[0])):
+                entries = ['{key}:{value}'.format(key=keys[indices[k]], value=_json_number(values[k]))
+                           for k in range(indptr[i], indptr[i + 1]) if keys[indices[k]] is not None]
+                if template:
+                    records.append('{' + ''.join(',' + x for x in entries) + '}')
+                else:
+                    records.append('{' + ','.join(entries) + '}')
+            payload = '[' + ','.join(records) + ']'
+            if template:
+                result = self.call_replaced('predict', '{', '{' + template, payload)
+            else:
+                result = self._call_predict(payload)
+            result = json.loads(result)
+            rows.extend([x.get(name) for name in output_names] for x in result)
+
+        try:
+            import pandas as pd
+            from io import StringIO
+        except ImportError:
+            return rows
+        result = json.dumps({'columns': output_names, 'data': rows}, separators=(',', ':'))
+        return pd.read_json(StringIO(result), orient='split').values
+
+    def _predict_arrow(self, data):
+        """Score a DataFrame of Polars, or a Table or RecordBatch of PyArrow in one call of JSON records, that are
+        written by Polars from the Arrow buffers directly if it is installed. Only the input columns are sent."""
+        input_names = set(self.inputNames)
+        names = [x for x in data.column_names if x in input_names] if is_arrow_table(data) else \
+            [x for x in data.columns if x in input_names]
+        if is_polars_dataframe(data):
+            payload = data.select(names).write_json()
+        else:
+            try:
+                import polars as pl
+                # Zero-copy for most of Arrow types
+                payload = pl.from_arrow(data.select(names)).write_json()
+            except ImportError:
+                records = [{x: None if isinstance(v, float) and not abs(v) < float('inf') else v
+                            for x, v in record.items()} for record in data.select(names).to_pylist()]
+                payload = json.dumps(records, separators=(',', ':'))
+
+        result = json.loads(self._call_predict(payload))
+        output_names = self.outputNames
+        return _arrow_like(data, output_names, [[x.get(name) for x in result] for name in output_names])
+
+    def _predict_native(self, data):
+        from pypmml.native import UnsupportedModelError
+
+        native = self._native
+        names = native.inputNames
+        if isinstance(data, dict):
+            return dict(zip(native.outputNames, native.predict_rows({x: [data.get(x)] for x in names}, 1)[0]))
+        elif isinstance(data, (str, u"".__class__)):
+            payload = json.loads(data)
+            if isinstance(payload, dict) and 'columns' in payload and 'data' in payload:
+                index = {x: i for i, x in enumerate(payload['columns'])}
+                rows = payload['data']
+                columns = {x: [row[index[x]] for row in rows] for x in names if x in index}
+                result = {'columns': native.outputNames, 'data': _nan_to_none(native.predict_rows(columns, len(rows)))}
+            elif isinstance(payload, list) and all(isinstance(x, dict) for x in payload):
+                columns = {x: [record.get(x) for record in payload] for x in names}
+                rows = _nan_to_none(native.predict_rows(columns, len(payload)))
+                result = [dict(zip(native.outputNames, x)) for x in rows]
+            else:
+                raise UnsupportedModelError('JSON payload not supported')
+            return json.dumps(result, separators=(',', ':'))
+        elif isinstance(data, list):
+            if not data:
+                return []
+            if isinstance(data[0], list):
+                columns = {x: [row[i] if i < len(row) else None for row in data] for i, x in enumerate(names)}
+                return native.predict_rows(columns, len(data))
+            return native.predict_rows({x: [data[i] if i < len(data) else None] for i, x in enumerate(names)}, 1)[0]
+        elif is_nd_array(data):
+            if data.ndim == 1:
+                return native.predict_rows({x: data[i:i + 1] for i, x in enumerate(names) if i < len(data)}, 1)[0]
+            elif data.ndim == 2:
+                if data.shape[1] != len(names):
+                    raise UnsupportedModelError('Columns of ndarray do not match inputNames')
+                return native.predict_frame({x: data[:, i] for i, x in enumerate(names)}, len(data)).values
+        elif is_pandas_dataframe(data):
+            return native.predict_frame({x: data[x].values for x in names if x in data.columns}, len(data))
+        elif is_pandas_series(data):
+            import pandas as pd
+            record = data.to_dict()
+            result = dict(zip(native.outputNames, native.predict_rows({x: [record.get(x)] for x in names}, 1)[0]))
+            return pd.DataFrame.from_records([result]).iloc[0]
+        elif is_polars_dataframe(data):
+            # Numeric columns without nulls are views of the Arrow buffers
+            columns = {x: data[x].to_numpy() for x in names if x in data.columns}
+            return _arrow_like(data, native.outputNames, native.predict_columns(columns, data.height))
+        elif is_arrow_table(data):
+            columns = {x: data.column(x).to_numpy(zero_copy_only=False) for x in names if x in data.column_names}
+            return _arrow_like(data, native.outputNames, native.predict_columns(columns, data.num_rows))
+        raise UnsupportedModelError('Data type "{type}" not supported'.format(type=type(data).__name__))
+
+    def _predict_cached(self, data, errors=None):
+        if self._input_names is None:
+            self._input_names = self.inputNames
+        input_names = self._input_names
+
+        if isinstance(data, dict):
+            result = self._cached('dict', [[data.get(x) for x in input_names]], lambda _: [self._predict(data)])
+            return dict(result[0])
+        elif isinstance(data, list):
+            if data and isinstance(data[0], list):
+                result = self._cached('list', data, lambda idx: [self._predict(data[i]) for i in idx])
+                return [list(x) for x in result]
+            elif data:
+                return list(self._cached('list', [data], lambda _: [self._predict(data)])[0])
+        elif is_nd_array(data):
+            if data.ndim == 1:
+                return list(self._cached('list', [data.tolist()], lambda _: [self._predict(data)])[0])
+            elif data.ndim == 2:
+                import pandas as pd
+
+                rows = data.tolist()
+                messages = {}
+
+                def score(idx):
+                    failures = []
+                    result = self._predict(data[idx], failures)
+                    for x in failures:
+                        messages[canonicalize(rows[idx[x['index']]])] = x['error']
+                    failed = set(x['index'] for x in failures)
+                    if not isinstance(result, list):
+                        result = result.tolist()
+                    # Failed rows are not cached
+                    return [None if i in failed else (None, tuple(x)) for i, x in enumerate(result)]
+
+                result = self._cached('matrix', rows, score)
+                width = next((len(x[1]) for x in result if x is not None), len(self.outputNames))
+                if errors is not None:
+                    errors.extend({'index': i, 'error': messages.get(canonicalize(rows[i]))}
+                                  for i, x in enumerate(result) if x is None)
+                return pd.DataFrame.from_records([x[1] if x is not None else (None,) * width for x in result]).values
+        elif is_pandas_dataframe(data):
+            import pandas as pd
+
+            def score(idx):
+                result = self._predict(data.iloc[idx])
+                columns = tuple(result.columns)
+                return [(columns, x) for x in result.itertuples(index=False, name=None)]
+
+            rows = data.reindex(columns=input_names).itertuples(index=False, name=None)
+            result = self._cached('frame', list(rows), score)
+            columns = next((x for x, _ in result if x is not None), None)
+            return pd.DataFrame.from_records([x for _, x in result], columns=columns)
+        elif is_pandas_series(data):
+            import pandas as pd
+            record = data.to_dict()
+            result = self._cached('dict', [[record.get(x) for x in input_names]], lambda _: [self._predict(record)])
+            return pd.DataFrame.from_records([result[0]]).iloc[0]
+        return self._predict(data)
+
+    def _cached(self, kind, rows, score):
+        """Look up the rows in cache, only the unique missed rows are passed to `score` by their indices."""
+        cache = self._cache
+        keys = [(kind, canonicalize(row)) for row in rows]
+        results = [None] * len(keys)
+        misses = {}
+        for i, key in enumerate(keys):
+            hit, value = cache.get(key)
+            if hit:
+                results[i] = value
+            else:
+                misses.setdefault(key, []).append(i)
+
+        if misses:
+            indices = [x[0] for x in misses.values()]
+            for i, value in zip(indices, score(indices)):
+                if value is not None:
+                    cache.put(keys[i], value)
+                for j in misses[keys[i]]:
+                    results[j] = value
+        return results
+
     @classmethod
     def fromFile(cls, name):
         """Load a model from PMML file with given pathname"""
-        pc = PMMLContext.getOrCreate()
-        java_model = pc.call_java_static_func("org.pmml4s.model.Model", "fromFile", name)
-        return cls(java_model)
+        model = cls._load_java("fromFile", name)
+        model._source = name
+        return model
 
     @classmethod
     def fromString(cls, s):
         """Load a model from PMML in a string"""
-        pc = PMMLContext.getOrCreate()
-        java_model = pc.call_java_static_func("org.pmml4s.model.Model", "fromString", s)
-        return cls(java_model)
+        model = cls._load_java("fromString", s)
+        model._source = s
+        return model
 
     @classmethod
     def fromBytes(cls, bytes_array):
         """Load a model from PMML in an array of bytes"""
+        model = cls._load_java("fromBytes", bytes_array)
+        model._source = bytes(bytes_array)
+        return model
+
+    @classmethod
+    def _load_java(cls, func_name, arg):
+        global _active_loads, _started_loads
         pc = PMMLContext.getOrCreate()
-        java_model = pc.call_java_static_func("org.pmml4s.model.Model", "fromBytes", bytes_array)
-        return cls(java_model)
+        account = cls.account_memory
+        with _account_lock:
+            _active_loads += 1
+            _started_loads += 1
+            started = _started_loads
+            alone = _active_loads == 1
+        try:
+            before = pc.heap_used(collect=True) if account and alone else None
+            java_model = pc.call_java_static_func("org.pmml4s.model.Model", func_name, arg)
+            after = pc.heap_used(collect=True) if before is not None else None
+        finally:
+            with _account_lock:
+                _active_loads -= 1
+                # The growth of the heap also includes the loads that overlapped this one
+                alone = alone and _started_loads == started
+        model = cls(java_model)
+        if after is not None and alone:
+            model._retained_bytes = max(0, after - before)
+        return model
 
     @classmethod
     def load(cls, f):
@@ -215,7 +827,149 @@ class Model(JavaModelWrapper):
         else:
             raise PMMLError('Input type "{type}" not supported'.format(type=type(f).__name__))
 
+    @classmethod
+    def load_many(cls, sources, max_workers=None):
+        """
+        Load many models concurrently, and yield a `LoadResult` of each of them as soon as it is ready, in order of
+        completion, so the ready models can serve before all of them are loaded. Each load is one call of the
+        gateway, and the calls run at once on their own threads of the JVM, that parse and build the models in
+        parallel.
+
+        :param sources: PMML in any formats that `load` accepts, e.g. file paths.
+        :param max_workers: the max number of models loaded at once, by default the number of cores available plus
+          4 to overlap the calls of the gateway, at most 32.
+        :return: an iterator of `LoadResult`, a failed load has its `error` instead of `model`.
+        """
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+        from pypmml.profiles import available_cpus
+
+        # The gateway is launched once before the calls of all threads
+        PMMLContext.getOrCreate()
+
+        def load(source):
+            start = time.perf_counter()
+            try:
+                return LoadResult(source, cls.load(source), None, time.perf_counter() - start)
+            except Exception as e:
+                return LoadResult(source, None, e, time.perf_counter() - start)
+
+        max_workers = max_workers or min(32, available_cpus() + 4)
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='pypmml-load')
+        futures = [executor.submit(load, x) for x in sources]
+        try:
+            for future in as_completed(futures):
+                result = future.result()
+                if result.error is not None:
+                    logger.warning('Failed to load model in %.3fs: %s', result.seconds, result.error)
+                yield result
+        finally:
+            # Loads not started yet are dropped if the caller stops iterating
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+
     @classmethod
     def close(cls):
         """Shutdown the gateway of JVM"""
         PMMLContext.shutdown()
+
+
+class LoadResult(object):
+    """A model loaded by `Model.load_many`.
+
+    :param source: the source of the model as given.
+    :param model: the loaded `Model`, None if the load failed.
+    :param error: the exception of a failed load, otherwise None.
+    :param seconds: the seconds spent to load the model.
+    """
+    __slots__ = ('source', 'model', 'error', 'seconds')
+
+    def __init__(self, source, model, error, seconds):
+        self.source = source
+        self.model = model
+        self.error = error
+        self.seconds = seconds
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __repr__(self):
+        name = self.source if isinstance(self.source, str) and len(self.source) < 256 else type(self.source).__name__
+        state = 'error={error!r}'.format(error=self.error) if self.error is not None else 'ok'
+        return 'LoadResult({name!r}, {state}, {seconds:.3f}s)'.format(name=name, state=state, seconds=self.seconds)
+
+
+def _json_rows(data, names):
+    """Convert rows of a 2-D ndarray to values of JSON, non-finite numbers are null. Return the rows and a dict of
+    messages of the rows that contain unsupported values by their indices."""
+    import numpy as np
+
+    rows = data.tolist()
+    failures = {}
+    if data.dtype.kind in 'biu' or (data.dtype.kind == 'f' and np.isfinite(data).all()):
+        return rows, failures
+
+    for i, row in enumerate(rows):
+        for j, x in enumerate(row):
+            if x is None or isinstance(x, (bool, str)):
+                continue
+            elif isinstance(x, numbers.Integral):
+                row[j] = int(x)
+            elif isinstance(x, numbers.Real) or (isinstance(x, numbers.Number) and
+                                                 not isinstance(x, numbers.Complex)):
+                x = float(x)
+                row[j] = x if abs(x) < float('inf') else None
+            else:
+                failures[i] = 'Value {value!r} of "{name}" not supported'.format(value=x, name=names[j])
+                break
+    return rows, failures
+
+
+def _zero_fields(fields):
+    """Names of the numeric fields that take 0 as a value, i.e. 0 is not declared as missing, and is a valid
+    category if the field is categorical. An invalid 0 of a continuous field is left to its invalid value treatment."""
+    names = set()
+    for field in fields:
+        if not field.isNumeric:
+            continue
+        zero = 0 if field.dataType == 'integer' else 0.0
+        if not field.isMissingValue(zero) and (field.opType == 'continuous' or field.isValidValue(zero)):
+            names.add(field.name)
+    return names
+
+
+def _arrow_like(data, names, columns):
+    """Build a container of the same type as data, a DataFrame of Polars, or a Table or RecordBatch of PyArrow,
+    from output columns, NaN are nulls."""
+    if is_polars_dataframe(data):
+        import polars as pl
+        return pl.DataFrame([pl.Series(name, x, strict=False, nan_to_null=True) for name, x in zip(names, columns)])
+
+    import pyarrow as pa
+    arrays = [pa.array(x, from_pandas=True) for x in columns]
+    if isinstance(data, pa.RecordBatch):
+        return pa.RecordBatch.from_arrays(arrays, names=names)
+    return pa.Table.from_arrays(arrays, names=names)
+
+
+def _json_key(name):
+    """A name in JSON without literal braces."""
+    return json.dumps(name).replace('{', '\\u007b').replace('}', '\\u007d')
+
+
+def _json_number(x):
+    """A number in JSON, NaN is null."""
+    return json.dumps(x) if x == x else 'null'
+
+
+def _json_default(x):
+    """Scalars of NumPy in JSON."""
+    if hasattr(x, 'item'):
+        return x.item()
+    raise TypeError('Value {value!r} not supported'.format(value=x))
+
+
+def _nan_to_none(rows):
+    """Missing values are null in JSON."""
+    return [[None if isinstance(x, float) and x != x else x for x in row] for row in rows]
@@ -0,0 +1,236 @@
+#
+# Copyright (c) 2024 AutoDeployAI
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+A pure Python/NumPy evaluation engine for simple PMML models, that scores batches without the JVM.
+
+Supported model elements are `TreeModel`, `RegressionModel`, and `MiningModel` of regression whose
+segments are supported models. Derived fields, embedded models and outputs other than predicted values, probabilities
+and entity ids are not supported, `compile_model` raises `UnsupportedModelError` for them, and
+`Model.setEngine('native')` falls back to the JVM.
+"""
+
+import hashlib
+import os
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+from pypmml.native.models import MODEL_ELEMENTS, MiningEvaluator, TreeEvaluator, compile_evaluator, \
+    find_model_element
+from pypmml.native.schema import UnsupportedModelError, parse_data_dictionary, parse_value, strip_namespaces
+
+__all__ = ['NativeModel', 'UnsupportedModelError', 'compile_model', 'MODEL_ELEMENTS']
+
+
+class Columns(object):
+    """Encoded input columns of a batch."""
+
+    def __init__(self, arrays, missing):
+        self._arrays = arrays
+        self._missing = missing
+
+    def values(self, name, idx):
+        return self._arrays[name][idx]
+
+    def missing(self, name, idx):
+        return self._missing[name][idx]
+
+
+class NativeModel(object):
+    """A PMML model compiled to NumPy code.
+
+    :param root: the root element of a PMML document.
+    :param directory: a directory to save or load the flat arrays of tree ensembles, see `pypmml.native.flat`.
+    """
+
+    def __init__(self, root, directory=None):
+        strip_namespaces(root)
+        self.version = root.get('version')
+        self.data_dictionary = parse_data_dictionary(root)
+        elem = find_model_element(root)
+        self.modelElement = elem.tag
+        self.evaluator = compile_evaluator(elem, self.data_dictionary, directory)
+        self._check_nested(self.evaluator)
+        self.mining_fields = self.evaluator.mining_schema.active_fields
+        self.inputNames = [x.name for x in self.mining_fields]
+        self.output_fields = self._output_fields(elem)
+        self.outputNames = [x[0] for x in self.output_fields]
+
+    @classmethod
+    def load(cls, f, cache_dir=None):
+        """Compile a model from PMML in any formats of readable, a file path, a string,
+        or an array of bytes(bytes or bytearray). The flat arrays of tree ensembles are cached in a subdirectory
+        of `cache_dir` named by the digest of PMML if specified, then other processes load them directly."""
+        content = f
+        if hasattr(f, 'read') and callable(f.read):
+            content = f.read()
+        if isinstance(content, str) and not content.lstrip().startswith('<') and os.path.exists(content):
+            with open(content, 'rb') as pmml:
+                content = pmml.read()
+        if not isinstance(content, (bytes, bytearray, str)):
+            raise UnsupportedModelError('Input type "{type}" not supported'.format(type=type(f).__name__))
+
+        directory = None
+        if cache_dir is not None:
+            digest = hashlib.sha256(content.encode('utf-8') if isinstance(content, str) else bytes(content))
+            directory = os.path.join(cache_dir, digest.hexdigest())
+        return cls(ET.fromstring(content), directory)
+
+    def _check_nested(self, evaluator):
+        if isinstance(evaluator, MiningEvaluator):
+            for _, _, model in evaluator.segments:
+                for x in model.mining_schema.fields:
+                    if x.missing_replacement is not None or x.invalid_treatment == 'asMissing':
+                        raise UnsupportedModelError('Treatments of fields in segments not supported')
+                self._check_nested(model)
+
+    def _output_fields(self, elem):
+        evaluator = self.evaluator
+        target = evaluator.target.name if evaluator.target is not None else None
+        output = elem.find('Output')
+        fields = []
+        if output is not None:
+            for x in output.findall('OutputField'):
+                feature = x.get('feature', 'predictedValue')
+                if len([c for c in x if c.tag != 'Extension']) or x.get('isFinalResult') == 'false':
+                    raise UnsupportedModelError('Expressions of OutputField not supported')
+                if x.get('targetField') not in (None, target):
+                    raise UnsupportedModelError('OutputField of another target not supported')
+                if feature == 'probability' and evaluator.is_classification:
+                    value = x.get('value')
+                    fields.append((x.get('name'), feature,
+                                   parse_value(value, evaluator.target_type) if value is not None else None))
+                elif feature == 'predictedValue' or (feature == 'entityId' and isinstance(evaluator, TreeEvaluator)):
+                    fields.append((x.get('name'), feature, None))
+                else:
+                    raise UnsupportedModelError('Output feature "{f}" not supported'.format(f=feature))
+        else:
+            if target is None:
+                raise UnsupportedModelError('Target field not found')
+            if evaluator.is_classification:
+                fields.append(('predicted_' + target, 'predictedValue', None))
+                fields.append(('probability', 'probability', None))
+                for x in evaluator.classes:
+                    fields.append(('probability_' + self._label(x), 'probability', x))
+            else:
+                fields.append(('predicted_' + target, 'predictedValue', None))
+            if isinstance(evaluator, TreeEvaluator):
+                fields.append(('node_id', 'entityId', None))
+        return fields
+
+    def _label(self, value):
+        data_type = self.evaluator.target_type
+        if data_type == 'integer':
+            return str(int(value))
+        return str(value)
+
+    def encode(self, columns, n):
+        """Encode input columns, a dict of names to sequences of values, return `Columns`
+        and a mask of rows that are invalid."""
+        arrays = {}
+        missing = {}
+        invalid = np.zeros(n, dtype=bool)
+        for field in self.mining_fields:
+            values = columns.get(field.name)
+            if values is None:
+                values = [None] * n
+            arr, miss, inv = field.data_field.encode(values)
+            if inv.any():
+                if field.invalid_treatment == 'returnInvalid':
+                    invalid |= inv
+                elif field.invalid_treatment == 'asMissing':
+                    miss = miss | inv
+                elif field.data_field.numeric:
+                    # Values of asIs that can not be parsed as numbers are missing
+                    miss = miss | (inv & np.isnan(arr))
+            if field.missing_replacement is not None and miss.any():
+                arr = arr.copy()
+                arr[miss] = field.missing_replacement
+                miss = np.zeros(n, dtype=bool)
+            if field.data_field.numeric:
+                arr = np.where(miss, np.nan, arr)
+            else:
+                arr = np.where(miss, None, arr)
+            arrays[field.name] = arr
+            missing[field.name] = miss
+        return Columns(arrays, missing), invalid
+
+    def predict_columns(self, columns, n):
+        """Score a batch of input columns, return a list of output columns ordered by `outputNames`."""
+        encoded, invalid = self.encode(columns, n)
+        idx = np.arange(n)
+        prediction = self.evaluator.evaluate(encoded, idx)
+        evaluator = self.evaluator
+
+        outputs = []
+        for name, feature, value in self.output_fields:
+            if feature == 'predictedValue':
+                column = prediction.value
+            elif feature == 'entityId':
+                column = prediction.entity
+            elif value is None:
+                column = np.full(n, np.nan)
+                known = np.not_equal(prediction.value, None)
+                if known.any():
+                    index = {x: i for i, x in enumerate(evaluator.classes)}
+                    best = np.array([index[parse_value(x, evaluator.target_type)] for x in prediction.value[known]])
+                    column[known] = prediction.probabilities[known, best]
+            else:
+                column = prediction.probabilities[:, evaluator.classes.index(value)]
+
+            if invalid.any():
+                column = column.copy()
+                column[invalid] = np.nan if column.dtype.kind == 'f' else None
+            outputs.append(column)
+        return outputs
+
+    def predict_rows(self, columns, n):
+        """Score a batch of input columns, return a list of rows in Python values ordered by `outputNames`."""
+        outputs = [x.tolist() for x in self.predict_columns(columns, n)]
+        return [list(x) for x in zip(*outputs)] if outputs else [[] for _ in range(n)]
+
+    def predict_frame(self, columns, n):
+        """Score a batch of input columns, return a DataFrame of Pandas. The dtypes of columns are inferred
+        the same way as the JSON results of the JVM, e.g. numeric strings are converted to numbers, and
+        floats without fractions are converted to integers."""
+        import pandas as pd
+
+        frame = pd.DataFrame(dict(zip(self.outputNames, self.predict_columns(columns, n))),
+                             columns=self.outputNames)
+        for name in self.outputNames:
+            column = frame[name]
+            if column.dtype.kind not in 'biufcmM':
+                try:
+                    column = column.astype(object).where(column.notna(), np.nan).astype(np.float64)
+                except (ValueError, TypeError):
+                    continue
+            if column.dtype.kind == 'f' and len(column) and column.notna().all() and \
+                    (column == np.floor(column)).all():
+                column = column.astype(np.int64)
+            frame[name] = column
+        return frame
+
+
+def compile_model(source, cache_dir=None):
+    """Compile a model from PMML in any formats that `NativeModel.load` accepts,
+    raise `UnsupportedModelError` if it is not supported."""
+    try:
+        return NativeModel.load(source, cache_dir)
+    except ET.ParseError as e:
+        raise UnsupportedModelError(str(e))
+    except (ValueError, TypeError) as e:
+        raise UnsupportedModelError('Model not supported: {e}'.format(e=e))
@@ -0,0 +1,294 @@
+#
+# Copyright (c) 2024 AutoDeployAI
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+Tree ensembles compiled into flat arrays.
+
+All nodes of all trees are stored in parallel arrays of feature index, threshold, child offsets and node values,
+a batch is evaluated level by level across all trees and rows at once. The arrays can be saved into a directory
+of `.npy` files and memory mapped, so that many processes share the same pages of a compiled ensemble.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from pypmml.native.models import NativeEvaluator, Prediction, _model_element
+from pypmml.native.schema import UnsupportedModelError, check_transformations
+
+_ARRAYS = ('feature', 'threshold', 'children', 'value', 'roots', 'weights')
+
+# Complementary operators of the second child of a binary split
+_COMPLEMENTS = {
+    'lessThan': 'greaterOrEqual',
+    'lessOrEqual': 'greaterThan',
+    'greaterThan': 'lessOrEqual',
+    'greaterOrEqual': 'lessThan',
+}
+
+LEFT, RIGHT, MISSING = 0, 1, 2
+
+
+class FlatForest(object):
+    """Binary trees of numeric splits in flat arrays.
+
+    A row at node `i` goes to `children[i, LEFT]` if its value of the feature `feature[i]` is less than
+    `threshold[i]`, to `children[i, RIGHT]` if not, and to `children[i, MISSING]` if the value is missing.
+    Splits of `lessOrEqual` are stored as `lessThan` the next float of the threshold. Leaves, and nodes where
+    missing values stop, point to themselves, so all rows are advanced the same number of levels. The last node is
+    a sentinel leaf of null prediction.
+
+    :param features: names of the input fields, indexed by `feature`.
+    :param depth: the max number of levels below roots.
+    """
+
+    def __init__(self, arrays, features, method, depth):
+        for name in _ARRAYS:
+            setattr(self, name, arrays[name])
+        self.features = list(features)
+        self.method = method
+        self.depth = int(depth)
+        self._next = self.children.reshape(-1)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    def apply(self, X):
+        """Return the indices of the nodes that rows of `X`, a float array of shape `(n, len(features))` with NaN
+        for missing values, end in, an int array of shape `(n_trees, n)`."""
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        n, width = X.shape
+        values = X.reshape(-1)
+        node = np.repeat(np.asarray(self.roots, dtype=np.intp), n)
+        offset = np.tile(np.arange(n, dtype=np.intp) * width, self.n_trees)
+        missing = np.isnan(values).any()
+        for _ in range(self.depth):
+            x = np.take(values, offset + np.take(self.feature, node))
+            branch = node * 3
+            branch += RIGHT
+            # NaN is never less than a threshold, then goes RIGHT + 1
+            branch -= np.less(x, np.take(self.threshold, node))
+            if missing:
+                branch += np.isnan(x)
+            node = np.take(self._next, branch)
+        return node.reshape(self.n_trees, n)
+
+    def predict(self, X, max_cells=1 << 16):
+        """Score rows of `X`, return a float array of combined values of all trees, NaN if any tree
+        returns a null prediction. Rows are scored in chunks of at most `max_cells` nodes."""
+        n = len(X)
+        result = np.empty(n)
+        step = max(1, max_cells // max(1, self.n_trees))
+        for start in range(0, n, step):
+            values = np.take(self.value, self.apply(X[start:start + step]))
+            result[start:start + step] = self._combine(values)
+        return result
+
+    def _combine(self, values):
+        weights = self.weights[:, None]
+        if self.method == 'sum':
+            return values.sum(axis=0)
+        elif self.method == 'weightedSum':
+            return (values * weights).sum(axis=0)
+        elif self.method == 'average':
+            return values.mean(axis=0)
+        elif self.method == 'weightedAverage':
+            return (values * weights).sum(axis=0) / self.weights.sum()
+        return np.median(values, axis=0)
+
+    def save(self, directory):
+        """Save the arrays into a directory, which is replaced atomically if it does not exist yet."""
+        parent = os.path.dirname(os.path.abspath(directory))
+        if not os.path.exists(parent):
+            os.makedirs(parent)
+        temp = tempfile.mkdtemp(dir=parent)
+        try:
+            for name in _ARRAYS:
+                np.save(os.path.join(temp, name + '.npy'), getattr(self, name))
+            with open(os.path.join(temp, 'forest.json'), 'w') as f:
+                json.dump({'features': self.features, 'method': self.method, 'depth': self.depth}, f)
+            os.rename(temp, directory)
+        except OSError:
+            # Saved by another process
+            shutil.rmtree(temp, ignore_errors=True)
+            if not os.path.exists(os.path.join(directory, 'forest.json')):
+                raise
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        """Load the arrays saved by `save`, memory mapped in the mode `mmap_mode` by default."""
+        with open(os.path.join(directory, 'forest.json')) as f:
+            meta = json.load(f)
+        arrays = {x: np.load(os.path.join(directory, x + '.npy'), mmap_mode=mmap_mode) for x in _ARRAYS}
+        return cls(arrays, meta['features'], meta['method'], meta['depth'])
+
+
+class _Builder(object):
+    def __init__(self, data_dictionary, features):
+        self.data_dictionary = data_dictionary
+        self.index = {x: i for i, x in enumerate(features)}
+        self.feature = []
+        self.threshold = []
+        self.children = []
+        self.value = []
+        self.depth = 0
+
+    def add_tree(self, elem):
+        if elem.get('functionName') != 'regression':
+            raise UnsupportedModelError('Segments of regression trees are required')
+        check_transformations(elem)
+        for x in elem.find('MiningSchema').findall('MiningField'):
+            if x.get('missingValueReplacement') is not None or x.get('invalidValueTreatment') == 'asMissing':
+                raise UnsupportedModelError('Treatments of fields in segments not supported')
+
+        missing_strategy = elem.get('missingValueStrategy', 'none')
+        if missing_strategy not in ('none', 'lastPrediction', 'defaultChild'):
+            raise UnsupportedModelError('Missing value strategy "{s}" not supported'.format(s=missing_strategy))
+        last_prediction = elem.get('noTrueChildStrategy', 'returnNullPrediction') == 'returnLastPrediction'
+        root = elem.find('Node')
+        if root is None or root.find('True') is None:
+            raise UnsupportedModelError('Root node of a True predicate is required')
+        return self._add_node(root, missing_strategy, last_prediction, 0)
+
+    def _allocate(self, score):
+        i = len(self.feature)
+        self.feature.append(0)
+        # No value is less than NaN, so leaves go RIGHT or MISSING to themselves
+        self.threshold.append(np.nan)
+        self.children.append([i, i, i])
+        self.value.append(float(score) if score is not None else np.nan)
+        return i
+
+    def _add_node(self, elem, missing_strategy, last_prediction, depth):
+        self.depth = max(self.depth, depth)
+        i = self._allocate(elem.get('score'))
+        children = elem.findall('Node')
+        if not children:
+            return i
+        if len(children) != 2:
+            raise UnsupportedModelError('Binary splits are required')
+
+        first, second = children
+        name, op, threshold = self._split(first)
+        if second.find('True') is None and self._split(second) != (name, _COMPLEMENTS[op], threshold):
+            raise UnsupportedModelError('Splits of complementary predicates are required')
+
+        self.feature[i] = self.index[name]
+        self.threshold[i] = np.nextafter(threshold, np.inf) if op in ('lessOrEqual', 'greaterThan') else threshold
+        first_index = self._add_node(first, missing_strategy, last_prediction, depth + 1)
+        second_index = self._add_node(second, missing_strategy, last_prediction, depth + 1)
+        branches = self.children[i]
+        if op in ('lessThan', 'lessOrEqual'):
+            branches[LEFT], branches[RIGHT] = first_index, second_index
+        else:
+            branches[LEFT], branches[RIGHT] = second_index, first_index
+
+        # The second child of a True predicate wins if the value is missing, otherwise there is no true child but
+        # unknown ones, that are handled by the missing value strategy, then the no true child strategy
+        default = elem.get('defaultChild') if missing_strategy == 'defaultChild' else None
+        if second.find('True') is not None:
+            branches[MISSING] = second_index
+        elif default is not None and default == first.get('id'):
+            branches[MISSING] = first_index
+        elif default is not None and default == second.get('id'):
+            branches[MISSING] = second_index
+        elif missing_strategy != 'lastPrediction' and not last_prediction:
+            branches[MISSING] = -1
+        return i
+
+    def _split(self, elem):
+        predicate = elem.find('SimplePredicate')
+        if predicate is None or predicate.get('operator') not in _COMPLEMENTS:
+            raise UnsupportedModelError('Numeric splits of SimplePredicate are required')
+        name = predicate.get('field')
+        field = self.data_dictionary.get(name)
+        if field is None or not field.numeric or name not in self.index:
+            raise UnsupportedModelError('Splits on active numeric fields are required')
+        return name, predicate.get('operator'), float(predicate.get('value'))
+
+    def build(self, roots, weights, method):
+        sentinel = self._allocate(None)
+        children = np.array(self.children, dtype=np.intp)
+        children[children < 0] = sentinel
+        arrays = {
+            'feature': np.array(self.feature, dtype=np.intp),
+            'threshold': np.array(self.threshold, dtype=np.float64),
+            'children': children,
+            'value': np.array(self.value, dtype=np.float64),
+            'roots': np.array(roots, dtype=np.intp),
+            'weights': np.array(weights, dtype=np.float64),
+        }
+        return FlatForest(arrays, sorted(self.index, key=self.index.get), method, self.depth)
+
+
+class TreeEnsembleEvaluator(NativeEvaluator):
+    """A compiled `MiningModel` of regression, whose segments are all binary regression trees of numeric splits,
+    e.g. the gradient boosted trees.
+
+    :param directory: a directory to load the flat arrays from if it exists, or to save them into.
+    """
+
+    METHODS = ('sum', 'weightedSum', 'average', 'weightedAverage', 'median')
+
+    def __init__(self, elem, data_dictionary, directory=None):
+        super(TreeEnsembleEvaluator, self).__init__(elem, data_dictionary)
+        if self.is_classification:
+            raise UnsupportedModelError('Ensemble of classification not supported')
+        segmentation = elem.find('Segmentation')
+        if segmentation is None:
+            raise UnsupportedModelError('Segmentation not found')
+        method = segmentation.get('multipleModelMethod')
+        if method not in self.METHODS:
+            raise UnsupportedModelError('Multiple model method "{m}" not supported'.format(m=method))
+
+        features = [x.name for x in self.mining_schema.active_fields if x.data_field.numeric]
+        if directory is not None and os.path.exists(os.path.join(directory, 'forest.json')):
+            self.forest = FlatForest.load(directory)
+            if self.forest.features != features or self.forest.method != method:
+                raise UnsupportedModelError('Flat arrays in "{d}" do not match the model'.format(d=directory))
+            return
+
+        builder = _Builder(data_dictionary, features)
+        roots = []
+        weights = []
+        for segment in segmentation.findall('Segment'):
+            if segment.find('True') is None:
+                raise UnsupportedModelError('Segments of True predicates are required')
+            tree = _model_element(segment)
+            if tree.tag != 'TreeModel':
+                raise UnsupportedModelError('Segments of TreeModel are required')
+            roots.append(builder.add_tree(tree))
+            weights.append(float(segment.get('weight', 1)))
+        if not roots:
+            raise UnsupportedModelError('Segment not found')
+        self.forest = builder.build(roots, weights, method)
+        if directory is not None:
+            self.forest.save(directory)
+
+    def evaluate(self, columns, idx):
+        forest = self.forest
+        X = np.empty((len(idx), len(forest.features)))
+        for i, name in enumerate(forest.features):
+            X[:, i] = columns.values(name, idx)
+        return Prediction(forest.predict(X))
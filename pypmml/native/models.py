@@ -0,0 +1,406 @@
+#
+# Copyright (c) 2024 AutoDeployAI
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import math
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+from pypmml.native.predicates import compile_predicate, find_predicate
+from pypmml.native.schema import UnsupportedModelError, MiningSchema, check_transformations, parse_value, \
+    typed_value
+
+MODEL_ELEMENTS = ('TreeModel', 'RegressionModel', 'MiningModel')
+
+
+class Prediction(object):
+    """Predictions of a batch of rows.
+
+    :param value: predicted values, a float array with NaN for regression,
+        an object array with None for classification.
+    :param probabilities: a float array of shape `(n, len(classes))` for classification.
+    :param entity: an object array of entity ids, e.g. node ids of a tree.
+    """
+
+    def __init__(self, value, probabilities=None, entity=None):
+        self.value = value
+        self.probabilities = probabilities
+        self.entity = entity
+
+
+class NativeEvaluator(ABC):
+    """Base class of the compiled model elements."""
+
+    def __init__(self, elem, data_dictionary):
+        check_transformations(elem)
+        self.element = elem.tag
+        self.function_name = elem.get('functionName')
+        if self.function_name not in ('classification', 'regression'):
+            raise UnsupportedModelError('Function "{f}" not supported'.format(f=self.function_name))
+        self.mining_schema = MiningSchema(elem.find('MiningSchema'), data_dictionary)
+        targets = self.mining_schema.target_fields
+        if len(targets) > 1:
+            raise UnsupportedModelError('Multiple targets not supported')
+        self.target = targets[0].data_field if targets else None
+        self.classes = None
+        if self.is_classification:
+            if self.target is not None and self.target.valid_values:
+                self.classes = list(self.target.valid_values)
+
+    @property
+    def is_classification(self):
+        return self.function_name == 'classification'
+
+    @property
+    def target_type(self):
+        return self.target.data_type if self.target is not None else 'string'
+
+    @abstractmethod
+    def evaluate(self, columns, idx):
+        """Evaluate the rows of the given indices, return a `Prediction`."""
+        return None
+
+    def classify(self, probabilities, valid):
+        """Pick the class of max probability, the first one wins in case of ties."""
+        value = np.full(len(probabilities), None, dtype=object)
+        if len(self.classes):
+            best = np.argmax(np.where(np.isnan(probabilities), -np.inf, probabilities), axis=1)
+            labels = np.array([typed_value(x, self.target_type) for x in self.classes] + [None], dtype=object)
+            value[valid] = labels[best[valid]]
+        return value
+
+
+class _Node(object):
+    __slots__ = ('id', 'score', 'predicate', 'children', 'default_child', 'distribution', 'probabilities')
+
+    def __init__(self, elem, data_dictionary):
+        self.id = elem.get('id')
+        self.score = elem.get('score')
+        self.predicate = compile_predicate(find_predicate(elem), data_dictionary)
+        self.children = [_Node(x, data_dictionary) for x in elem.findall('Node')]
+        self.default_child = elem.get('defaultChild')
+        self.distribution = [(x.get('value'), float(x.get('recordCount', 0)), x.get('probability'))
+                             for x in elem.findall('ScoreDistribution')]
+        self.probabilities = None
+        if elem.find('Partition') is not None or elem.find('Regression') is not None or \
+                elem.find('DecisionTree') is not None:
+            raise UnsupportedModelError('Embedded models in Node not supported')
+
+
+class TreeEvaluator(NativeEvaluator):
+    """A compiled `TreeModel`."""
+
+    def __init__(self, elem, data_dictionary):
+        super(TreeEvaluator, self).__init__(elem, data_dictionary)
+        self.missing_strategy = elem.get('missingValueStrategy', 'none')
+        if self.missing_strategy not in ('none', 'lastPrediction', 'defaultChild'):
+            raise UnsupportedModelError('Missing value strategy "{s}" not supported'.format(
+                s=self.missing_strategy))
+        self.no_true_child_strategy = elem.get('noTrueChildStrategy', 'returnNullPrediction')
+        root = elem.find('Node')
+        if root is None:
+            raise UnsupportedModelError('Node of TreeModel not found')
+        self.root = _Node(root, data_dictionary)
+        self.nodes = []
+        self._index(self.root)
+        self._position = {id(node): i for i, node in enumerate(self.nodes)}
+
+        if self.is_classification:
+            if self.classes is None:
+                self.classes = []
+                for node in self.nodes:
+                    for value, _, _ in node.distribution:
+                        if parse_value(value, self.target_type) not in self.classes:
+                            self.classes.append(parse_value(value, self.target_type))
+            for node in self.nodes:
+                node.probabilities = self._probabilities(node)
+        else:
+            for node in self.nodes:
+                if node.score is not None:
+                    node.score = float(node.score)
+
+    def _index(self, node):
+        self.nodes.append(node)
+        for child in node.children:
+            self._index(child)
+
+    def _probabilities(self, node):
+        probabilities = np.zeros(len(self.classes))
+        total = sum(count for _, count, _ in node.distribution)
+        for value, count, probability in node.distribution:
+            i = self.classes.index(parse_value(value, self.target_type))
+            if probability is not None:
+                probabilities[i] = float(probability)
+            elif total > 0:
+                probabilities[i] = count / total
+        if node.score is None and len(node.distribution):
+            node.score = self.classes[int(np.argmax(probabilities))]
+        elif node.score is not None:
+            node.score = parse_value(node.score, self.target_type)
+        return probabilities
+
+    def evaluate(self, columns, idx):
+        leaf = np.full(len(idx), -1, dtype=np.int64)
+        position = self._position
+        t, u = self.root.predicate(columns, idx)
+        stack = [(self.root, np.flatnonzero(t))]
+        while stack:
+            node, rows = stack.pop()
+            if not node.children or not len(rows):
+                leaf[rows] = position[id(node)]
+                continue
+
+            # The first true child wins, rows of no true child but unknown ones are handled by the missing
+            # value strategy, others by the no true child strategy
+            pending = np.arange(len(rows))
+            unknown = np.zeros(len(rows), dtype=bool)
+            for child in node.children:
+                if not len(pending):
+                    break
+                t, u = child.predicate(columns, idx[rows[pending]])
+                stack.append((child, rows[pending[t]]))
+                unknown[pending[u]] = True
+                pending = pending[~t]
+
+            if len(pending) and self.missing_strategy != 'none':
+                missing = pending[unknown[pending]]
+                default = next((x for x in node.children if x.id == node.default_child), None)
+                if len(missing) and self.missing_strategy == 'lastPrediction':
+                    leaf[rows[missing]] = position[id(node)]
+                    pending = pending[~unknown[pending]]
+                elif len(missing) and default is not None:
+                    stack.append((default, rows[missing]))
+                    pending = pending[~unknown[pending]]
+
+            if len(pending) and self.no_true_child_strategy == 'returnLastPrediction':
+                leaf[rows[pending]] = position[id(node)]
+
+        return self._predictions(leaf)
+
+    def _predictions(self, leaf):
+        # Null predictions have empty ids
+        entity = np.array([x.id for x in self.nodes] + [''], dtype=object)[leaf]
+        if self.is_classification:
+            table = np.vstack([x.probabilities for x in self.nodes] + [np.full(len(self.classes), np.nan)])
+            scores = np.array([typed_value(x.score, self.target_type) for x in self.nodes] + [None], dtype=object)
+            return Prediction(scores[leaf], table[leaf], entity)
+        scores = np.array([x.score if x.score is not None else np.nan for x in self.nodes] + [np.nan])
+        return Prediction(scores[leaf], entity=entity)
+
+
+def _normalize(y, method):
+    """Apply a normalization method elementwise."""
+    with np.errstate(over='ignore', invalid='ignore'):
+        if method == 'none':
+            return y
+        elif method in ('logit', 'softmax'):
+            return 1.0 / (1.0 + np.exp(-y))
+        elif method == 'exp':
+            return np.exp(y)
+        elif method == 'probit':
+            return 0.5 * (1.0 + _erf(y / math.sqrt(2.0)))
+        elif method == 'cloglog':
+            return 1.0 - np.exp(-np.exp(y))
+        elif method == 'loglog':
+            return np.exp(-np.exp(-y))
+        elif method == 'cauchit':
+            return 0.5 + np.arctan(y) / math.pi
+    raise UnsupportedModelError('Normalization method "{m}" not supported'.format(m=method))
+
+
+_erf = np.vectorize(math.erf, otypes=[np.float64])
+
+
+class _RegressionTable(object):
+    def __init__(self, elem, data_dictionary):
+        self.intercept = float(elem.get('intercept', 0))
+        self.target_category = elem.get('targetCategory')
+        self.numeric = []
+        self.categorical = {}
+        for x in elem:
+            if x.tag == 'NumericPredictor':
+                self.numeric.append((x.get('name'), float(x.get('exponent', 1)), float(x.get('coefficient'))))
+            elif x.tag == 'CategoricalPredictor':
+                field = data_dictionary.get(x.get('name'))
+                if field is None:
+                    raise UnsupportedModelError('Field "{name}" not found in DataDictionary'.format(
+                        name=x.get('name')))
+                self.categorical.setdefault(field.name, []).append(
+                    (parse_value(x.get('value'), field.data_type), float(x.get('coefficient'))))
+            elif x.tag == 'PredictorTerm':
+                raise UnsupportedModelError('PredictorTerm not supported')
+
+    def evaluate(self, columns, idx):
+        y = np.full(len(idx), self.intercept)
+        for name, exponent, coefficient in self.numeric:
+            x = columns.values(name, idx)
+            y += coefficient * (x if exponent == 1 else np.power(x, exponent))
+        for name, predictors in self.categorical.items():
+            # A missing or unmatched category contributes nothing
+            x = columns.values(name, idx)
+            for value, coefficient in predictors:
+                y += coefficient * (x == value)
+        return y
+
+
+class RegressionEvaluator(NativeEvaluator):
+    """A compiled `RegressionModel`."""
+
+    def __init__(self, elem, data_dictionary):
+        super(RegressionEvaluator, self).__init__(elem, data_dictionary)
+        self.normalization = elem.get('normalizationMethod', 'none')
+        self.tables = [_RegressionTable(x, data_dictionary) for x in elem.findall('RegressionTable')]
+        if not self.tables:
+            raise UnsupportedModelError('RegressionTable not found')
+
+        if self.is_classification:
+            categories = [parse_value(x.target_category, self.target_type) for x in self.tables]
+            if self.classes is None:
+                self.classes = categories
+            elif sorted(map(str, self.classes)) != sorted(map(str, categories)):
+                raise UnsupportedModelError('Target categories do not match the classes')
+            self._order = [categories.index(x) for x in self.classes]
+            if self.normalization not in ('softmax', 'simplemax', 'none') and len(self.tables) != 2:
+                raise UnsupportedModelError('Normalization method "{m}" of multiple classes not supported'.format(
+                    m=self.normalization))
+            if self.normalization not in ('softmax', 'simplemax'):
+                _normalize(np.zeros(1), self.normalization)
+        else:
+            if len(self.tables) != 1:
+                raise UnsupportedModelError('Multiple regression tables of regression not supported')
+            _normalize(np.zeros(1), self.normalization)
+
+    def evaluate(self, columns, idx):
+        if not self.is_classification:
+            return Prediction(_normalize(self.tables[0].evaluate(columns, idx), self.normalization))
+
+        y = np.column_stack([x.evaluate(columns, idx) for x in self.tables])
+        with np.errstate(over='ignore', invalid='ignore'):
+            if self.normalization == 'softmax':
+                e = np.exp(y - np.max(y, axis=1, keepdims=True))
+                p = e / np.sum(e, axis=1, keepdims=True)
+            elif self.normalization == 'simplemax':
+                p = y / np.sum(y, axis=1, keepdims=True)
+            else:
+                p = np.empty_like(y)
+                p[:, :-1] = _normalize(y[:, :-1], self.normalization)
+                p[:, -1] = 1.0 - np.sum(p[:, :-1], axis=1)
+        p = p[:, self._order]
+        valid = ~np.isnan(p).any(axis=1)
+        p[~valid] = np.nan
+        return Prediction(self.classify(p, valid), p)
+
+
+class MiningEvaluator(NativeEvaluator):
+    """A compiled `MiningModel` of regression, whose segments are supported model elements."""
+
+    METHODS = ('average', 'weightedAverage', 'median', 'sum', 'weightedSum', 'selectFirst')
+
+    def __init__(self, elem, data_dictionary):
+        super(MiningEvaluator, self).__init__(elem, data_dictionary)
+        if self.is_classification:
+            raise UnsupportedModelError('MiningModel of classification not supported')
+        segmentation = elem.find('Segmentation')
+        if segmentation is None:
+            raise UnsupportedModelError('Segmentation not found')
+        self.method = segmentation.get('multipleModelMethod')
+        if self.method not in self.METHODS:
+            raise UnsupportedModelError('Multiple model method "{m}" not supported'.format(m=self.method))
+
+        self.segments = []
+        for segment in segmentation.findall('Segment'):
+            predicate = compile_predicate(find_predicate(segment), data_dictionary)
+            model = compile_evaluator(_model_element(segment), data_dictionary)
+            if model.function_name != self.function_name:
+                raise UnsupportedModelError('Segments of different functions not supported')
+            self.segments.append((predicate, float(segment.get('weight', 1)), model))
+        if not self.segments:
+            raise UnsupportedModelError('Segment not found')
+
+    def evaluate(self, columns, idx):
+        n = len(idx)
+        if self.method == 'selectFirst':
+            result = np.full(n, np.nan)
+            pending = np.arange(n)
+            for predicate, _, model in self.segments:
+                if not len(pending):
+                    break
+                t, _ = predicate(columns, idx[pending])
+                rows = pending[t]
+                if len(rows):
+                    result[rows] = model.evaluate(columns, idx[rows]).value
+                pending = pending[~t]
+            return Prediction(result)
+
+        values = np.full((len(self.segments), n), np.nan)
+        weights = np.zeros((len(self.segments), n))
+        # Segments selected by their predicates, a segment of weight 0 is still selected
+        used = np.zeros((len(self.segments), n), dtype=bool)
+        for i, (predicate, weight, model) in enumerate(self.segments):
+            t, _ = predicate(columns, idx)
+            rows = np.flatnonzero(t)
+            if len(rows):
+                values[i, rows] = model.evaluate(columns, idx[rows]).value
+                weights[i, rows] = weight
+                used[i, rows] = True
+
+        # Any missing prediction of a used segment makes the result missing
+        invalid = (used & np.isnan(values)).any(axis=0) | ~used.any(axis=0)
+        values = np.where(used, values, 0.0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if self.method == 'sum':
+                result = values.sum(axis=0)
+            elif self.method == 'weightedSum':
+                result = (values * weights).sum(axis=0)
+            elif self.method == 'average':
+                result = values.sum(axis=0) / used.sum(axis=0)
+            elif self.method == 'weightedAverage':
+                result = (values * weights).sum(axis=0) / weights.sum(axis=0)
+            else:
+                result = np.full(n, np.nan)
+                for j in np.flatnonzero(~invalid):
+                    result[j] = np.median(values[used[:, j], j])
+        result[invalid] = np.nan
+        return Prediction(result)
+
+
+def _model_element(elem):
+    for child in elem:
+        if child.tag in MODEL_ELEMENTS:
+            return child
+    names = [x.tag for x in elem if x.tag.endswith('Model') or x.tag == 'NeuralNetwork']
+    raise UnsupportedModelError('Model element "{name}" not supported'.format(name=names[0] if names else None))
+
+
+def compile_evaluator(elem, data_dictionary, directory=None):
+    """Compile a model element, raise `UnsupportedModelError` if it is not supported. Ensembles of binary trees
+    are compiled into flat arrays, that are saved into or loaded from `directory` if specified."""
+    if elem.tag == 'TreeModel':
+        return TreeEvaluator(elem, data_dictionary)
+    elif elem.tag == 'RegressionModel':
+        return RegressionEvaluator(elem, data_dictionary)
+    elif elem.tag == 'MiningModel':
+        from pypmml.native.flat import TreeEnsembleEvaluator
+        try:
+            return TreeEnsembleEvaluator(elem, data_dictionary, directory)
+        except UnsupportedModelError:
+            return MiningEvaluator(elem, data_dictionary)
+    raise UnsupportedModelError('Model element "{name}" not supported'.format(name=elem.tag))
+
+
+def find_model_element(root):
+    """Return the first model element of a PMML document."""
+    return _model_element(root)
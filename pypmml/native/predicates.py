@@ -0,0 +1,160 @@
+#
+# Copyright (c) 2024 AutoDeployAI
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+Vectorized predicates in three-valued logic, a compiled predicate takes the encoded input columns
+and an array of row indices, and returns two boolean arrays `(true, unknown)` of those rows.
+"""
+
+import operator
+import shlex
+
+import numpy as np
+
+from pypmml.native.schema import UnsupportedModelError, parse_value
+
+_COMPARISONS = {
+    'equal': operator.eq,
+    'notEqual': operator.ne,
+    'lessThan': operator.lt,
+    'lessOrEqual': operator.le,
+    'greaterThan': operator.gt,
+    'greaterOrEqual': operator.ge,
+}
+
+
+def parse_array(elem, data_type):
+    """Parse the values of an `Array` element."""
+    text = elem.text or ''
+    return [parse_value(x, data_type) for x in shlex.split(text)]
+
+
+def compile_predicate(elem, data_dictionary):
+    """Compile a predicate element to a vectorized function."""
+    tag = elem.tag
+    if tag == 'True':
+        return lambda columns, idx: (np.ones(len(idx), dtype=bool), np.zeros(len(idx), dtype=bool))
+    elif tag == 'False':
+        return lambda columns, idx: (np.zeros(len(idx), dtype=bool), np.zeros(len(idx), dtype=bool))
+    elif tag == 'SimplePredicate':
+        return _compile_simple(elem, data_dictionary)
+    elif tag == 'SimpleSetPredicate':
+        return _compile_simple_set(elem, data_dictionary)
+    elif tag == 'CompoundPredicate':
+        return _compile_compound(elem, data_dictionary)
+    raise UnsupportedModelError('Predicate "{tag}" not supported'.format(tag=tag))
+
+
+def find_predicate(elem):
+    """Return the predicate child of a `Node` or `Segment` element."""
+    for child in elem:
+        if child.tag in ('True', 'False', 'SimplePredicate', 'SimpleSetPredicate', 'CompoundPredicate'):
+            return child
+    raise UnsupportedModelError('Predicate of "{tag}" not found'.format(tag=elem.tag))
+
+
+def _field(elem, data_dictionary):
+    name = elem.get('field')
+    if name not in data_dictionary:
+        raise UnsupportedModelError('Field "{name}" not found in DataDictionary'.format(name=name))
+    return data_dictionary[name]
+
+
+def _compile_simple(elem, data_dictionary):
+    field = _field(elem, data_dictionary)
+    name = field.name
+    op = elem.get('operator')
+    if op == 'isMissing':
+        return lambda columns, idx: (columns.missing(name, idx), np.zeros(len(idx), dtype=bool))
+    elif op == 'isNotMissing':
+        return lambda columns, idx: (~columns.missing(name, idx), np.zeros(len(idx), dtype=bool))
+
+    compare = _COMPARISONS.get(op)
+    if compare is None:
+        raise UnsupportedModelError('Operator "{op}" not supported'.format(op=op))
+    if not field.numeric and op not in ('equal', 'notEqual'):
+        raise UnsupportedModelError('Operator "{op}" of a string field not supported'.format(op=op))
+    value = parse_value(elem.get('value'), field.data_type)
+
+    def evaluate(columns, idx):
+        missing = columns.missing(name, idx)
+        with np.errstate(invalid='ignore'):
+            result = np.asarray(compare(columns.values(name, idx), value), dtype=bool)
+        return result & ~missing, missing
+
+    return evaluate
+
+
+def _compile_simple_set(elem, data_dictionary):
+    field = _field(elem, data_dictionary)
+    name = field.name
+    array = elem.find('Array')
+    if array is None:
+        raise UnsupportedModelError('Array of SimpleSetPredicate not found')
+    values = parse_array(array, field.data_type)
+    negate = elem.get('booleanOperator') == 'isNotIn'
+
+    def evaluate(columns, idx):
+        missing = columns.missing(name, idx)
+        result = np.isin(columns.values(name, idx), values)
+        if negate:
+            result = ~result
+        return result & ~missing, missing
+
+    return evaluate
+
+
+def _compile_compound(elem, data_dictionary):
+    op = elem.get('booleanOperator')
+    predicates = [compile_predicate(x, data_dictionary) for x in elem
+                  if x.tag not in ('Extension',)]
+    if op not in ('and', 'or', 'xor', 'surrogate'):
+        raise UnsupportedModelError('Boolean operator "{op}" not supported'.format(op=op))
+
+    def evaluate(columns, idx):
+        results = [p(columns, idx) for p in predicates]
+        if op == 'and':
+            false = np.zeros(len(idx), dtype=bool)
+            unknown = np.zeros(len(idx), dtype=bool)
+            for t, u in results:
+                false |= ~t & ~u
+                unknown |= u
+            unknown &= ~false
+            return ~false & ~unknown, unknown
+        elif op == 'or':
+            true = np.zeros(len(idx), dtype=bool)
+            unknown = np.zeros(len(idx), dtype=bool)
+            for t, u in results:
+                true |= t
+                unknown |= u
+            return true, unknown & ~true
+        elif op == 'xor':
+            true = np.zeros(len(idx), dtype=bool)
+            unknown = np.zeros(len(idx), dtype=bool)
+            for t, u in results:
+                true ^= t
+                unknown |= u
+            return true & ~unknown, unknown
+        else:
+            # surrogate: the first result that is not unknown
+            true = np.zeros(len(idx), dtype=bool)
+            unknown = np.ones(len(idx), dtype=bool)
+            for t, u in results:
+                true |= unknown & t
+                unknown &= u
+            return true, unknown
+
+    return evaluate
@@ -0,0 +1,212 @@
+#
+# Copyright (c) 2024 AutoDeployAI
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import math
+
+import numpy as np
+
+from pypmml.jvm import PMMLError
+
+NUMERIC_TYPES = ('double', 'float', 'integer')
+
+
+class UnsupportedModelError(PMMLError):
+    """Raised when a model, or an input of it, is not supported by the native engine."""
+
+
+def strip_namespaces(root):
+    """Remove the PMML namespace from all tags, so that elements can be found by their plain names."""
+    for elem in root.iter():
+        if isinstance(elem.tag, str) and '}' in elem.tag:
+            elem.tag = elem.tag.split('}', 1)[1]
+    return root
+
+
+def parse_value(value, data_type):
+    """Parse a value in PMML by the data type of its field."""
+    if value is None:
+        return None
+    if data_type in NUMERIC_TYPES:
+        return float(value)
+    return value
+
+
+def typed_value(value, data_type):
+    """Convert a parsed value to the Python type of the data type."""
+    if value is None:
+        return None
+    if data_type == 'integer':
+        return int(value)
+    if data_type in ('double', 'float'):
+        return float(value)
+    return value
+
+
+class DataField(object):
+    """A field of the data dictionary."""
+
+    def __init__(self, elem):
+        self.name = elem.get('name')
+        self.optype = elem.get('optype')
+        self.data_type = elem.get('dataType')
+        if self.data_type not in NUMERIC_TYPES and self.data_type != 'string':
+            raise UnsupportedModelError('Data type "{t}" of field "{name}" not supported'.format(
+                t=self.data_type, name=self.name))
+
+        self.valid_values = []
+        self.invalid_values = set()
+        self.missing_values = set()
+        for x in elem.findall('Value'):
+            value = parse_value(x.get('value'), self.data_type)
+            prop = x.get('property', 'valid')
+            if prop == 'valid':
+                self.valid_values.append(value)
+            elif prop == 'invalid':
+                self.invalid_values.add(value)
+            else:
+                self.missing_values.add(value)
+
+        self.intervals = []
+        if self.optype == 'continuous':
+            for x in elem.findall('Interval'):
+                left = x.get('leftMargin')
+                right = x.get('rightMargin')
+                self.intervals.append((
+                    float(left) if left is not None else -math.inf,
+                    float(right) if right is not None else math.inf,
+                    x.get('closure')))
+
+    @property
+    def numeric(self):
+        return self.data_type in NUMERIC_TYPES
+
+    def encode(self, values):
+        """Encode input values of this field, return a tuple of `(array, missing mask, invalid mask)`.
+        Numeric fields are encoded as float arrays, others as object arrays."""
+        if self.numeric:
+            arr = _to_float_array(values)
+            if arr is None:
+                arr = np.empty(len(values), dtype=np.float64)
+                invalid = np.zeros(len(values), dtype=bool)
+                for i, x in enumerate(values):
+                    if x is None or x == '':
+                        arr[i] = np.nan
+                        continue
+                    try:
+                        arr[i] = float(x)
+                    except (TypeError, ValueError):
+                        arr[i] = np.nan
+                        invalid[i] = True
+            else:
+                invalid = np.zeros(len(arr), dtype=bool)
+            missing = np.isnan(arr) & ~invalid
+        else:
+            arr = np.empty(len(values), dtype=object)
+            for i, x in enumerate(values):
+                if x is None or (isinstance(x, float) and math.isnan(x)):
+                    arr[i] = None
+                else:
+                    arr[i] = x if isinstance(x, str) else str(x)
+            invalid = np.zeros(len(arr), dtype=bool)
+            missing = np.equal(arr, None)
+
+        if self.missing_values:
+            missing |= np.isin(arr, list(self.missing_values))
+        if self.invalid_values:
+            invalid |= np.isin(arr, list(self.invalid_values))
+        if self.valid_values and self.optype != 'continuous':
+            invalid |= ~missing & ~np.isin(arr, self.valid_values)
+        if self.intervals:
+            valid = np.zeros(len(arr), dtype=bool)
+            with np.errstate(invalid='ignore'):
+                for left, right, closure in self.intervals:
+                    lower = arr >= left if closure in ('closedOpen', 'closedClosed') else arr > left
+                    upper = arr <= right if closure in ('openClosed', 'closedClosed') else arr < right
+                    valid |= lower & upper
+            invalid |= ~missing & ~valid
+        return arr, missing, invalid
+
+
+def _to_float_array(values):
+    """Convert numeric values to a float array quickly, None if they are not all numeric."""
+    if isinstance(values, np.ndarray) and values.dtype.kind in 'biuf':
+        return values.astype(np.float64, copy=False)
+    try:
+        arr = np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        return None
+    if arr.ndim != 1:
+        return None
+    return arr
+
+
+class MiningField(object):
+    """A field of the mining schema."""
+
+    def __init__(self, elem, data_field):
+        self.name = elem.get('name')
+        self.usage_type = elem.get('usageType', 'active')
+        if self.usage_type not in ('active', 'target', 'predicted', 'supplementary'):
+            raise UnsupportedModelError('Usage type "{t}" not supported'.format(t=self.usage_type))
+        self.data_field = data_field
+        self.invalid_treatment = elem.get('invalidValueTreatment', 'returnInvalid')
+        if self.invalid_treatment not in ('returnInvalid', 'asIs', 'asMissing'):
+            raise UnsupportedModelError('Invalid value treatment "{t}" not supported'.format(
+                t=self.invalid_treatment))
+        if elem.get('outliers', 'asIs') != 'asIs':
+            raise UnsupportedModelError('Outlier treatment not supported')
+        replacement = elem.get('missingValueReplacement')
+        self.missing_replacement = parse_value(replacement, data_field.data_type) \
+            if data_field is not None else None
+
+    @property
+    def is_target(self):
+        return self.usage_type in ('target', 'predicted')
+
+
+class MiningSchema(object):
+    def __init__(self, elem, data_dictionary):
+        if elem is None:
+            raise UnsupportedModelError('MiningSchema is required')
+        self.fields = []
+        for x in elem.findall('MiningField'):
+            name = x.get('name')
+            if name not in data_dictionary:
+                raise UnsupportedModelError('Field "{name}" not found in DataDictionary'.format(name=name))
+            self.fields.append(MiningField(x, data_dictionary[name]))
+
+    @property
+    def active_fields(self):
+        return [x for x in self.fields if x.usage_type == 'active']
+
+    @property
+    def target_fields(self):
+        return [x for x in self.fields if x.is_target]
+
+
+def parse_data_dictionary(root):
+    elem = root.find('DataDictionary')
+    if elem is None:
+        raise UnsupportedModelError('DataDictionary is required')
+    return {x.get('name'): DataField(x) for x in elem.findall('DataField')}
+
+
+def check_transformations(elem):
+    """Derived fields are not supported."""
+    for name in ('TransformationDictionary', 'LocalTransformations', 'Targets'):
+        child = elem.find(name)
+        if child is not None and len(child):
+            raise UnsupportedModelError('{name} not supported'.format(name=name))
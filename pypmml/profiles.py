@@ -0,0 +1,182 @@
+#
+# Copyright (c) 2024 AutoDeployAI
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+Workload profiles of the JVM.
+
+A profile picks the heap size, the garbage collector and the JIT options from the memory and cores available to the
+process, that are the limits of the container if it runs in one. Options given explicitly in `java_opts` or
+`JAVA_OPTS` always win over the ones of a profile.
+"""
+
+import os
+
+from pypmml.jvm import PMMLError
+
+LOW_LATENCY = 'low-latency'
+THROUGHPUT = 'throughput'
+MEMORY_CONSTRAINED = 'memory-constrained'
+
+PROFILES = (LOW_LATENCY, THROUGHPUT, MEMORY_CONSTRAINED)
+
+# Fractions of the available memory for the heap, the rest is left to metaspace, code cache, threads and Python
+_HEAP_FRACTIONS = {
+    LOW_LATENCY: 0.5,
+    THROUGHPUT: 0.7,
+    MEMORY_CONSTRAINED: 0.25,
+}
+
+_MIN_HEAP_MB = 64
+
+# Larger heaps rarely help scoring, and lose compressed pointers beyond 32g
+_MAX_HEAP_MB = 16 << 10
+
+# Options of the heap size in any forms, by the option of the profile they replace
+_HEAP_OPTS = {
+    '-Xmx': '-Xmx',
+    'MaxHeapSize': '-Xmx',
+    'MaxRAM': '-Xmx',
+    'MaxRAMPercentage': '-Xmx',
+    'MinRAMPercentage': '-Xmx',
+    '-Xms': '-Xms',
+    'InitialHeapSize': '-Xms',
+    'InitialRAMPercentage': '-Xms',
+}
+
+_GC_PREFIXES = ('-XX:+UseSerialGC', '-XX:+UseParallelGC', '-XX:+UseG1GC', '-XX:+UseZGC', '-XX:+UseShenandoahGC',
+                '-XX:+UseConcMarkSweepGC', '-XX:+UseEpsilonGC')
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except (IOError, OSError):
+        return None
+
+
+def _cgroup_memory():
+    """The limit of memory of the cgroup of this process, None if there is no limit."""
+    limits = []
+    value = _read('/sys/fs/cgroup/memory.max')
+    if value and value != 'max':
+        limits.append(int(value))
+    value = _read('/sys/fs/cgroup/memory/memory.limit_in_bytes')
+    # cgroup v1 reports a huge number if there is no limit
+    if value and int(value) < 1 << 60:
+        limits.append(int(value))
+    return min(limits) if limits else None
+
+
+def available_memory():
+    """The bytes of memory available to this process, the limit of cgroup if any, otherwise the physical memory.
+    None if unknown."""
+    limit = _cgroup_memory()
+    limits = [limit] if limit is not None else []
+    try:
+        limits.append(os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES'))
+    except (AttributeError, ValueError, OSError):
+        pass
+    return min(limits) if limits else None
+
+
+def available_cpus():
+    """The number of cores available to this process, the quota of cgroup if any, otherwise the cores it can
+    run on."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    quota = None
+    value = _read('/sys/fs/cgroup/cpu.max')
+    if value:
+        parts = value.split()
+        if len(parts) == 2 and parts[0] != 'max':
+            quota = float(parts[0]) / float(parts[1])
+    else:
+        value = _read('/sys/fs/cgroup/cpu/cpu.cfs_quota_us')
+        period = _read('/sys/fs/cgroup/cpu/cpu.cfs_period_us')
+        if value and period and int(value) > 0:
+            quota = float(value) / float(period)
+    if quota is not None:
+        cpus = min(cpus, max(1, int(quota + 0.5)))
+    return cpus
+
+
+def profile_java_opts(profile, memory=None, cpus=None):
+    """
+    Return the options of Java for a workload profile.
+
+    :param profile: one of `PROFILES`:
+        "low-latency" sizes a heap of half the memory collected by G1 with short pause goals, that is fixed and
+        pre-touched if the memory is limited, i.e. given by `memory` or by a limit of cgroup,
+        "throughput" sizes a heap of 70% of the memory collected by the parallel collector with a thread per core,
+        "memory-constrained" sizes a quarter of the memory for a heap collected by the serial collector, and only
+        compiles with C1 to save the memory of the code cache.
+    :param memory: the bytes of memory available, `available_memory()` by default.
+    The heap is at most 16g.
+    :param cpus: the number of cores available, `available_cpus()` by default.
+    """
+    if profile not in PROFILES:
+        raise PMMLError('Profile "{profile}" not supported, use one of {profiles}'.format(
+            profile=profile, profiles=', '.join(PROFILES)))
+    # Outside of a container, the memory is the one of the host, that is shared with other processes
+    limited = memory is not None or _cgroup_memory() is not None
+    memory = available_memory() if memory is None else memory
+    cpus = available_cpus() if cpus is None else cpus
+
+    opts = ['-XX:ActiveProcessorCount={n}'.format(n=cpus)]
+    fixed = profile == LOW_LATENCY and limited
+    if memory:
+        heap = min(_MAX_HEAP_MB, max(_MIN_HEAP_MB, int(memory * _HEAP_FRACTIONS[profile]) >> 20))
+        opts.append('-Xmx{n}m'.format(n=heap))
+        if fixed:
+            # A fixed heap is never resized during requests
+            opts.append('-Xms{n}m'.format(n=heap))
+        elif profile == MEMORY_CONSTRAINED:
+            opts.append('-Xms{n}m'.format(n=_MIN_HEAP_MB))
+
+    if profile == LOW_LATENCY:
+        opts.extend(['-XX:+UseG1GC', '-XX:MaxGCPauseMillis=20', '-XX:+ParallelRefProcEnabled'])
+        if fixed:
+            opts.append('-XX:+AlwaysPreTouch')
+    elif profile == THROUGHPUT:
+        opts.extend(['-XX:+UseParallelGC', '-XX:ParallelGCThreads={n}'.format(n=cpus)])
+    else:
+        opts.extend(['-XX:+UseSerialGC', '-XX:TieredStopAtLevel=1', '-XX:ReservedCodeCacheSize=32m', '-Xss512k',
+                     '-XX:MaxMetaspaceSize=128m'])
+    return opts
+
+
+def merge_java_opts(profile_opts, java_opts):
+    """Merge options of a profile with the explicit ones, options of the profile that are given explicitly, e.g.
+    the heap size in any forms or the collector, are dropped. An explicit max heap also drops the initial heap and
+    the pre-touch of the profile, that are sized for its own max heap."""
+    def key(opt):
+        if opt.startswith(('-Xmx', '-Xms', '-Xss')):
+            return opt[:4]
+        elif opt.startswith(_GC_PREFIXES):
+            return 'gc'
+        elif opt.startswith('-XX:'):
+            name = opt[4:].lstrip('+-').split('=')[0]
+            return _HEAP_OPTS.get(name, name)
+        return opt
+
+    explicit = set(key(x) for x in java_opts)
+    if '-Xmx' in explicit:
+        explicit.update(['-Xms', 'AlwaysPreTouch'])
+    return [x for x in profile_opts if key(x) not in explicit] + list(java_opts)
@@ -0,0 +1,413 @@
+#
+# Copyright (c) 2024 AutoDeployAI
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+A lightweight HTTP scoring server for PMML models.
+
+Endpoints:
+  - ``GET /health``: liveness, always ``{"status": "ok"}`` while the server is up.
+  - ``GET /ready``: readiness, whether the JVM gateway is up and models are loaded.
+  - ``GET /models``: the served models with their input and output names.
+  - ``GET /metrics``: request, batch and latency metrics of all models.
+  - ``POST /models/<name>/predict``: score a single record (JSON object), a list of
+    records (JSON array of objects), or a ``split`` payload (``{"columns": [...], "data": [[...]]}``).
+    The result is returned in the same format as the input.
+
+Concurrent requests to the same model are merged into a single ``split`` JSON call to the JVM.
+"""
+
+import json
+import os
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from queue import Queue, Empty
+from threading import Thread, Lock
+
+from pypmml.base import PMMLContext
+from pypmml.jvm import PMMLError
+from pypmml.metrics import Counter, LatencyStats
+from pypmml.model import Model
+
+
+class BatchMetrics(object):
+    """Metrics of one served model."""
+
+    def __init__(self):
+        self.requests = Counter()
+        self.records = Counter()
+        self.batches = Counter()
+        self.errors = Counter()
+        self.latency = LatencyStats()
+        self.batch_latency = LatencyStats()
+        self.started = time.time()
+
+    def snapshot(self):
+        uptime = max(time.time() - self.started, 1e-9)
+        batches = self.batches.value
+        return {
+            'requests': self.requests.value,
+            'records': self.records.value,
+            'batches': batches,
+            'errors': self.errors.value,
+            'mean_batch_size': self.records.value / batches if batches else 0.0,
+            'records_per_second': self.records.value / uptime,
+            'latency': self.latency.snapshot(),
+            'batch_latency': self.batch_latency.snapshot(),
+        }
+
+
+class MicroBatcher(object):
+    """Merges concurrent scoring requests for a model into single JVM calls.
+
+    :param model: a `Model` to score with.
+    :param max_batch_size: the max number of records in one JVM call.
+    :param max_latency: the max seconds to wait for more requests before a batch is scored.
+    """
+
+    def __init__(self, model, max_batch_size=256, max_latency=0.005):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self.input_names = list(model.inputNames)
+        self.metrics = BatchMetrics()
+        self._queue = Queue()
+        self._lock = Lock()
+        self._closed = False
+        self._worker = Thread(target=self._run, name='pypmml-batcher', daemon=True)
+        self._worker.start()
+
+    def submit(self, rows):
+        """Submit rows ordered by `inputNames`, return a future of the `(columns, rows)` result. Raise `PMMLError`
+        if the batcher is closed."""
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise PMMLError('Batcher is closed')
+            self.metrics.requests.inc()
+            self._queue.put((rows, future))
+        return future
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def close(self):
+        """Stop accepting requests, score the ones already queued, then stop the worker."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            # Always the last item, nothing is queued after it
+            self._queue.put(None)
+        self._worker.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+
+            batch = [item]
+            size = len(item[0])
+            deadline = time.perf_counter() + self.max_latency
+            while size < self.max_batch_size:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except Empty:
+                    break
+                if item is None:
+                    self._score(batch)
+                    return
+                batch.append(item)
+                size += len(item[0])
+
+            self._score(batch)
+
+    def _score(self, batch):
+        rows = [row for request, _ in batch for row in request]
+        try:
+            with self.metrics.batch_latency.time():
+                columns, results = self._predict(rows)
+        except Exception as e:
+            if len(batch) == 1:
+                self.metrics.errors.inc()
+                batch[0][1].set_exception(e)
+            else:
+                # Isolate the bad request, so that it does not fail the others in the same batch
+                for request in batch:
+                    self._score([request])
+            return
+
+        self.metrics.batches.inc()
+        self.metrics.records.inc(len(rows))
+        start = 0
+        for request, future in batch:
+            future.set_result((columns, results[start:start + len(request)]))
+            start += len(request)
+
+    def _predict(self, rows):
+        payload = json.dumps({'columns': self.input_names, 'data': rows})
+        result = json.loads(self.model.predict(payload))
+        return result['columns'], result['data']
+
+
+class ModelServer(object):
+    """An HTTP server that hosts one or more PMML models.
+
+    :param models: a dict of model name to a `Model`, or anything that `Model.load` accepts.
+    :param host: the host to bind, localhost by default.
+    :param port: the port to bind, 0 picks a free port.
+    :param max_batch_size: the max number of records merged into one JVM call.
+    :param max_latency: the max seconds a request waits for others to be merged with.
+    :param timeout: the max seconds a request waits for its result.
+    """
+
+    def __init__(self, models=None, host='127.0.0.1', port=0, max_batch_size=256, max_latency=0.005,
+                 timeout=60.0):
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self.timeout = timeout
+        self._batchers = {}
+        self._lock = Lock()
+        self._thread = None
+        for name, model in (models or {}).items():
+            self.add_model(name, model)
+        self._httpd = _ScoringHTTPServer((host, port), _ScoringHandler)
+        self._httpd.model_server = self
+
+    @property
+    def address(self):
+        """The `(host, port)` the server is bound to."""
+        return self._httpd.server_address[:2]
+
+    @property
+    def url(self):
+        host, port = self.address
+        return 'http://{host}:{port}'.format(host=host, port=port)
+
+    def add_model(self, name, model):
+        """Serve a model under the given name, replacing the one with the same name."""
+        if not isinstance(model, Model):
+            model = Model.load(model)
+        batcher = MicroBatcher(model, max_batch_size=self.max_batch_size, max_latency=self.max_latency)
+        with self._lock:
+            old = self._batchers.get(name)
+            self._batchers[name] = batcher
+        if old is not None:
+            old.close()
+        return model
+
+    def remove_model(self, name):
+        with self._lock:
+            batcher = self._batchers.pop(name, None)
+        if batcher is not None:
+            batcher.close()
+
+    @property
+    def models(self):
+        with self._lock:
+            return {name: batcher.model for name, batcher in self._batchers.items()}
+
+    def batcher(self, name):
+        with self._lock:
+            return self._batchers.get(name)
+
+    def metrics(self):
+        with self._lock:
+            batchers = dict(self._batchers)
+        return {name: batcher.metrics.snapshot() for name, batcher in batchers.items()}
+
+    def ready(self):
+        return PMMLContext.gateway() is not None and len(self.models) > 0
+
+    def start(self):
+        """Start serving in a background thread."""
+        self._thread = Thread(target=self._httpd.serve_forever, name='pypmml-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    def shutdown(self):
+        """Stop serving, and release the socket and all batchers."""
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._httpd.server_close()
+        with self._lock:
+            batchers = list(self._batchers.values())
+            self._batchers.clear()
+        for batcher in batchers:
+            batcher.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.shutdown()
+        return False
+
+    def predict(self, name, payload):
+        """Score a parsed JSON payload with the named model, return the result in the same format."""
+        batcher = self.batcher(name)
+        if batcher is None:
+            raise KeyError(name)
+
+        with batcher.metrics.latency.time():
+            input_names = batcher.input_names
+            if isinstance(payload, dict) and 'columns' in payload and 'data' in payload:
+                rows = _split_rows(payload, input_names)
+            elif isinstance(payload, dict):
+                rows = [[payload.get(x) for x in input_names]]
+            elif isinstance(payload, list) and all(isinstance(x, dict) for x in payload):
+                rows = [[record.get(x) for x in input_names] for record in payload]
+            else:
+                raise PMMLError('Payload must be a record, a list of records, or a split JSON object')
+
+            if not rows:
+                columns, results = [], []
+            else:
+                try:
+                    future = batcher.submit(rows)
+                except PMMLError:
+                    if batcher.closed:
+                        # Removed or replaced in the meantime
+                        raise KeyError(name)
+                    raise
+                columns, results = future.result(timeout=self.timeout)
+
+        if isinstance(payload, list):
+            return [dict(zip(columns, x)) for x in results]
+        elif 'columns' in payload and 'data' in payload:
+            return {'columns': columns, 'data': results}
+        else:
+            return dict(zip(columns, results[0]))
+
+
+def _split_rows(payload, input_names):
+    """Return the rows of a split JSON object in the order of `input_names`, raise `PMMLError` if it is malformed."""
+    columns, data = payload['columns'], payload['data']
+    if not isinstance(columns, list) or not all(isinstance(x, str) for x in columns):
+        raise PMMLError('"columns" must be a list of names')
+    if not isinstance(data, list) or not all(isinstance(x, list) for x in data):
+        raise PMMLError('"data" must be a list of lists')
+    for i, row in enumerate(data):
+        if len(row) != len(columns):
+            raise PMMLError('Row {i} of "data" has {n} values, expected {m} of "columns"'.format(
+                i=i, n=len(row), m=len(columns)))
+    index = {column: i for i, column in enumerate(columns)}
+    return [[row[index[x]] if x in index else None for x in input_names] for row in data]
+
+
+class _ScoringHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class _ScoringHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body):
+        content = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_GET(self):
+        server = self.server.model_server
+        path = self.path.rstrip('/')
+        if path == '/health':
+            self._send(200, {'status': 'ok'})
+        elif path == '/ready':
+            ready = server.ready()
+            self._send(200 if ready else 503, {'ready': ready, 'gateway': PMMLContext.gateway()})
+        elif path == '/models':
+            self._send(200, {name: {'inputNames': model.inputNames, 'outputNames': model.outputNames}
+                             for name, model in server.models.items()})
+        elif path == '/metrics':
+            self._send(200, server.metrics())
+        else:
+            self._send(404, {'error': 'Not found: {path}'.format(path=self.path)})
+
+    def do_POST(self):
+        server = self.server.model_server
+        parts = self.path.strip('/').split('/')
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length)
+        if len(parts) != 3 or parts[0] != 'models' or parts[2] != 'predict':
+            self._send(404, {'error': 'Not found: {path}'.format(path=self.path)})
+            return
+
+        try:
+            payload = json.loads(body)
+        except ValueError as e:
+            self._send(400, {'error': 'Invalid JSON: {e}'.format(e=e)})
+            return
+
+        try:
+            self._send(200, server.predict(parts[1], payload))
+        except KeyError:
+            self._send(404, {'error': 'Model not found: {name}'.format(name=parts[1])})
+        except PMMLError as e:
+            self._send(400, {'error': str(e)})
+        except Exception as e:
+            self._send(500, {'error': str(e)})
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog='python -m pypmml.serve', description='Serve PMML models over HTTP.')
+    parser.add_argument('models', nargs='+', metavar='[NAME=]PATH',
+                        help='PMML files to serve, named by the file name without extension by default')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--max-batch-size', type=int, default=256)
+    parser.add_argument('--max-latency', type=float, default=0.005, help='in seconds')
+    args = parser.parse_args(argv)
+
+    models = {}
+    for spec in args.models:
+        name, sep, path = spec.partition('=')
+        if not sep:
+            path = spec
+            name = os.path.splitext(os.path.basename(spec))[0]
+        models[name] = path
+
+    server = ModelServer(models, host=args.host, port=args.port, max_batch_size=args.max_batch_size,
+                         max_latency=args.max_latency)
+    print('Serving {names} on {url}'.format(names=', '.join(models), url=server.url))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
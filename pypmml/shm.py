@@ -0,0 +1,194 @@
+#
+# Copyright (c) 2024 AutoDeployAI
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+Shared memory transport of large payloads between Python and the JVM.
+
+With the gateway of Py4j, payloads are strings copied through a socket to the JVM in another process. Payloads
+above a threshold of size are written instead into a ring buffer of a file in `/dev/shm`, that is mapped by both
+processes. The JVM decodes a payload from the mapping, scores it, and writes the result into the region reserved
+after it, so only the offsets and the length of the result cross the socket. The transport is skipped for JPype,
+that runs the JVM in process.
+"""
+
+import mmap
+import os
+import tempfile
+from collections import deque
+from threading import Lock
+
+from pypmml.base import PMMLContext
+from pypmml.jvm import PMMLError
+
+
+class SharedMemory(object):
+    """A ring buffer of memory shared with the JVM, see `Model.setTransport`. One buffer can be shared by many models
+    and threads, each call holds a region of it until its result is read.
+
+    :param size: the bytes of the ring buffer, that are only allocated by the system when they are touched.
+    :param threshold: the min number of bytes of a payload to be sent through shared memory.
+    :param output_factor: the bytes reserved for the result of a payload, as a multiple of the bytes of the payload.
+        A result that does not fit is returned through the socket.
+    :param directory: the directory of the file of the buffer, that must be backed by memory, e.g. tmpfs.
+    """
+
+    # The min bytes reserved for a result
+    min_output = 1 << 16
+
+    def __init__(self, size=1 << 28, threshold=1 << 20, output_factor=4.0, directory='/dev/shm'):
+        if not os.path.isdir(directory):
+            raise PMMLError('Directory of shared memory "{directory}" not found'.format(directory=directory))
+        self.size = size
+        self.threshold = threshold
+        self.output_factor = output_factor
+        self.directory = directory
+        self._lock = Lock()
+        self._mapping = None
+        self._calls = 0
+        self._fallbacks = 0
+        self._overflows = 0
+        self._bytes_sent = 0
+        self._bytes_received = 0
+
+    def accepts(self, model, payload):
+        """Whether a payload of a model is sent through shared memory."""
+        return len(payload) >= self.threshold and model._pc.supports_shared_memory()
+
+    def call(self, model, name, payload):
+        """Call a method of String to String of the model with a payload of JSON through shared memory, return the
+        result of JSON. The payload is sent through the socket if there is no room for it in the buffer."""
+        data = payload.encode('utf-8')
+        capacity = max(int(len(data) * self.output_factor), self.min_output)
+        memory, buffer, ring = self._map(model._pc)
+        start = ring.acquire(len(data) + capacity)
+        if start is None:
+            with self._lock:
+                self._fallbacks += 1
+            return model.call(name, payload)
+
+        try:
+            memory[start:start + len(data)] = data
+            output = start + len(data)
+            result = model.call_shared(name, buffer, start, len(data), output, capacity)
+            overflow = not isinstance(result, int)
+            if overflow:
+                received = len(result)
+                result = bytes(result).decode('utf-8')
+            else:
+                received = result
+                with memoryview(memory) as view:
+                    result = str(view[output:output + received], 'utf-8')
+        finally:
+            ring.release(start)
+        with self._lock:
+            self._calls += 1
+            self._overflows += overflow
+            self._bytes_sent += len(data)
+            self._bytes_received += received
+        return result
+
+    def snapshot(self):
+        """
+        Return a dict of the statistics: the number of `calls` through shared memory, the `fallbacks` to the socket
+        because the buffer was full, the `overflows` of results returned through the socket, the bytes sent and
+        received, and the bytes of the buffer `in_use` by calls in flight.
+        """
+        with self._lock:
+            mapping = self._mapping
+            return {
+                'size': self.size,
+                'threshold': self.threshold,
+                'calls': self._calls,
+                'fallbacks': self._fallbacks,
+                'overflows': self._overflows,
+                'bytes_sent': self._bytes_sent,
+                'bytes_received': self._bytes_received,
+                'in_use': mapping[3].in_use if mapping is not None else 0,
+            }
+
+    def close(self):
+        """Unmap the buffer in Python, it is mapped again by the next call."""
+        with self._lock:
+            mapping, self._mapping = self._mapping, None
+        if mapping is not None:
+            if mapping[0] is PMMLContext._gateway:
+                mapping[0].detach(mapping[2])
+            mapping[1].close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _map(self, pc):
+        """Return the mapping of the buffer in both processes and its ring, that are created again if the gateway
+        is launched again."""
+        with self._lock:
+            if self._mapping is None or self._mapping[0] is not PMMLContext._gateway:
+                fd, path = tempfile.mkstemp(prefix='pypmml-', dir=self.directory)
+                try:
+                    os.ftruncate(fd, self.size)
+                    memory = mmap.mmap(fd, self.size)
+                    buffer = pc.map_shared(path, self.size)
+                finally:
+                    # Both mappings outlive the file, that is never left behind
+                    os.close(fd)
+                    os.unlink(path)
+                self._mapping = (PMMLContext._gateway, memory, buffer, _Ring(self.size))
+            return self._mapping[1:]
+
+
+class _Ring(object):
+    """Allocation of regions of a ring buffer in order, a region is reused when all regions before it are released.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._regions = deque()
+        self._lock = Lock()
+
+    @property
+    def in_use(self):
+        with self._lock:
+            return sum(x[1] - x[0] for x in self._regions)
+
+    def acquire(self, n):
+        """Return the offset of a region of `n` bytes, None if there is no room for it."""
+        with self._lock:
+            if not self._regions:
+                start = 0 if n <= self.size else None
+            else:
+                head = self._regions[0][0]
+                tail = self._regions[-1][1]
+                if self._regions[-1][0] >= head:
+                    # Free at the end and before the head
+                    start = tail if tail + n <= self.size else (0 if n <= head else None)
+                else:
+                    # Wrapped, free between the tail and the head
+                    start = tail if tail + n <= head else None
+            if start is not None:
+                self._regions.append([start, start + n, False])
+            return start
+
+    def release(self, start):
+        with self._lock:
+            for x in self._regions:
+                if x[0] == start and not x[2]:
+                    x[2] = True
+                    break
+            while self._regions and self._regions[0][2]:
+                self._regions.popleft()
@@ -0,0 +1,107 @@
+#
+# Copyright (c) 2024 AutoDeployAI
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import time
+import unittest
+from unittest import TestCase
+from os import path
+
+from pypmml import Model
+from pypmml.cache import ResultCache, canonicalize
+
+
+class CacheTestCase(TestCase):
+    test_data_dir = path.join(path.dirname(__file__), 'resources', 'data')
+    test_models_dir = path.join(path.dirname(__file__), 'resources', 'models')
+
+    def test_result_cache(self):
+        cache = ResultCache(maxsize=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertEqual(cache.get('a'), (True, 1))
+        cache.put('c', 3)
+        # 'b' is the least recently used one
+        self.assertEqual(cache.get('b'), (False, None))
+        self.assertEqual(cache.get('c'), (True, 3))
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.evictions.value, 1)
+        self.assertEqual(cache.hit_ratio, 2 / 3)
+
+        cache = ResultCache(ttl=0.01)
+        cache.put('a', 1)
+        time.sleep(0.02)
+        self.assertEqual(cache.get('a'), (False, None))
+
+        self.assertEqual(canonicalize([1, float('nan'), None, 'x']), (1, None, None, 'x'))
+
+    def test_model_cache(self):
+        model_path = path.join(self.test_models_dir, 'single_iris_dectree.xml')
+        cache = ResultCache()
+        model = Model.load(model_path).setCache(cache)
+
+        record = {'sepal_length': 5.1, 'sepal_width': 3.5, 'petal_length': 1.4, 'petal_width': 0.2}
+        self.assertEqual(model.predict(record)['predicted_class'], 'Iris-setosa')
+        self.assertEqual(model.predict(dict(reversed(list(record.items()))))['predicted_class'], 'Iris-setosa')
+        self.assertEqual(cache.hits.value, 1)
+        self.assertEqual(cache.misses.value, 1)
+
+        # Partial hits in a batch
+        result = model.predict([[5.1, 3.5, 1.4, 0.2], [7, 3.2, 4.7, 1.4]])
+        self.assertEqual(result[1][0], 'Iris-versicolor')
+        result = model.predict([[7, 3.2, 4.7, 1.4], [5.1, 3.5, 1.4, 0.2], [6.3, 3.3, 6.0, 2.5]])
+        self.assertEqual([x[0] for x in result], ['Iris-versicolor', 'Iris-setosa', 'Iris-virginica'])
+        self.assertEqual(cache.hits.value, 3)
+        self.assertEqual(cache.misses.value, 4)
+
+        # Binding to a reloaded model invalidates the cache and detaches it from the previous model
+        reloaded = Model.load(model_path).setCache(cache)
+        self.assertEqual(len(cache), 0)
+        self.assertIs(reloaded.cache, cache)
+        self.assertIsNone(model.cache)
+        reloaded.predict(record)
+        model.predict(record)
+        self.assertEqual(len(cache), 1)
+
+    def test_pandas(self):
+        try:
+            import pandas as pd
+            model_path = path.join(self.test_models_dir, 'single_iris_dectree.xml')
+            model = Model.load(model_path)
+            data = pd.read_csv(path.join(self.test_data_dir, 'Iris.csv'))
+            expected = model.predict(data)
+
+            cache = ResultCache()
+            model.setCache(cache)
+            result = model.predict(data.iloc[:10])
+            pd.testing.assert_frame_equal(result, expected.iloc[:10], check_dtype=False)
+            result = model.predict(data)
+            pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+            # The Iris data has duplicate rows that are scored only once
+            self.assertLess(cache.misses.value, len(data) + 10)
+            self.assertGreaterEqual(cache.hits.value, 10)
+
+            # Results of 2-D ndarrays do not leak into DataFrames of the same rows
+            cache.clear()
+            features = data[model.inputNames]
+            model.predict(features.values[:5])
+            result = model.predict(features.iloc[:5])
+            self.assertEqual(list(result.columns), list(expected.columns))
+        except ImportError:
+            pass
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+#
+# Copyright (c) 2024 AutoDeployAI
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import json
+import unittest
+from unittest import TestCase
+from os import path
+
+from pypmml import Model, PMMLContext, PMMLError
+from pypmml.compression import Compression
+
+
+class CompressionTestCase(TestCase):
+    test_data_dir = path.join(path.dirname(__file__), 'resources', 'data')
+    test_models_dir = path.join(path.dirname(__file__), 'resources', 'models')
+
+    def test_compression(self):
+        model = Model.load(path.join(self.test_models_dir, 'single_iris_dectree.xml'))
+        rows = [[5.1, 3.5, 1.4, 0.2], [7, 3.2, 4.7, 1.4], [6.3, 3.3, 6.0, 2.5]] * 100
+        payload = json.dumps({'columns': model.inputNames, 'data': rows})
+        expected = model.predict(payload)
+
+        compression = Compression(level=6, threshold=1024, probe_interval=3)
+        model.setCompression(compression)
+        self.assertIs(model.compression, compression)
+        for _ in range(3):
+            self.assertEqual(model.predict(payload), expected)
+        # Small payloads are not compressed
+        model.predict('[{"sepal_length": 5.1}]')
+
+        stats = compression.snapshot()
+        pc = PMMLContext.getOrCreate()
+        if pc.supports_compression():
+            self.assertEqual(stats['calls'], 2)
+            self.assertEqual(stats['probes'], 1)
+            self.assertEqual(stats['raw_bytes_sent'], 2 * len(payload))
+            self.assertLess(stats['compressed_bytes_sent'], stats['raw_bytes_sent'])
+            self.assertGreater(stats['ratio'], 1)
+            self.assertIsNotNone(stats['saved_ms'])
+
+            # Errors of uncompressed probes are raised as the ones of compressed calls
+            for _ in range(3):
+                with self.assertRaises(PMMLError):
+                    model.predict('[{bad' + ' ' * 1024)
+
+            # Every payload is a probe
+            compression = Compression(threshold=1024, probe_interval=1)
+            model.setCompression(compression)
+            for _ in range(2):
+                self.assertEqual(model.predict(payload), expected)
+            stats = compression.snapshot()
+            self.assertEqual(stats['probes'], 2)
+            self.assertEqual(stats['calls'], 0)
+            self.assertIsNone(stats['saved_ms'])
+        else:
+            self.assertEqual(stats['calls'], 0)
+
+        with self.assertRaises(ValueError):
+            Compression(level=10)
+
+    def test_pandas(self):
+        try:
+            import pandas as pd
+            model = Model.load(path.join(self.test_models_dir, 'single_iris_dectree.xml'))
+            data = pd.read_csv(path.join(self.test_data_dir, 'Iris.csv'))
+            expected = model.predict(data)
+            model.setCompression(Compression(threshold=1024))
+            pd.testing.assert_frame_equal(model.predict(data), expected)
+            pd.testing.assert_frame_equal(pd.DataFrame(model.predict(data.iloc[:, :4].values)),
+                                          pd.DataFrame(model.setCompression(None).predict(data.iloc[:, :4].values)))
+        except ImportError:
+            pass
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+#
+# Copyright (c) 2024 AutoDeployAI
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import unittest
+from unittest import TestCase
+from os import path
+
+from pypmml import Model
+
+
+class DaskTestCase(TestCase):
+    test_data_dir = path.join(path.dirname(__file__), 'resources', 'data')
+    test_models_dir = path.join(path.dirname(__file__), 'resources', 'models')
+
+    def test_predict(self):
+        try:
+            import pandas as pd
+            import dask.dataframe as dd
+            from distributed import Client, LocalCluster
+            import pypmml.dask as pypmml_dask
+
+            model_path = path.join(self.test_models_dir, 'single_iris_dectree.xml')
+            data = pd.read_csv(path.join(self.test_data_dir, 'Iris.csv'))
+            model = Model.load(model_path)
+            expected = model.predict(data)
+
+            ddf = dd.from_pandas(data, npartitions=4)
+            result = pypmml_dask.predict(ddf, model)
+            # Metadata comes from outputFields
+            self.assertEqual(list(result.columns), model.outputNames)
+            self.assertEqual(result.dtypes['probability'], 'float64')
+            self.assertEqual(result.npartitions, 4)
+
+            with LocalCluster(n_workers=1, threads_per_worker=2, processes=False) as cluster, Client(cluster):
+                for engine in ('jvm', 'native'):
+                    actual = pypmml_dask.predict(ddf, model_path, engine=engine).compute()
+                    self.assertEqual(actual['predicted_class'].tolist(), expected['predicted_class'].tolist())
+                    for x, y in zip(actual['probability'], expected['probability']):
+                        self.assertAlmostEqual(x, y)
+                    self.assertEqual(actual['node_id'].tolist(), [str(x) for x in expected['node_id']])
+                    self.assertEqual(actual.index.tolist(), data.index.tolist())
+
+            # Models are cached by the hash of content
+            document = pypmml_dask.PMMLDocument(model_path)
+            self.assertIs(document.load(), pypmml_dask.PMMLDocument(model).load())
+        except ImportError:
+            pass
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+#
+# Copyright (c) 2024 AutoDeployAI
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import time
+import unittest
+from unittest import TestCase
+from os import path
+
+from pypmml import Model
+from pypmml.deadline import Deadline, DeadlineExceeded
+
+
+class CancelAfterFirstChunk(Deadline):
+    def run(self, pc, submit):
+        result = super(CancelAfterFirstChunk, self).run(pc, submit)
+        self.cancel()
+        return result
+
+
+class DeadlineTestCase(TestCase):
+    test_data_dir = path.join(path.dirname(__file__), 'resources', 'data')
+    test_models_dir = path.join(path.dirname(__file__), 'resources', 'models')
+
+    def test_deadline(self):
+        model = Model.load(path.join(self.test_models_dir, 'single_iris_dectree.xml'))
+        record = {'sepal_length': 5.1, 'sepal_width': 3.5, 'petal_length': 1.4, 'petal_width': 0.2}
+        self.assertEqual(model.predict(record, timeout=30)['predicted_class'], 'Iris-setosa')
+        self.assertEqual(model.timeouts.value, 0)
+
+        with self.assertRaises(DeadlineExceeded):
+            model.predict(record, timeout=1e-9)
+        self.assertEqual(model.timeouts.value, 1)
+
+        # Lists of lists are scored as without a deadline
+        rows = [[5.1, 3.5, 1.4, 0.2], [7, 3.2, 4.7, 1.4], [None, None, None, None]]
+        self.assertEqual(model.predict(rows, timeout=30), model.predict(rows))
+
+        try:
+            import pandas as pd
+            data = pd.read_csv(path.join(self.test_data_dir, 'Iris.csv'))[model.inputNames]
+            expected = model.predict(data)
+            self.assertTrue(model.predict(data, timeout=30).equals(expected))
+
+            # Rows of the first chunk are returned, the others are missing
+            model.chunk_size = 100
+            result, errors = model.predict(data, return_errors=True, timeout=CancelAfterFirstChunk())
+            self.assertEqual(len(result), len(data))
+            self.assertEqual(list(result['predicted_class'][:100]), list(expected['predicted_class'][:100]))
+            self.assertTrue(result['predicted_class'][100:].isna().all())
+            self.assertEqual([x['index'] for x in errors], list(range(100, len(data))))
+            self.assertEqual(model.timeouts.value, 2)
+
+            result = model.predict(data.values, timeout=CancelAfterFirstChunk())
+            self.assertEqual(result.shape, (len(data), len(model.outputNames)))
+            self.assertEqual(list(result[:100, 0]), list(expected['predicted_class'][:100]))
+            self.assertEqual(model.timeouts.value, 3)
+        except ImportError:
+            pass
+
+    def test_blocked_gateway(self):
+        model = Model.load(path.join(self.test_models_dir, 'single_iris_dectree.xml'))
+        submit = model.submit
+
+        def blocked(*args):
+            # A gateway that does not respond, e.g. during a long GC pause
+            time.sleep(2)
+            return submit(*args)
+
+        model.submit = blocked
+        start = time.monotonic()
+        with self.assertRaises(DeadlineExceeded):
+            model.predict({'sepal_length': 5.1, 'sepal_width': 3.5, 'petal_length': 1.4, 'petal_width': 0.2},
+                          timeout=0.1)
+        self.assertLess(time.monotonic() - start, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
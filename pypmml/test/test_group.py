@@ -0,0 +1,96 @@
+#
+# Copyright (c) 2024 AutoDeployAI
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import unittest
+from unittest import TestCase
+from os import path
+
+from pypmml import Model, PMMLError
+from pypmml.group import ModelGroup
+
+
+class GroupTestCase(TestCase):
+    test_models_dir = path.join(path.dirname(__file__), 'resources', 'models')
+
+    def _models(self):
+        names = ['regression_model.xml', 'tree_regression.xml', 'gbm_regression.xml']
+        return {x.split('.')[0]: Model.load(path.join(self.test_models_dir, x)) for x in names}
+
+    def test_predict(self):
+        models = self._models()
+        with ModelGroup(models) as group:
+            self.assertEqual(group.inputNames, ['x1', 'x2', 'c', 'x3', 'x4'])
+            record = {'x1': 1, 'x2': 2, 'c': 'a', 'x3': 0.5, 'x4': 3}
+            results = group.predict(record)
+            self.assertEqual(set(results), set(models))
+            for name, model in models.items():
+                self.assertEqual(results[name], dict(model.predict(record)))
+
+            combined = group.predict(record, combine=True)
+            self.assertEqual(combined['regression_model.predicted_y'], results['regression_model']['predicted_y'])
+
+            with self.assertRaises(PMMLError):
+                group.predict(object())
+
+            records = [record, dict(record, x1=5)]
+            combined = group.predict(records, combine=True)
+            self.assertEqual([x['regression_model.predicted_y'] for x in combined],
+                             [models['regression_model'].predict(x)['predicted_y'] for x in records])
+
+        # Failures of members are raised
+        with self.assertRaises(PMMLError):
+            ModelGroup(models, max_workers=1).predict('[{bad')
+
+    def test_pandas(self):
+        try:
+            import numpy as np
+            import pandas as pd
+            models = self._models()
+            group = ModelGroup(list(models.values()))
+            self.assertEqual(group.names, ['0', '1', '2'])
+
+            rng = np.random.RandomState(7)
+            data = pd.DataFrame({'x1': rng.uniform(-3, 8, 100), 'x2': rng.uniform(-3, 8, 100),
+                                 'c': rng.choice(['a', 'b', 'q'], 100), 'x3': rng.uniform(-3, 8, 100),
+                                 'x4': rng.uniform(-3, 8, 100)})
+            results = group.predict(data)
+            for i, model in enumerate(models.values()):
+                pd.testing.assert_frame_equal(results[str(i)], model.predict(data))
+
+            combined = group.predict(data, combine=True, sep='_')
+            self.assertEqual(list(combined.columns), ['0_predicted_y', '1_predicted_y', '1_node_id', '2_predicted_y'])
+            self.assertEqual(len(combined), 100)
+
+            result = group.predict(data.values, combine=True)
+            self.assertEqual(result.shape, (100, 4))
+            group.close()
+
+            # Members of the native engine only take their own columns of the group
+            iris = Model.load(path.join(self.test_models_dir, 'single_iris_dectree.xml'))
+            expected = iris.predict(np.array([[5.1, 3.5, 1.4, 0.2], [7, 3.2, 4.7, 1.4]]))
+            iris.setEngine('native')
+            with ModelGroup({'iris': iris, 'gbm': models['gbm_regression']}) as group:
+                self.assertEqual(len(group.inputNames), 8)
+                data = np.array([[5.1, 3.5, 1.4, 0.2, 1, 2, 0.5, 3], [7, 3.2, 4.7, 1.4, 1, 2, 0.5, 3]])
+                results = group.predict(data)
+                self.assertEqual(results['iris'].tolist(), expected.tolist())
+                self.assertEqual(group.predict(data, combine=True).shape, (2, 7))
+        except ImportError:
+            pass
+
+
+if __name__ == '__main__':
+    unittest.main()
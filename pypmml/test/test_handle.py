@@ -0,0 +1,131 @@
+#
+# Copyright (c) 2024 AutoDeployAI
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import TestCase
+from os import path
+from threading import Thread
+
+from pypmml import Model, PMMLError
+from pypmml.handle import ModelHandle
+
+
+class HandleTestCase(TestCase):
+    test_models_dir = path.join(path.dirname(__file__), 'resources', 'models')
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.model_path = path.join(self.temp_dir, 'model.xml')
+        with open(path.join(self.test_models_dir, 'regression_model.xml')) as f:
+            self.content = f.read()
+        self._write(1)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _write(self, intercept):
+        content = self.content.replace('intercept="1.5"', 'intercept="{x}"'.format(x=intercept))
+        self.assertIn('intercept="{x}"'.format(x=intercept), content)
+        with open(self.model_path, 'w') as f:
+            f.write(content)
+
+    def _predict(self, handle):
+        return handle.predict({'x1': 1, 'x2': 2, 'c': 'a'})['predicted_y']
+
+    def test_reload(self):
+        with ModelHandle(self.model_path) as handle:
+            self.assertEqual(handle.version, 1)
+            expected = self._predict(handle)
+
+            self._write(11)
+            with handle.acquire() as old:
+                self.assertEqual(handle.reload(), 2)
+                # Calls in flight keep their version
+                self.assertFalse(old.released)
+                self.assertEqual(old.predict({'x1': 1, 'x2': 2, 'c': 'a'})['predicted_y'], expected)
+            self.assertTrue(old.released)
+            with self.assertRaises(PMMLError):
+                old.predict({'x1': 1, 'x2': 2, 'c': 'a'})
+            self.assertEqual(self._predict(handle), expected + 10)
+
+            # A broken model keeps the current version serving
+            with self.assertRaises(Exception):
+                handle.reload('<PMML>')
+            self.assertEqual(handle.version, 2)
+            self.assertEqual(handle.failures.value, 1)
+            self.assertEqual(handle.reload(wait=False).result(timeout=30), 3)
+            with handle.acquire() as model:
+                pass
+        self.assertTrue(model.released)
+        with self.assertRaises(PMMLError):
+            with handle.acquire():
+                pass
+
+    def test_concurrent_reload(self):
+        releases = []
+
+        def loader(source):
+            model = Model.load(source)
+            release = model.release
+
+            def counted():
+                releases.append(model)
+                release()
+            model.release = counted
+            return model
+
+        errors = []
+        with ModelHandle(self.model_path, loader=loader) as handle:
+            def run():
+                try:
+                    for _ in range(20):
+                        self._predict(handle)
+                except Exception as e:
+                    errors.append(e)
+
+            threads = [Thread(target=run) for _ in range(4)]
+            for x in threads:
+                x.start()
+            for _ in range(5):
+                handle.reload()
+            for x in threads:
+                x.join()
+        self.assertEqual(errors, [])
+        # Each version is released once
+        self.assertEqual(len(releases), 6)
+        self.assertEqual(len(set(id(x) for x in releases)), 6)
+
+    def test_watch(self):
+        with ModelHandle(self.model_path, watch=True, interval=0.05) as handle:
+            expected = self._predict(handle)
+            time.sleep(0.1)
+            self._write(21)
+            # Make sure that the change is visible even with coarse mtime
+            os.utime(self.model_path, (time.time() + 10, time.time() + 10))
+            deadline = time.time() + 30
+            while handle.version == 1 and time.time() < deadline:
+                time.sleep(0.05)
+            self.assertEqual(handle.version, 2)
+            self.assertEqual(self._predict(handle), expected + 20)
+            self.assertEqual(handle.reloads.value, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
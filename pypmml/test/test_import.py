@@ -0,0 +1,55 @@
+#
+# Copyright (c) 2024 AutoDeployAI
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import subprocess
+import sys
+import unittest
+from unittest import TestCase
+from os import path
+
+
+class ImportTestCase(TestCase):
+    root_dir = path.dirname(path.dirname(path.dirname(path.abspath(__file__))))
+
+    def _loaded(self, code):
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join([self.root_dir] + ([env['PYTHONPATH']] if env.get('PYTHONPATH') else []))
+        output = subprocess.check_output([sys.executable, '-c', code + '\n'
+                                          'import sys\n'
+                                          'print(",".join(sorted(set(x.split(".")[0] for x in sys.modules))))'],
+                                         env=env)
+        return output.decode('utf-8').strip().split(',')
+
+    def test_import(self):
+        loaded = self._loaded('import pypmml')
+        for name in ['numpy', 'pandas', 'py4j', 'jpype']:
+            self.assertNotIn(name, loaded)
+
+        loaded = self._loaded('from pypmml.utils import is_nd_array, is_pandas_dataframe\n'
+                              'assert not is_nd_array([1, 2]) and not is_pandas_dataframe({})')
+        self.assertNotIn('numpy', loaded)
+        self.assertNotIn('pandas', loaded)
+
+    def test_gateway(self):
+        loaded = self._loaded('from pypmml.jvm import Py4jGateway\n'
+                              'Py4jGateway()')
+        self.assertIn('py4j', loaded)
+        self.assertNotIn('jpype', loaded)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+#
+# Copyright (c) 2024 AutoDeployAI
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import gc
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+from os import path
+from threading import Barrier
+
+from pypmml import Model, PMMLContext, PMMLError
+
+
+class MemoryTestCase(TestCase):
+    test_models_dir = path.join(path.dirname(__file__), 'resources', 'models')
+
+    def test_memory_footprint(self):
+        model = Model.load(path.join(self.test_models_dir, 'single_iris_dectree.xml'))
+        footprint = model.memory_footprint()
+        self.assertIsNone(footprint['retained_bytes'])
+        self.assertGreater(footprint['serialized_bytes'], 0)
+
+        Model.account_memory = True
+        try:
+            larger = Model.load(path.join(self.test_models_dir, 'gbm_regression.xml'))
+        finally:
+            Model.account_memory = False
+        footprint = larger.memory_footprint()
+        self.assertGreaterEqual(footprint['retained_bytes'], 0)
+        self.assertGreater(footprint['serialized_bytes'], model.memory_footprint()['serialized_bytes'])
+
+        model.release()
+        with self.assertRaises(PMMLError):
+            model.memory_footprint()
+
+    def test_concurrent_loads(self):
+        pc = PMMLContext.getOrCreate()
+        call = pc.call_java_static_func
+        barrier = Barrier(2)
+
+        def overlapped(*args):
+            # Both loads are in progress at the same time
+            barrier.wait(timeout=30)
+            return call(*args)
+
+        paths = [path.join(self.test_models_dir, x) for x in ['single_iris_dectree.xml', 'gbm_regression.xml']]
+        Model.account_memory = True
+        pc.call_java_static_func = overlapped
+        try:
+            with ThreadPoolExecutor(2) as executor:
+                models = list(executor.map(Model.load, paths))
+            del pc.call_java_static_func
+            alone = Model.load(paths[0])
+        finally:
+            Model.account_memory = False
+            pc.__dict__.pop('call_java_static_func', None)
+        # Loads at the same time are not measured, they are not summed up in stats
+        self.assertEqual([x.memory_footprint()['retained_bytes'] for x in models], [None, None])
+        self.assertIsNotNone(alone.memory_footprint()['retained_bytes'])
+        self.assertGreaterEqual(pc.stats()['unmeasured_models'], 2)
+
+    def test_stats(self):
+        pc = PMMLContext.getOrCreate()
+        gc.collect()
+        before = pc.stats()
+        model = Model.load(path.join(self.test_models_dir, 'single_iris_dectree.xml'))
+        fields = model.inputFields
+        stats = pc.stats()
+        self.assertEqual(stats['models'], before['models'] + 1)
+        self.assertEqual(stats['live_objects'], before['live_objects'] + 1 + len(fields))
+        self.assertGreaterEqual(stats['live_objects_by_type']['Field'], len(fields))
+        self.assertGreater(stats['heap']['used'], 0)
+
+        model.release()
+        self.assertEqual(pc.stats()['models'], before['models'])
+
+
+if __name__ == '__main__':
+    unittest.main()
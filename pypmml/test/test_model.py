@@ -18,7 +18,7 @@ import unittest
 from unittest import TestCase
 from os import path
 
-from pypmml import Model, PMMLContext
+from pypmml import Model, PMMLContext, PMMLError
 
 
 class ModelTestCase(TestCase):
@@ -172,6 +172,141 @@ class ModelTestCase(TestCase):
         except ImportError:
             pass
 
+    def test_batch_errors(self):
+        try:
+            import numpy as np
+            model = Model.fromFile(path.join(self.test_models_dir, 'single_iris_dectree.xml'))
+
+            # Rows of unsupported values are not sent
+            data = np.array([[5.1, 3.5, 1.4, 0.2], [{'x': 1}, 3.2, 4.7, 1.4], [7, 3.2, 4.7, 1.4]], dtype=object)
+            result, errors = model.predict(data, return_errors=True)
+            self.assertEqual(len(result), 3)
+            self.assertEqual(result[0][0], 'Iris-setosa')
+            self.assertTrue(result[1][0] is None or result[1][0] != result[1][0])
+            self.assertEqual(result[2][0], 'Iris-versicolor')
+            self.assertEqual([x['index'] for x in errors], [1])
+            self.assertEqual(model.fallbacks.value, 0)
+
+            # Failed rows of the JVM are isolated in halves
+            calls = []
+            call = model.call
+
+            def failing_call(name, *args):
+                if name == 'predict':
+                    calls.append(args[0])
+                    if '"bad"' in args[0]:
+                        raise PMMLError('bad value')
+                return call(name, *args)
+
+            model.call = failing_call
+            data = np.array([[5.1, 3.5, 1.4, 0.2]] * 64, dtype=object)
+            data[10, 1] = 'bad'
+            result, errors = model.predict(data, return_errors=True)
+            self.assertEqual(errors, [{'index': 10, 'error': 'bad value'}])
+            self.assertEqual(result[9][0], 'Iris-setosa')
+            self.assertEqual(result[11][0], 'Iris-setosa')
+            self.assertLess(len(calls), 16)
+            self.assertEqual(model.fallbacks.value, 1)
+
+            # A batch that fails as a whole is not isolated row by row
+            del calls[:]
+            data = np.array([[5.1, 'bad', 1.4, 0.2]] * 512, dtype=object)
+            result, errors = model.predict(data, return_errors=True)
+            self.assertEqual(len(calls), 3)
+            self.assertEqual(errors, [{'index': i, 'error': 'bad value'} for i in range(512)])
+            self.assertTrue(all(x is None or x != x for x in result[:, 0]))
+            self.assertEqual(model.fallbacks.value, 2)
+
+            # Rows that fail with different errors are isolated in no more calls than rows
+            def distinct_call(name, *args):
+                if name == 'predict':
+                    calls.append(args[0])
+                    if '"bad' in args[0]:
+                        raise PMMLError('bad value {n}'.format(n=len(calls)))
+                return call(name, *args)
+
+            model.call = distinct_call
+            del calls[:]
+            data = np.array([[5.1, 'bad', 1.4, 0.2]] * 64, dtype=object)
+            result, errors = model.predict(data, return_errors=True)
+            self.assertLessEqual(len(calls), 65)
+            self.assertEqual([x['index'] for x in errors], list(range(64)))
+            self.assertEqual(model.fallbacks.value, 3)
+
+            # Rows that are not of inputNames are scored one by one
+            model.call = call
+            result = model.predict(np.array([[5.1, 3.5, 1.4, 0.2, 9]]))
+            self.assertEqual(result[0][0], 'Iris-setosa')
+            self.assertEqual(model.fallbacks.value, 4)
+        except ImportError:
+            pass
+
+    def test_sparse(self):
+        try:
+            import numpy as np
+            from scipy import sparse
+            model = Model.fromFile(path.join(self.test_models_dir, 'single_iris_dectree.xml'))
+
+            data = np.array([[5.1, 3.5, 1.4, 0.2], [7, 3.2, 4.7, 1.4], [0, 0, 0, 0], [7, 0, 4.7, np.nan]])
+            expected = model.predict(data)
+            for matrix in (sparse.csr_matrix(data), sparse.csc_matrix(data)):
+                result = model.predict(matrix)
+                self.assertEqual(result.tolist(), expected.tolist())
+
+            # Columns are mapped by names, other columns are dropped
+            columns = ['x', 'petal_width', 'sepal_length', 'petal_length', 'sepal_width']
+            result = model.predict(sparse.csr_matrix(data[:, [0, 3, 0, 2, 1]]), columns=columns)
+            self.assertEqual(result.tolist(), expected.tolist())
+            result = model.predict(sparse.csr_matrix(data[:, [3, 0, 2, 1]]),
+                                   columns={'petal_width': 0, 'sepal_length': 1, 'petal_length': 2, 'sepal_width': 3})
+            self.assertEqual(result.tolist(), expected.tolist())
+            with self.assertRaises(PMMLError):
+                model.predict(sparse.csr_matrix(data), columns={'sepal_length': 4})
+
+            # Only stored entries are sent, the zeros are filled in the JVM
+            payloads = []
+            call_replaced = model.call_replaced
+            model.call_replaced = lambda name, target, replacement, x: payloads.append(x) or \
+                call_replaced(name, target, replacement, x)
+            result = model.predict(sparse.csr_matrix(np.array([[5.1, 0, 0, 0], [0, 0, 0, 0]])))
+            self.assertEqual(payloads, ['[{,"sepal_length":5.1},{}]'])
+            self.assertEqual(result.tolist(), model.predict(np.array([[5.1, 0, 0, 0], [0, 0, 0, 0]])).tolist())
+
+            # Implicit entries of the categorical field are missing, not zeros
+            model = Model.fromFile(path.join(self.test_models_dir, 'regression_model.xml'))
+            result = model.predict(sparse.csr_matrix(np.array([[1, 2, 0]])), columns=['x1', 'x2', 'c'])
+            self.assertEqual(result[0][0], model.predict({'x1': 1, 'x2': 2})['predicted_y'])
+
+            with self.assertRaises(PMMLError):
+                model.predict(sparse.csr_matrix(np.array([[1, 2]])))
+        except ImportError:
+            pass
+
+    def test_arrow(self):
+        try:
+            import pyarrow as pa
+            import polars as pl
+            model = Model.fromFile(path.join(self.test_models_dir, 'single_iris_dectree.xml'))
+
+            data = pl.read_csv(path.join(self.test_data_dir, 'Iris.csv'))
+            result = model.predict(data)
+            self.assertIsInstance(result, pl.DataFrame)
+            self.assertEqual(result.columns, model.outputNames)
+            self.assertEqual(result.row(0), ('Iris-setosa', 1.0, 1.0, 0.0, 0.0, '1'))
+
+            table = data.to_arrow()
+            self.assertTrue(pl.from_arrow(model.predict(table)).equals(result))
+            batch = table.to_batches()[0]
+            self.assertIsInstance(model.predict(batch), pa.RecordBatch)
+
+            # Missing values are nulls
+            model = Model.fromFile(path.join(self.test_models_dir, 'regression_model.xml'))
+            data = pl.DataFrame({'x1': [1, None], 'x2': [2, 2], 'c': ['a', 'b']})
+            self.assertEqual(model.predict(data)['predicted_y'].to_list(), [4.5, None])
+            self.assertEqual(model.setEngine('native').predict(data)['predicted_y'].to_list(), [4.5, None])
+        except ImportError:
+            pass
+
     def test_load(self):
         file_path = path.join(self.test_models_dir, 'single_iris_dectree.xml')
         self.assertTrue(Model.load(file_path) is not None)
@@ -192,6 +327,20 @@ class ModelTestCase(TestCase):
             s = f.read()
             self.assertTrue(Model.load(s) is not None)
 
+    def test_load_many(self):
+        names = ['single_iris_dectree.xml', 'gbm_regression.xml', 'tree_regression.xml', 'missing.xml']
+        paths = [path.join(self.test_models_dir, x) for x in names]
+        results = {path.basename(x.source): x for x in Model.load_many(paths, max_workers=3)}
+        self.assertEqual(set(results), set(names))
+        for name in names[:-1]:
+            self.assertTrue(results[name].ok)
+            expected = Model.load(path.join(self.test_models_dir, name))
+            self.assertEqual(results[name].model.modelElement, expected.modelElement)
+            self.assertGreater(results[name].seconds, 0)
+        self.assertFalse(results['missing.xml'].ok)
+        self.assertIsNone(results['missing.xml'].model)
+        self.assertIsInstance(results['missing.xml'].error, PMMLError)
+
     def test_jpype(self):
         PMMLContext.getOrCreate(gateway="jpype")
         self.assertEqual(PMMLContext.gateway(), "JPype")
@@ -0,0 +1,172 @@
+#
+# Copyright (c) 2024 AutoDeployAI
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import math
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from unittest import TestCase
+from os import path
+
+from pypmml import Model
+
+
+class NativeTestCase(TestCase):
+    test_data_dir = path.join(path.dirname(__file__), 'resources', 'data')
+    test_models_dir = path.join(path.dirname(__file__), 'resources', 'models')
+
+    def _random_records(self, n, seed=7):
+        rnd = random.Random(seed)
+
+        def value(name):
+            if rnd.random() < 0.1:
+                return None
+            if name == 'c':
+                return rnd.choice(['a', 'b', 'c', 'q'])
+            return round(rnd.uniform(-3, 8), 2)
+
+        return [{x: value(x) for x in ['x1', 'x2', 'x3', 'x4', 'c', 'sepal_length', 'sepal_width', 'petal_length',
+                                       'petal_width']} for _ in range(n)]
+
+    def _edge_records(self):
+        """Records of string edge values, and of values that hit split thresholds and interval margins exactly."""
+        thresholds = [0, 0.6, 1.7, 1.85, 1.9, 2, 2.22, 2.8, 2.96, 3, 3.39, 4.3, 4.45, 4.84, 4.85, 5.2, 10]
+        records = [{x: v for x in ['x1', 'x2', 'x3', 'x4', 'sepal_length', 'sepal_width', 'petal_length',
+                                   'petal_width']} for v in thresholds + [str(x) for x in thresholds]]
+        for i, c in enumerate(['', ' ', 'a ', ' a', 'A', 'nan', '1', 'c', 'q', None]):
+            records[i]['c'] = c
+        return records
+
+    def assertSameResult(self, expected, actual):
+        self.assertEqual(set(expected), set(actual))
+        for name, x in expected.items():
+            y = actual[name]
+            if isinstance(x, float) and math.isnan(x):
+                self.assertTrue(y is None or math.isnan(y), name)
+            elif isinstance(x, float):
+                self.assertAlmostEqual(x, y, msg=name)
+            else:
+                self.assertEqual(x, y, name)
+
+    def test_native_model(self):
+        try:
+            from pypmml.native import NativeModel
+
+            model = NativeModel.load(path.join(self.test_models_dir, 'single_iris_dectree.xml'))
+            self.assertEqual(model.modelElement, 'TreeModel')
+            self.assertEqual(model.inputNames, ['sepal_length', 'sepal_width', 'petal_length', 'petal_width'])
+            rows = model.predict_rows({'sepal_length': [5.1, 7], 'sepal_width': [3.5, 3.2],
+                                       'petal_length': [1.4, 4.7], 'petal_width': [0.2, 1.4]}, 2)
+            self.assertEqual(rows[0], ['Iris-setosa', 1.0, 1.0, 0.0, 0.0, '1'])
+            self.assertEqual(rows[1], ['Iris-versicolor', 0.9074074074074074, 0.0, 0.9074074074074074,
+                                       0.09259259259259259, '3'])
+
+            model = NativeModel.load(path.join(self.test_models_dir, 'regression_model.xml'))
+            rows = model.predict_rows({'x1': [1, 1, None, 1], 'x2': [2, 20, 2, 2], 'c': ['a', 'b', 'a', None]}, 4)
+            self.assertEqual(rows[0], [4.5])
+            # x2 is out of its interval
+            self.assertTrue(math.isnan(rows[1][0]))
+            self.assertTrue(math.isnan(rows[2][0]))
+            self.assertEqual(rows[3], [1.5])
+        except ImportError:
+            pass
+
+    def test_compare_jvm(self):
+        try:
+            import pandas as pd
+
+            names = ['single_iris_dectree.xml', 'regression_model.xml', 'tree_regression.xml',
+                     'mining_regression.xml', 'gbm_regression.xml']
+            records = self._random_records(200) + self._edge_records()
+            for name in names:
+                model = Model.load(path.join(self.test_models_dir, name))
+                expected = [model.predict(x) for x in records]
+                model.setEngine('native')
+                self.assertEqual(model.engine, 'native')
+                for x, y in zip(expected, [model.predict(x) for x in records]):
+                    self.assertSameResult(x, y)
+
+            # A segment of weight 0 is still selected by its predicate
+            with open(path.join(self.test_models_dir, 'mining_regression.xml')) as f:
+                content = f.read()
+            for method in ['average', 'weightedAverage', 'median', 'sum', 'weightedSum']:
+                model = Model.load(content.replace('weight="1"', 'weight="0"').replace(
+                    'multipleModelMethod="weightedAverage"', 'multipleModelMethod="{m}"'.format(m=method)))
+                expected = [model.predict(x) for x in records]
+                model.setEngine('native')
+                self.assertEqual(model.engine, 'native')
+                for x, y in zip(expected, [model.predict(x) for x in records]):
+                    self.assertSameResult(x, y)
+
+            model = Model.load(path.join(self.test_models_dir, 'single_iris_dectree.xml'))
+            data = pd.read_csv(path.join(self.test_data_dir, 'Iris.csv'))
+            expected = model.predict(data)
+            model.setEngine('native')
+            pd.testing.assert_frame_equal(expected, model.predict(data))
+        except ImportError:
+            pass
+
+    def test_flat_forest(self):
+        try:
+            import numpy as np
+            from pypmml.native import NativeModel
+            from pypmml.native.flat import TreeEnsembleEvaluator
+
+            model_path = path.join(self.test_models_dir, 'gbm_regression.xml')
+            model = NativeModel.load(model_path)
+            self.assertIsInstance(model.evaluator, TreeEnsembleEvaluator)
+            self.assertEqual(model.evaluator.forest.n_trees, 20)
+
+            records = self._random_records(500)
+            columns = {x: [record[x] for record in records] for x in model.inputNames}
+            expected = model.predict_rows(columns, len(records))
+
+            cache_dir = tempfile.mkdtemp()
+            try:
+                NativeModel.load(model_path, cache_dir)
+                self.assertEqual(len(os.listdir(cache_dir)), 1)
+                loaded = NativeModel.load(model_path, cache_dir)
+                self.assertIsInstance(loaded.evaluator.forest.children, np.memmap)
+                actual = loaded.predict_rows(columns, len(records))
+                for x, y in zip(expected, actual):
+                    self.assertTrue(x == y or (math.isnan(x[0]) and math.isnan(y[0])))
+            finally:
+                shutil.rmtree(cache_dir)
+        except ImportError:
+            pass
+
+    def test_fallback(self):
+        try:
+            import numpy  # noqa
+            model_path = path.join(self.test_models_dir, 'single_iris_dectree.xml')
+            model = Model.load(model_path).setSupplementOutput(True).setEngine('native')
+            self.assertEqual(model.engine, 'jvm')
+
+            with open(model_path) as f:
+                content = f.read()
+            model = Model.load(content.replace('missingValueStrategy="lastPrediction"',
+                                               'missingValueStrategy="weightedConfidence"')).setEngine('native')
+            self.assertEqual(model.engine, 'jvm')
+            result = model.predict({'sepal_length': 5.1, 'sepal_width': 3.5, 'petal_length': 1.4, 'petal_width': 0.2})
+            self.assertEqual(result['predicted_class'], 'Iris-setosa')
+        except ImportError:
+            pass
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+#
+# Copyright (c) 2024 AutoDeployAI
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import unittest
+from unittest import TestCase
+
+from pypmml import PMMLContext, PMMLError
+from pypmml.profiles import PROFILES, available_cpus, available_memory, merge_java_opts, profile_java_opts
+
+
+class ProfilesTestCase(TestCase):
+
+    def test_profile_java_opts(self):
+        memory = 4 << 30
+        opts = profile_java_opts('low-latency', memory=memory, cpus=2)
+        self.assertIn('-Xmx2048m', opts)
+        self.assertIn('-Xms2048m', opts)
+        self.assertIn('-XX:+UseG1GC', opts)
+        self.assertIn('-XX:ActiveProcessorCount=2', opts)
+        self.assertIn('-XX:+AlwaysPreTouch', opts)
+
+        # The heap is capped
+        opts = profile_java_opts('throughput', memory=256 << 30, cpus=2)
+        self.assertIn('-Xmx16384m', opts)
+
+        opts = profile_java_opts('throughput', memory=memory, cpus=4)
+        self.assertIn('-XX:+UseParallelGC', opts)
+        self.assertIn('-XX:ParallelGCThreads=4', opts)
+
+        opts = profile_java_opts('memory-constrained', memory=memory, cpus=1)
+        self.assertIn('-Xmx1024m', opts)
+        self.assertIn('-XX:+UseSerialGC', opts)
+        self.assertIn('-XX:TieredStopAtLevel=1', opts)
+
+        for profile in PROFILES:
+            self.assertTrue(profile_java_opts(profile))
+        self.assertGreater(available_cpus(), 0)
+        self.assertTrue(available_memory() is None or available_memory() > 0)
+
+        with self.assertRaises(PMMLError):
+            profile_java_opts('fast')
+
+    def test_merge_java_opts(self):
+        opts = merge_java_opts(profile_java_opts('throughput', memory=4 << 30, cpus=4),
+                               ['-Xmx1g', '-XX:+UseG1GC', '-Dfoo=bar'])
+        self.assertEqual(opts, ['-XX:ActiveProcessorCount=4', '-XX:ParallelGCThreads=4',
+                                '-Xmx1g', '-XX:+UseG1GC', '-Dfoo=bar'])
+
+        # Percentages of RAM are explicit heap sizes too
+        opts = merge_java_opts(profile_java_opts('low-latency', memory=4 << 30, cpus=2), ['-XX:MaxRAMPercentage=50'])
+        self.assertFalse([x for x in opts if x.startswith(('-Xmx', '-Xms', '-XX:+AlwaysPreTouch'))])
+        self.assertIn('-XX:MaxRAMPercentage=50', opts)
+        opts = merge_java_opts(profile_java_opts('memory-constrained', memory=4 << 30, cpus=1),
+                               ['-XX:InitialRAMPercentage=10'])
+        self.assertIn('-Xmx1024m', opts)
+        self.assertNotIn('-Xms64m', opts)
+
+    def test_jvm_stats(self):
+        stats = PMMLContext.getOrCreate().jvmStats()
+        self.assertGreater(stats['heap']['used'], 0)
+        self.assertGreater(stats['heap']['max'], 0)
+        self.assertTrue(stats['gc'])
+        self.assertEqual(stats['gc_count'], sum(max(0, x['count']) for x in stats['gc']))
+        self.assertGreaterEqual(stats['uptime_ms'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+#
+# Copyright (c) 2024 AutoDeployAI
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import json
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+from os import path
+from urllib.request import Request, urlopen
+from urllib.error import HTTPError
+
+from pypmml import PMMLError
+from pypmml.serve import MicroBatcher, ModelServer
+
+
+class ServeTestCase(TestCase):
+    test_models_dir = path.join(path.dirname(__file__), 'resources', 'models')
+
+    def _get(self, server, url):
+        with urlopen(server.url + url) as r:
+            return json.loads(r.read())
+
+    def _post(self, server, url, payload):
+        request = Request(server.url + url, data=json.dumps(payload).encode('utf-8'),
+                          headers={'Content-Type': 'application/json'})
+        with urlopen(request) as r:
+            return json.loads(r.read())
+
+    def test_serve(self):
+        model_path = path.join(self.test_models_dir, 'single_iris_dectree.xml')
+        with ModelServer({'iris': model_path}, max_latency=0.05) as server:
+            self.assertEqual(self._get(server, '/health'), {'status': 'ok'})
+            self.assertTrue(self._get(server, '/ready')['ready'])
+            self.assertEqual(self._get(server, '/models')['iris']['inputNames'],
+                             ['sepal_length', 'sepal_width', 'petal_length', 'petal_width'])
+
+            # Data in a record
+            result = self._post(server, '/models/iris/predict',
+                                {'sepal_length': 5.1, 'sepal_width': 3.5, 'petal_length': 1.4, 'petal_width': 0.2})
+            self.assertEqual(result['predicted_class'], 'Iris-setosa')
+            self.assertEqual(result['probability'], 1.0)
+
+            # Data in records
+            result = self._post(server, '/models/iris/predict',
+                                [{'sepal_length': 5.1, 'sepal_width': 3.5, 'petal_length': 1.4, 'petal_width': 0.2},
+                                 {'sepal_length': 7, 'sepal_width': 3.2, 'petal_length': 4.7, 'petal_width': 1.4}])
+            self.assertEqual(len(result), 2)
+            self.assertEqual(result[1]['predicted_class'], 'Iris-versicolor')
+            self.assertEqual(result[1]['probability'], 0.9074074074074074)
+
+            # Data in split, the order of columns does not matter
+            result = self._post(server, '/models/iris/predict',
+                                {'columns': ['petal_width', 'petal_length', 'sepal_width', 'sepal_length'],
+                                 'data': [[1.4, 4.7, 3.2, 7]]})
+            self.assertEqual(result['columns'][0], 'predicted_class')
+            self.assertEqual(result['data'][0][0], 'Iris-versicolor')
+
+            # Concurrent requests are merged into batches
+            record = {'sepal_length': 5.1, 'sepal_width': 3.5, 'petal_length': 1.4, 'petal_width': 0.2}
+            with ThreadPoolExecutor(max_workers=16) as executor:
+                results = list(executor.map(lambda _: self._post(server, '/models/iris/predict', record), range(64)))
+            self.assertTrue(all(x['predicted_class'] == 'Iris-setosa' for x in results))
+
+            metrics = self._get(server, '/metrics')['iris']
+            self.assertEqual(metrics['requests'], 67)
+            self.assertEqual(metrics['records'], 68)
+            self.assertLess(metrics['batches'], 67)
+            self.assertEqual(metrics['latency']['count'], 67)
+
+            with self.assertRaises(HTTPError) as cm:
+                self._post(server, '/models/unknown/predict', record)
+            self.assertEqual(cm.exception.code, 404)
+
+            with self.assertRaises(HTTPError) as cm:
+                self._post(server, '/models/iris/predict', 'not a record')
+            self.assertEqual(cm.exception.code, 400)
+
+            # Malformed split payloads
+            for payload, error in [({'columns': 'sepal_length', 'data': [[1]]}, '"columns" must be a list'),
+                                   ({'columns': ['sepal_length'], 'data': [1]}, '"data" must be a list of lists'),
+                                   ({'columns': ['sepal_length', 'sepal_width'], 'data': [[1, 2], [1]]}, 'Row 1')]:
+                with self.assertRaises(HTTPError) as cm:
+                    self._post(server, '/models/iris/predict', payload)
+                self.assertEqual(cm.exception.code, 400)
+                self.assertIn(error, json.loads(cm.exception.read())['error'])
+
+    def test_close(self):
+        class SlowModel(object):
+            inputNames = ['x']
+
+            def predict(self, payload):
+                time.sleep(0.05)
+                data = json.loads(payload)['data']
+                return json.dumps({'columns': ['y'], 'data': [[row[0] * 2] for row in data]})
+
+        batcher = MicroBatcher(SlowModel(), max_batch_size=1, max_latency=0)
+        futures = [batcher.submit([[i]]) for i in range(10)]
+        batcher.close()
+        # Requests queued before close are all scored
+        self.assertTrue(all(x.done() for x in futures))
+        self.assertEqual([x.result()[1] for x in futures], [[[i * 2]] for i in range(10)])
+        with self.assertRaises(PMMLError):
+            batcher.submit([[1]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+#
+# Copyright (c) 2024 AutoDeployAI
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import json
+import unittest
+from unittest import TestCase
+from os import path
+
+from pypmml import Model, PMMLContext, PMMLError
+from pypmml.shm import SharedMemory, _Ring
+
+
+class SharedMemoryTestCase(TestCase):
+    test_models_dir = path.join(path.dirname(__file__), 'resources', 'models')
+
+    def test_ring(self):
+        ring = _Ring(100)
+        first = ring.acquire(40)
+        second = ring.acquire(40)
+        self.assertEqual((first, second), (0, 40))
+        self.assertIsNone(ring.acquire(30))
+
+        # Wraps around once the first region is released
+        ring.release(first)
+        self.assertEqual(ring.acquire(30), 0)
+        self.assertIsNone(ring.acquire(20))
+        ring.release(second)
+        self.assertEqual(ring.in_use, 30)
+        self.assertIsNone(ring.acquire(101))
+
+    @unittest.skipUnless(path.isdir('/dev/shm'), 'no shared memory')
+    def test_shared_memory(self):
+        model = Model.load(path.join(self.test_models_dir, 'single_iris_dectree.xml'))
+        rows = [[5.1, 3.5, 1.4, 0.2], [7, 3.2, 4.7, 1.4], [6.3, 3.3, 6.0, 2.5]] * 100
+        payload = json.dumps({'columns': model.inputNames, 'data': rows})
+        expected = model.predict(payload)
+
+        with SharedMemory(size=1 << 20, threshold=1024) as transport:
+            model.setTransport(transport)
+            self.assertIs(model.transport, transport)
+            for _ in range(2):
+                self.assertEqual(model.predict(payload), expected)
+            # Small payloads are sent through the socket
+            model.predict('[{"sepal_length": 5.1}]')
+
+            # Results that overflow the reserved region are returned through the socket
+            transport.min_output = 0
+            transport.output_factor = 0.5
+            self.assertEqual(model.predict(payload), expected)
+
+            stats = transport.snapshot()
+            if PMMLContext.getOrCreate().supports_shared_memory():
+                self.assertEqual(stats['calls'], 3)
+                self.assertEqual(stats['overflows'], 1)
+                self.assertEqual(stats['bytes_sent'], 3 * len(payload))
+                self.assertEqual(stats['bytes_received'], 3 * len(expected))
+                self.assertEqual(stats['in_use'], 0)
+
+                with self.assertRaises(PMMLError):
+                    model.predict('[{bad' + ' ' * 1024)
+            else:
+                self.assertEqual(stats['calls'], 0)
+        model.setTransport(None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -14,25 +14,38 @@
 # limitations under the License.
 #
 
+import sys
+
+
+# Data can not be an instance of a library that has not been imported yet, so these checks never import NumPy,
+# Pandas, SciPy, Polars or PyArrow themselves.
+
 def is_nd_array(data):
-    try:
-        import numpy as np
-        return isinstance(data, np.ndarray)
-    except ImportError:
-        return False
+    np = sys.modules.get('numpy')
+    return np is not None and isinstance(data, np.ndarray)
 
 
 def is_pandas_dataframe(data):
-    try:
-        import pandas as pd
-        return isinstance(data, pd.DataFrame)
-    except ImportError:
-        return False
+    pd = sys.modules.get('pandas')
+    return pd is not None and hasattr(pd, 'DataFrame') and isinstance(data, pd.DataFrame)
 
 
 def is_pandas_series(data):
-    try:
-        import pandas as pd
-        return isinstance(data, pd.Series)
-    except ImportError:
-        return False
+    pd = sys.modules.get('pandas')
+    return pd is not None and hasattr(pd, 'Series') and isinstance(data, pd.Series)
+
+
+def is_scipy_sparse(data):
+    sparse = sys.modules.get('scipy.sparse')
+    return sparse is not None and hasattr(sparse, 'issparse') and sparse.issparse(data)
+
+
+def is_polars_dataframe(data):
+    pl = sys.modules.get('polars')
+    return pl is not None and hasattr(pl, 'DataFrame') and isinstance(data, pl.DataFrame)
+
+
+def is_arrow_table(data):
+    """Whether data is a `Table` or `RecordBatch` of PyArrow."""
+    pa = sys.modules.get('pyarrow')
+    return pa is not None and hasattr(pa, 'RecordBatch') and isinstance(data, (pa.Table, pa.RecordBatch))
@@ -15,7 +15,7 @@ setup(
     description="Python PMML scoring library",
     long_description=long_description,
     long_description_content_type="text/markdown",
-    packages=["pypmml", "pypmml.jars"],
+    packages=["pypmml", "pypmml.jars", "pypmml.native"],
     package_data={
         "pypmml.jars": ["*.jar"]
     },
@@ -23,6 +23,9 @@ setup(
     install_requires=[
         "py4j>=0.10.7", "JPype1"
     ],
+    extras_require={
+        "native": ["numpy"]
+    },
     url="https://github.com/autodeployai/pypmml",
     download_url = "https://github.com/autodeployai/pypmml/archive/v" + VERSION + ".tar.gz",
     author="AutoDeployAI",